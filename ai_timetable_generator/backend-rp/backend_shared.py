@@ -0,0 +1,28 @@
+# backend-rp/backend_shared.py
+import importlib.util
+import sys
+from pathlib import Path
+
+# Modules shared with the main backend (backend/app/utils). Each file is loaded by
+# path under a backend_shared.* name, so nothing else from backend/app/utils lands
+# on sys.path or shadows backend-rp's own modules.
+UTILS_DIR = Path(__file__).resolve().parents[2] / "backend" / "app" / "utils"
+
+
+def _load(name):
+    qualified = f"backend_shared.{name}"
+    module = sys.modules.get(qualified)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(qualified, UTILS_DIR / f"{name}.py")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[qualified] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+slot_grid = _load("slot_grid")
+metrics_module = _load("metrics")
+
+WEEK = slot_grid.WEEK
+metrics = metrics_module.metrics
+TimingMiddleware = metrics_module.TimingMiddleware
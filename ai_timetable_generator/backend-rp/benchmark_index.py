@@ -0,0 +1,100 @@
+# backend-rp/benchmark_index.py
+"""Recall-vs-latency benchmark for the RAG index types.
+
+Embeds the syllabus corpus once, builds every index type from rag_utils.INDEX_TYPES
+over the same vectors and queries each with a fixed set of "Contact hours/week of
+<subject>" queries (every subject in the syllabus index). Recall@k is measured
+against the exact flat index.
+
+    python backend-rp/benchmark_index.py --k 5 --nprobe 8 --out index_benchmark.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from rag_utils import (INDEX_TYPES, RAG_DIR, SYLLABUS_DATA_DIR, build_embeddings, build_faiss_index,
+                       chunk_documents, gather_documents_recursive, load_subject_index)
+
+def fixed_queries(data_dir):
+    subjects = load_subject_index(data_dir)['subjects']
+    names = sorted({name for semesters in subjects.values() for names in semesters.values() for name in names})
+    return [f"Contact hours/week of {name}" for name in names]
+
+def run_benchmark(root_dir, data_dir, k=5, nprobe=8, batch_size=64, threads=None, repeats=3):
+    embeddings = build_embeddings(batch_size=batch_size, threads=threads)
+    chunks = chunk_documents(gather_documents_recursive(root_dir))
+
+    start = time.perf_counter()
+    vectors = np.array(embeddings.embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+    embed_seconds = time.perf_counter() - start
+    queries = np.array(embeddings.embed_documents(fixed_queries(data_dir)), dtype=np.float32)
+
+    results = []
+    truth = None
+    for index_type in INDEX_TYPES:
+        start = time.perf_counter()
+        index = build_faiss_index(vectors, index_type=index_type, nprobe=nprobe)
+        build_seconds = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(repeats):
+            for query in queries:
+                start = time.perf_counter()
+                _, found = index.search(query[None, :], k)
+                latencies.append(time.perf_counter() - start)
+        _, found = index.search(queries, k)
+        if truth is None:
+            truth = found
+        recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+
+        results.append({
+            "index_type": index_type,
+            "faiss_class": type(index).__name__,
+            "recall_at_k": round(float(recall), 4),
+            "latency_ms_mean": round(1000 * float(np.mean(latencies)), 4),
+            "latency_ms_p95": round(1000 * float(np.percentile(latencies, 95)), 4),
+            "index_bytes": int(faiss.serialize_index(index).nbytes),
+            "build_seconds": round(build_seconds, 4),
+        })
+
+    return {
+        "chunks": len(chunks),
+        "queries": len(queries),
+        "dim": int(vectors.shape[1]),
+        "k": k,
+        "nprobe": nprobe,
+        "embed_batch_size": batch_size,
+        "embed_threads": threads,
+        "embed_seconds": round(embed_seconds, 3),
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--root-dir", default=RAG_DIR)
+    parser.add_argument("--data-dir", default=SYLLABUS_DATA_DIR)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--out", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.root_dir, args.data_dir, k=args.k, nprobe=args.nprobe,
+                           batch_size=args.batch_size, threads=args.threads)
+    print(f"{report['chunks']} chunks, {report['queries']} queries, embedded in {report['embed_seconds']}s")
+    print(f"{'index':<10}{'recall@k':>10}{'mean ms':>10}{'p95 ms':>10}{'bytes':>12}")
+    for row in report["results"]:
+        print(f"{row['index_type']:<10}{row['recall_at_k']:>10}{row['latency_ms_mean']:>10}"
+              f"{row['latency_ms_p95']:>10}{row['index_bytes']:>12}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
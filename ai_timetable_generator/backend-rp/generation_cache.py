@@ -0,0 +1,222 @@
+# backend-rp/generation_cache.py
+import os
+import re
+import json
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+def make_cache_key(**parts):
+    """Stable digest of the inputs that determine a generated routine."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class GenerationCache:
+    """Two-tier (LRU memory + pickle-on-disk) cache with single-flight computation.
+
+    Concurrent ``get_or_compute`` calls for the same key share one computation:
+    the first caller runs it, the rest wait on its result.
+
+    The disk tier is bounded by ``max_disk_entries`` and ``max_disk_bytes`` (None
+    for no limit). A disk hit touches its file, and every put prunes the least
+    recently used files by mtime until both limits hold.
+    """
+
+    def __init__(self, max_entries=64, cache_dir=None, max_disk_entries=None, max_disk_bytes=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    value = pickle.load(f)
+            except FileNotFoundError:
+                value = None
+            except Exception as e:
+                print(f"[CACHE] Ignoring unreadable entry {key}: {e}")
+                value = None
+            if value is not None:
+                self._touch(key)
+                self._remember(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if not self.cache_dir:
+            return
+        tmp_path = f"{self._disk_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            print(f"[CACHE] Could not persist entry {key}: {e}")
+            return
+        self._prune_disk()
+
+    def _touch(self, key):
+        try:
+            os.utime(self._disk_path(key))
+        except OSError:
+            pass
+
+    def _prune_disk(self):
+        if self.max_disk_entries is None and self.max_disk_bytes is None:
+            return
+        files = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.pkl'):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime_ns, st.st_size, entry.path))
+        files.sort()
+        count, total = len(files), sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if ((self.max_disk_entries is None or count <= self.max_disk_entries)
+                    and (self.max_disk_bytes is None or total <= self.max_disk_bytes)):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            count, total = count - 1, total - size
+
+    def get_or_compute(self, key, compute, cacheable=lambda value: True):
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+        if not leader:
+            return flight.result()
+
+        try:
+            value = compute()
+            if cacheable(value):
+                self.put(key, value)
+            flight.set_result(value)
+            return value
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+def normalise_query(query):
+    """Case- and whitespace-insensitive form of a RAG query, used as the cache key."""
+    return " ".join(re.sub(r"[^\w\s/+-]", " ", query.lower()).split())
+
+class AnswerCache:
+    """LRU cache of RAG answers keyed by normalised query, with a TTL per entry.
+
+    Entries are only valid for the index version they were computed against;
+    ``set_version`` drops everything when the vector index changes.
+    """
+
+    def __init__(self, max_entries=1024, ttl=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def set_version(self, version):
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.version = version
+
+    def get(self, query):
+        key = normalise_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and self.clock() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def contains(self, query):
+        """Whether ``query`` has a live entry, without touching the counters or LRU order."""
+        with self._lock:
+            entry = self._entries.get(normalise_query(query))
+            return entry is not None and not (self.ttl and self.clock() - entry[0] > self.ttl)
+
+    def put(self, query, value):
+        key = normalise_query(query)
+        with self._lock:
+            self._entries[key] = (self.clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {"version": self.version, "entries": len(self._entries), "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions, "invalidations": self.invalidations}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
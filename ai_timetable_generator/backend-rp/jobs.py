@@ -0,0 +1,150 @@
+# backend-rp/jobs.py
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+STAGES = ("subjects", "index", "contact_hours", "scheduling", "export")
+
+class JobCancelled(Exception):
+    pass
+
+class JobQueueFull(Exception):
+    pass
+
+class Job:
+    """One background generation. ``report`` is handed to the pipeline as its progress
+    callback; it records the stage and raises JobCancelled once cancel() was called,
+    so a cancelled run stops at the next stage boundary or RAG query. The final
+    stage (export) only starts once the routine exists, so a cancel arriving then
+    no longer stops anything and the finished result is kept."""
+
+    def __init__(self, params, etag=None):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.etag = etag
+        self.status = "queued"
+        self.stage = None
+        self.stage_done = 0
+        self.stage_total = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self.status = "cancelled"
+            self.finished = time.time()
+
+    def report(self, stage, done=0, total=1):
+        if self._cancel.is_set() and stage != STAGES[-1]:
+            raise JobCancelled(self.id)
+        self.stage, self.stage_done, self.stage_total = stage, done, total
+
+    def progress(self):
+        if self.status == "done":
+            return 1.0
+        if self.stage not in STAGES:
+            return 0.0
+        fraction = self.stage_done / self.stage_total if self.stage_total else 0.0
+        return round((STAGES.index(self.stage) + min(fraction, 1.0)) / len(STAGES), 4)
+
+    def snapshot(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "stage_done": self.stage_done,
+            "stage_total": self.stage_total,
+            "progress": self.progress(),
+            "params": self.params,
+            "etag": self.etag,
+            "error": self.error,
+            "generation_id": self.result.get("generation_id") if isinstance(self.result, dict) else None,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+class JobManager:
+    """Bounded pool for heavy generation runs.
+
+    At most ``workers`` jobs run at once and at most ``max_pending`` more wait;
+    ``submit`` raises JobQueueFull beyond that. Finished jobs are kept (LRU) so
+    clients can fetch results, up to ``history`` entries.
+    """
+
+    def __init__(self, run, workers=2, max_pending=8, history=256):
+        self.run = run
+        self.workers = workers
+        self.max_pending = max_pending
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="generation")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _active(self):
+        return sum(job.status in ("queued", "running") for job in self._jobs.values())
+
+    def _forget_finished(self):
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.status not in ("queued", "running")]:
+            if len(self._jobs) <= self.history:
+                break
+            del self._jobs[job_id]
+
+    def submit(self, etag=None, **params):
+        job = Job(params, etag)
+        with self._lock:
+            if self._active() >= self.workers + self.max_pending:
+                raise JobQueueFull(f"{self.workers + self.max_pending} generation jobs already queued or running")
+            self._jobs[job.id] = job
+            self._forget_finished()
+            job.future = self._executor.submit(self._execute, job)
+        return job
+
+    def _execute(self, job):
+        if job.cancelled:
+            job.status, job.finished = "cancelled", time.time()
+            return
+        job.status, job.started = "running", time.time()
+        try:
+            result = self.run(progress=job.report, **job.params)
+            if isinstance(result, dict):
+                job.result, job.status = result, "done"
+                job.stage, job.stage_done, job.stage_total = STAGES[-1], 1, 1
+            else:
+                job.error, job.status = str(result), "failed"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.error, job.status = str(e), "failed"
+        finally:
+            job.finished = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None and job.status in ("queued", "running"):
+            job.cancel()
+        return job
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": self.workers, "max_pending": self.max_pending, "jobs": counts}
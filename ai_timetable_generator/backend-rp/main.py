@@ -1,10 +1,179 @@
 # backend-rp/main.py
-from fastapi import FastAPI
-from rag_utils import generate_timetable
+import os
+import tempfile
+import time
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from jobs import JobManager, JobQueueFull
+from rag_utils import (SmartRoutineGenerator, answer_cache, generate_timetable, generation_cache, generation_key,
+                       get_routine, remember_routine)
+from backend_shared import TimingMiddleware, metrics
 
 app = FastAPI()
+app.add_middleware(TimingMiddleware)
 
+jobs = JobManager(
+    generate_timetable,
+    workers=int(os.getenv("GENERATION_WORKERS", "2")),
+    max_pending=int(os.getenv("GENERATION_MAX_PENDING", "8")),
+)
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# A seeded routine is determined by its generation key (inputs + parameters), so the
+# key doubles as an ETag: clients holding it can skip the generation entirely.
+# Unseeded runs differ every time and get no ETag.
+def _etag(dept, sem, **params):
+    if params.get("seed") is None:
+        return None
+    try:
+        return f'"{generation_key(dept, sem, **params)}"'
+    except Exception:
+        return None
+
+def _not_modified(request: Request, etag):
+    if etag is None:
+        return False
+    return etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(","))
+
+# Freshness check for clients holding an ETag: never generates. 304 if the client's
+# copy is current, the cached routine if the server still has it, else 404 and the
+# client submits a job.
+@app.api_route("/routines/cached", methods=["GET", "HEAD"])
+def cached_timetable(request: Request, dept: str, sem: str, seed: int, restarts: int = 1, engine: str = "greedy",
+                     cpsat_time_limit: Optional[float] = None, cpsat_workers: Optional[int] = None):
+    etag = _etag(dept, sem, seed=seed, restarts=restarts, engine=engine, cpsat_time_limit=cpsat_time_limit,
+                 cpsat_workers=cpsat_workers)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    routine = generation_cache.get(etag.strip('"')) if etag else None
+    if routine is None:
+        raise HTTPException(status_code=404, detail="Routine is not cached; submit a job to generate it")
+    remember_routine(routine)
+    return JSONResponse({"routine": routine}, headers={"ETag": etag})
+
+# cpsat_time_limit / cpsat_workers can only lower the server's CP-SAT caps
+# (see rag_utils.CPSAT_MAX_TIME); the limit is also bounded by the greedy run time.
 @app.get("/generate_timetable")
-def get_timetable(dept: str, sem: str):
-    routine = generate_timetable(dept, sem)
-    return {"routine": routine}
\ No newline at end of file
+def get_timetable(request: Request, response: Response, dept: str, sem: str, seed: Optional[int] = None,
+                  restarts: int = 1, engine: str = "greedy", view: str = "json",
+                  cpsat_time_limit: Optional[float] = None, cpsat_workers: Optional[int] = None):
+    params = dict(seed=seed, restarts=restarts, engine=engine, cpsat_time_limit=cpsat_time_limit,
+                  cpsat_workers=cpsat_workers)
+    etag = _etag(dept, sem, **params)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    routine = generate_timetable(dept, sem, **params)
+    if isinstance(routine, str):
+        return {"error": routine}
+    if etag:
+        response.headers["ETag"] = etag
+    if view == "text":
+        return {"routine": SmartRoutineGenerator().format_routine_output_table(routine)}
+    return {"routine": routine}
+
+@app.post("/jobs", status_code=202)
+def submit_job(request: Request, dept: str, sem: str, seed: Optional[int] = None, restarts: int = 1,
+               engine: str = "greedy", cpsat_time_limit: Optional[float] = None, cpsat_workers: Optional[int] = None):
+    params = dict(seed=seed, restarts=restarts, engine=engine, cpsat_time_limit=cpsat_time_limit,
+                  cpsat_workers=cpsat_workers)
+    etag = _etag(dept, sem, **params)
+    # A matching If-None-Match on an unsafe method fails the precondition (RFC 9110 13.1.2)
+    if _not_modified(request, etag):
+        return Response(status_code=412, headers={"ETag": etag})
+    try:
+        job = jobs.submit(etag=etag, dept=dept, sem=sem, **params)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return job.snapshot()
+
+def _job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    return _job(job_id).snapshot()
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str, response: Response, view: str = "json"):
+    job = _job(job_id)
+    if job.status == "failed":
+        return {"error": job.error}
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job.status}")
+    if job.etag:
+        response.headers["ETag"] = job.etag
+    if view == "text":
+        return {"routine": SmartRoutineGenerator().format_routine_output_table(job.result)}
+    return {"routine": job.result}
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    _job(job_id)
+    return jobs.cancel(job_id).snapshot()
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {"generation": generation_cache.stats(), "answers": answer_cache.stats(), "jobs": jobs.stats()}
+
+def _stored_routine(generation_id: str):
+    routine = get_routine(generation_id)
+    if routine is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired generation {generation_id}")
+    return routine
+
+def _download(content, media_type: str, filename: str):
+    return StreamingResponse(content, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/exports/{generation_id}/section/{section}.csv")
+def export_section(generation_id: str, section: str):
+    routine = _stored_routine(generation_id)
+    if section not in routine["sections"]:
+        raise HTTPException(status_code=404, detail=f"Unknown section {section}")
+    rows = SmartRoutineGenerator().iter_section_csv(routine, section)
+    return _download(rows, "text/csv", f"timetable_section_{section}.csv")
+
+@app.get("/exports/{generation_id}/summary.csv")
+def export_summary(generation_id: str):
+    rows = SmartRoutineGenerator().iter_summary_csv(_stored_routine(generation_id))
+    return _download(rows, "text/csv", "timetable_summary.csv")
+
+def _timed(phase, chunks):
+    """Pass chunks through, recording only the time spent producing them."""
+    spent, started = 0.0, time.perf_counter()
+    for chunk in chunks:
+        spent += time.perf_counter() - started
+        yield chunk
+        started = time.perf_counter()
+    metrics.record("rag_export", phase, spent + time.perf_counter() - started, {})
+
+@app.get("/exports/{generation_id}/bundle.zip")
+def export_bundle(generation_id: str):
+    routine = _stored_routine(generation_id)
+    bundle = _timed("zip", SmartRoutineGenerator().export_zip(routine))
+    return _download(bundle, "application/zip", f"timetable_{routine['dept']}_sem{routine['sem']}.zip")
+
+@app.get("/exports/{generation_id}/timetable.xlsx")
+def export_xlsx(generation_id: str):
+    routine = _stored_routine(generation_id)
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        with metrics.span("rag_export", "xlsx"):
+            SmartRoutineGenerator().export_xlsx(routine, path)
+    except BaseException:
+        os.remove(path)
+        raise
+    # The workbook is built per request, so the file goes once it has been sent
+    return FileResponse(path, media_type=XLSX_MIME, filename=f"timetable_{routine['dept']}_sem{routine['sem']}.xlsx",
+                        background=BackgroundTask(os.remove, path))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,19 +1,44 @@
 # backend-rp/rag_utils.py
 import os
 import re
+import time
+import hashlib
+import multiprocessing
+import pickle
+import threading
+import io
+import csv
+import copy
+import uuid
 import random
+import zipfile
 import traceback
+import faiss
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
 from langchain_community.document_loaders import PyPDFLoader, TextLoader, CSVLoader, Docx2txtLoader
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_groq import ChatGroq
 from langchain.chains import RetrievalQA
 from supabase import create_client, Client
 from groq import Groq
+from generation_cache import AnswerCache, GenerationCache, make_cache_key
+from jobs import JobCancelled
+
+# Slot grid and metrics shared with the main backend (backend/app/utils)
+from backend_shared import WEEK, metrics
+
+try:
+    from ortools.sat.python import cp_model
+except ImportError:  # the CP-SAT engine is optional; the greedy engine needs nothing extra
+    cp_model = None
 
 # Supabase and Groq setup
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -35,17 +60,25 @@ class RobustPDFLoader(PyPDFLoader):
             return []
 
 def load_excel_to_documents(file_path: str) -> list[Document]:
+    # One document per row ("column: value; ..."), so a subject never gets split
+    # mid-record and its paper code travels with it as metadata.
     docs = []
     try:
         xls = pd.ExcelFile(file_path)
         for sheet_name in xls.sheet_names:
-            df = xls.parse(sheet_name)
-            text = df.to_csv(index=False)
-            if text.strip():
-                docs.append(Document(
-                    page_content=text,
-                    metadata={"source": str(file_path), "sheet": sheet_name, "loader": "pandas_excel"}
-                ))
+            df = xls.parse(sheet_name).dropna(how="all")
+            columns = [str(c).strip() for c in df.columns]
+            for row_number, values in enumerate(df.itertuples(index=False, name=None)):
+                fields = [f"{col}: {val}" for col, val in zip(columns, values) if pd.notna(val) and str(val).strip()]
+                if not fields:
+                    continue
+                text = "; ".join(fields)
+                metadata = {"source": str(file_path), "sheet": sheet_name, "row": row_number,
+                            "loader": "pandas_excel", "chunk": "row"}
+                code = PAPER_CODE_RE.search(text)
+                if code:
+                    metadata["paper_code"] = normalise_paper_code(code.group(1))
+                docs.append(Document(page_content=text, metadata=metadata))
     except Exception as e:
         print(f"[EXCEL] Failed: {e}")
     return docs
@@ -69,9 +102,11 @@ def load_file_to_documents(file_path: str) -> list[Document]:
         print(f"[LOAD ERR]: {e}")
         return []
 
+RAG_EXTENSIONS = {".pdf", ".txt", ".csv", ".xls", ".xlsx", ".docx"}
+
 def gather_documents_recursive(root_dir: str, allowed_ext=None) -> list[Document]:
     if allowed_ext is None:
-        allowed_ext = {".pdf", ".txt", ".csv", ".xls", ".xlsx", ".docx"}
+        allowed_ext = RAG_EXTENSIONS
     all_docs = []
     for dirpath, _, filenames in os.walk(root_dir):
         for name in filenames:
@@ -86,16 +121,203 @@ def gather_documents_recursive(root_dir: str, allowed_ext=None) -> list[Document
                 all_docs.extend(docs)
     return all_docs
 
+# Structure-aware chunking
+# Syllabus PDFs are a run of per-course blocks ("COURSE OUTCOMES ...", "Course Title: ...
+# Code: ... Contact Hours: ...") plus curriculum tables with one subject per row. Chunks
+# follow those boundaries instead of a fixed character window, repeated page headers
+# and duplicate pages (the same first-year pages ship with every department) are
+# dropped, and only oversized sections fall back to the character splitter.
+PAPER_CODE_RE = re.compile(r'\b([A-Z]{2,5}(?:-[A-Z]{1,5})?[- ]?\d{3})\b')
+CURRICULUM_ROW_RE = re.compile(
+    r'^\s*\d+\.?\s+([A-Z]{2,5}(?:-[A-Z]{1,5})?[- ]?\d{3})\s+(.+?)\s+(\d+)\s+(\d+)\s+(\d+)\s+\d+(?:\s+[\d.]+)?\s*$')
+# CO/PO articulation-matrix rows ("CO1 3 2 3 1 - - -"): numeric noise for retrieval
+MATRIX_LINE_RE = re.compile(r'(?:\s*(?:CO\d+|PO\d+|PSO\d+|AVG\.?|-?[\d.]+|-|–)\s*)+')
+SECTION_START_RE = re.compile(r'^\s*(COURSE OUTCOMES|Course Title\s*:|SEMESTER\s*[–-])', re.IGNORECASE)
+MAX_SECTION_CHARS = 1500
+
+def normalise_paper_code(code):
+    return re.sub(r'\s+', '', code).upper()
+
+def _normalise_text(text):
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+def _boilerplate_lines(pages):
+    # Lines (with digits masked, e.g. "Page 4/ 81") found on most pages of a document
+    if len(pages) < 3:
+        return set()
+    counts = {}
+    for page in pages:
+        for line in {re.sub(r'\d+', '#', l.strip()) for l in page.page_content.splitlines() if l.strip()}:
+            counts[line] = counts.get(line, 0) + 1
+    return {line for line, count in counts.items() if count > len(pages) / 2}
+
+def _pdf_sections(pages, seen_pages):
+    boilerplate = _boilerplate_lines(pages)
+    section, metadata = [], None
+
+    def flush():
+        text = "\n".join(section).strip()
+        if text:
+            code = PAPER_CODE_RE.search(text)
+            meta = dict(metadata, chunk="section")
+            if code:
+                meta["paper_code"] = normalise_paper_code(code.group(1))
+            return [(text, meta)]
+        return []
+
+    for page in pages:
+        lines = [l for l in page.page_content.splitlines()
+                 if l.strip() and re.sub(r'\d+', '#', l.strip()) not in boilerplate
+                 and not MATRIX_LINE_RE.fullmatch(l)]
+        page_key = _normalise_text(" ".join(lines))
+        if not page_key or page_key in seen_pages:
+            continue
+        seen_pages.add(page_key)
+        for line in lines:
+            row = CURRICULUM_ROW_RE.match(line)
+            if row:
+                code, name, lecture, tutorial, practical = row.groups()
+                yield (f"{normalise_paper_code(code)} {name.strip()}: Contact hours/week "
+                       f"{lecture}L+{tutorial}T+{practical}P",
+                       dict(page.metadata, chunk="row", paper_code=normalise_paper_code(code)))
+                continue
+            if SECTION_START_RE.match(line) and section:
+                yield from flush()
+                section = []
+            if not section:
+                metadata = page.metadata
+            section.append(line.strip())
+    yield from flush()
+
+def chunk_documents(docs: list[Document], max_chars=MAX_SECTION_CHARS) -> list[Document]:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    seen_chunks, seen_pages = set(), set()
+    chunks = []
+
+    def emit(text, metadata):
+        key = _normalise_text(text)
+        if not key or key in seen_chunks:
+            return
+        seen_chunks.add(key)
+        doc = Document(page_content=text, metadata=metadata)
+        chunks.extend(splitter.split_documents([doc]) if len(text) > max_chars else [doc])
+
+    pdf_pages = {}
+    for doc in docs:
+        if "row" in doc.metadata:
+            emit(doc.page_content, doc.metadata)
+        elif "page" in doc.metadata:
+            pdf_pages.setdefault(doc.metadata.get("source"), []).append(doc)
+        else:
+            emit(doc.page_content, doc.metadata)
+    for pages in pdf_pages.values():
+        for text, metadata in _pdf_sections(pages, seen_pages):
+            emit(text, metadata)
+    return chunks
+
+# Vector index configuration
+# flat     exact float32 search (the FAISS.from_documents default)
+# sq8      exact scan over int8 scalar-quantised vectors (~4x smaller)
+# ivf      inverted file with trained centroids, float32 lists
+# ivf-sq8  inverted file with int8 lists
+# ivf-pq   inverted file with product-quantised codes (smallest, lossy)
+# IVF variants fall back to the nearest flat type when there are too few
+# chunks to train centroids; benchmark_index.py measures recall vs latency.
+EMBEDDINGS_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+INDEX_TYPES = ("flat", "sq8", "ivf", "ivf-sq8", "ivf-pq")
+RAG_INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "flat")
+RAG_NPROBE = int(os.getenv("RAG_NPROBE", "8"))
+RAG_EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "64"))
+RAG_EMBED_THREADS = int(os.getenv("RAG_EMBED_THREADS", "0")) or None
+
+def set_cpu_threads(threads):
+    if not threads:
+        return
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    faiss.omp_set_num_threads(threads)
+
+def build_embeddings(embeddings_model=EMBEDDINGS_MODEL,
+                     batch_size=RAG_EMBED_BATCH_SIZE, threads=RAG_EMBED_THREADS):
+    set_cpu_threads(threads)
+    return HuggingFaceEmbeddings(
+        model_name=embeddings_model,
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"batch_size": batch_size},
+    )
+
+def build_faiss_index(vectors, index_type=RAG_INDEX_TYPE, nprobe=RAG_NPROBE):
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+    # ~39 training points per centroid is the FAISS minimum for stable k-means
+    nlist = min(int(4 * np.sqrt(count)), count // 39)
+    pq_m = next((m for m in (48, 32, 24, 16, 8, 4, 2, 1) if dim % m == 0), 1)
+
+    if index_type.startswith("ivf") and nlist < 2:
+        index_type = "sq8" if index_type == "ivf-sq8" else "flat"
+    # 8-bit PQ codebooks have 256 centroids per sub-quantiser to train
+    if index_type == "ivf-pq" and count < 256 * 39:
+        index_type = "ivf-sq8"
+
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "flat":
+        index = quantizer
+    elif index_type == "sq8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit)
+    elif index_type == "ivf":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+    elif index_type == "ivf-sq8":
+        index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, faiss.ScalarQuantizer.QT_8bit)
+    else:
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, 8)
+    if not index.is_trained:
+        index.train(vectors)
+    if hasattr(index, "nprobe"):
+        index.nprobe = min(nprobe, nlist)
+    index.add(vectors)
+    return index
+
+def vectorstore_from_chunks(chunks, embeddings, index_type=RAG_INDEX_TYPE, nprobe=RAG_NPROBE):
+    vectors = embeddings.embed_documents([chunk.page_content for chunk in chunks])
+    index = build_faiss_index(np.array(vectors, dtype=np.float32), index_type=index_type, nprobe=nprobe)
+    ids = [str(i) for i in range(len(chunks))]
+    for chunk_id, chunk in zip(ids, chunks):
+        chunk.metadata["chunk_id"] = chunk_id
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(dict(zip(ids, chunks))),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+
 # RAG Pipeline
-def build_vectorstore(root_dir: str, embeddings_model="sentence-transformers/all-MiniLM-L6-v2"):
+LLM_MODEL = "llama-3.1-70b-versatile"
+
+def rag_index_version(root_dir: str, embeddings_model=EMBEDDINGS_MODEL, index_type=RAG_INDEX_TYPE, model=LLM_MODEL):
+    """Cheap version of the vector index: corpus file stats plus everything that shapes the answers."""
+    files = []
+    for dirpath, _, filenames in os.walk(root_dir):
+        for name in filenames:
+            if Path(name).suffix.lower() in RAG_EXTENSIONS:
+                st = os.stat(os.path.join(dirpath, name))
+                files.append((os.path.relpath(os.path.join(dirpath, name), root_dir), st.st_size, st.st_mtime_ns))
+    return make_cache_key(files=sorted(files), embeddings=embeddings_model, index_type=index_type, model=model,
+                          max_section_chars=MAX_SECTION_CHARS)
+
+def build_vectorstore(root_dir: str, embeddings_model=EMBEDDINGS_MODEL,
+                      index_type=RAG_INDEX_TYPE, batch_size=RAG_EMBED_BATCH_SIZE, threads=RAG_EMBED_THREADS):
     docs = gather_documents_recursive(root_dir)
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = splitter.split_documents(docs)
-    embeddings = HuggingFaceEmbeddings(model_name=embeddings_model)
-    vectorstore = FAISS.from_documents(chunks, embeddings)
+    chunks = chunk_documents(docs)
+    embeddings = build_embeddings(embeddings_model, batch_size=batch_size, threads=threads)
+    vectorstore = vectorstore_from_chunks(chunks, embeddings, index_type=index_type)
     return vectorstore
 
-def build_rag_chain(vectorstore, model="llama-3.1-70b-versatile"):
+def build_rag_chain(vectorstore, model=LLM_MODEL):
     llm = ChatGroq(model=model)
     retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
     qa_chain = RetrievalQA.from_chain_type(
@@ -107,8 +329,50 @@ def build_rag_chain(vectorstore, model="llama-3.1-70b-versatile"):
     return qa_chain
 
 def rag_query(qa_chain, query: str):
-    result = qa_chain.invoke({"query": query})
-    return result
+    if not hasattr(qa_chain, "combine_documents_chain"):
+        with metrics.span("rag_generate", "llm"):
+            return qa_chain.invoke({"query": query})
+    # Same steps as RetrievalQA, split so retrieval and the LLM call are timed apart
+    with metrics.span("rag_generate", "retrieve"):
+        docs = qa_chain.retriever.invoke(query)
+    with metrics.span("rag_generate", "llm"):
+        answer = qa_chain.combine_documents_chain.invoke({"input_documents": docs, "question": query})
+    return {"query": query, "result": answer["output_text"], "source_documents": docs}
+
+# Answer cache
+# The same first-year subjects (Physics-I, Mathematics-IA, ...) are queried for every
+# department and semester, so answers are cached by normalised query against the
+# current index version. The chain (and the vector index behind it) is only built
+# when a query actually misses.
+answer_cache = AnswerCache(
+    max_entries=int(os.getenv("RAG_ANSWER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RAG_ANSWER_CACHE_TTL", "86400")) or None,
+)
+_rag_chain = {}
+_rag_chain_lock = threading.Lock()
+
+def get_rag_chain(root_dir: str, version: str):
+    with _rag_chain_lock:
+        if _rag_chain.get("version") != version:
+            _rag_chain.clear()
+            _rag_chain.update(version=version, chain=build_rag_chain(build_vectorstore(root_dir)))
+        return _rag_chain["chain"]
+
+def cached_rag_query(root_dir: str, query: str, version=None, cache=answer_cache):
+    version = version or rag_index_version(root_dir)
+    cache.set_version(version)
+    cached = cache.get(query)
+    if cached is not None:
+        return cached
+    response = rag_query(get_rag_chain(root_dir, version), query)
+    if not isinstance(response, dict):
+        return {"result": response, "chunk_ids": []}
+    entry = {
+        "result": response.get("result", ""),
+        "chunk_ids": [doc.metadata.get("chunk_id") for doc in response.get("source_documents", [])],
+    }
+    cache.put(query, entry)
+    return entry
 
 # Extract contact hours
 def extract_contact_hours(response):
@@ -117,29 +381,215 @@ def extract_contact_hours(response):
     match = re.search(r'(\d+[LTP](?:\+?\d*[LTP]?)?(?:/week)?)', response)
     return match.group(0) if match else None
 
+# Occupancy grids
+# Every faculty member, room and section gets an integer ID and a uint64 bitmask
+# over the DAYS x TIME_SLOTS week (bit = day * len(TIME_SLOTS) + slot), so
+# candidate filtering is a vectorised AND over NumPy arrays instead of nested dicts.
+class OccupancyGrid:
+    def __init__(self, faculty_names, room_names, sections, slots_per_day, room_capacity=None):
+        self.slots_per_day = slots_per_day
+        self.faculty_ids = {name: i for i, name in enumerate(faculty_names)}
+        self.room_ids = {name: i for i, name in enumerate(room_names)}
+        self.section_ids = {section: i for i, section in enumerate(sections)}
+        self.faculty_names = list(self.faculty_ids)
+        self.room_names = list(self.room_ids)
+        self.faculty_busy = np.zeros(len(self.faculty_ids), dtype=np.uint64)
+        self.room_busy = np.zeros(len(self.room_ids), dtype=np.uint64)
+        self.section_busy = np.zeros(len(self.section_ids), dtype=np.uint64)
+        self.faculty_load = np.zeros(len(self.faculty_ids), dtype=np.int32)
+        self.room_capacity = np.array([(room_capacity or {}).get(name, np.nan) for name in self.room_names],
+                                      dtype=float)
+
+    def bit(self, day_idx, slot_idx):
+        return np.uint64(1 << (day_idx * self.slots_per_day + slot_idx))
+
+    def is_section_free(self, section_id, bit):
+        return not (self.section_busy[section_id] & bit)
+
+    def free_faculty(self, faculty_ids, max_load, unavailable, bit, preferred=None):
+        ok = ((self.faculty_busy[faculty_ids] | unavailable) & bit) == 0
+        ok &= self.faculty_load[faculty_ids] < max_load
+        if preferred is not None:
+            # Narrow to faculty who prefer this slot, when any of them are free
+            keen = ok & ((preferred & bit) != 0)
+            if keen.any():
+                ok = keen
+        return faculty_ids[ok]
+
+    def free_rooms(self, room_ids, bit):
+        return room_ids[(self.room_busy[room_ids] & bit) == 0]
+
+    def book(self, faculty_id, room_id, section_id, bit):
+        self.faculty_busy[faculty_id] |= bit
+        self.room_busy[room_id] |= bit
+        self.section_busy[section_id] |= bit
+        self.faculty_load[faculty_id] += 1
+
+# Faculty qualification index
+# Built once per set of college CSVs. Keyword and year lookups keep the original
+# substring semantics but are memoised as sets of faculty IDs, so qualifying a
+# subject is a handful of set intersections instead of a scan of the table.
+class FacultyIndex:
+    def __init__(self, records, subjects, departments, years):
+        self.records = records
+        self._subjects = subjects
+        self._years = years
+        self._keywords = {}
+        self._year_sets = {}
+        self.by_department = {}
+        for faculty_id, dept in enumerate(departments):
+            self.by_department.setdefault(dept, set()).add(faculty_id)
+        self.catch_all = self.with_keyword('general') | self.with_keyword('all')
+
+    def with_keyword(self, keyword):
+        ids = self._keywords.get(keyword)
+        if ids is None:
+            ids = frozenset(i for i, subjects in enumerate(self._subjects) if keyword in subjects)
+            self._keywords[keyword] = ids
+        return ids
+
+    def for_year(self, year):
+        ids = self._year_sets.get(year)
+        if ids is None:
+            ids = frozenset(i for i, years in enumerate(self._years)
+                            if year in years or years.upper() == 'ALL' or years == '')
+            self._year_sets[year] = ids
+        return ids
+
+    def qualified(self, keywords, department, year):
+        matched = set(self.catch_all)
+        for keyword in keywords:
+            matched |= self.with_keyword(keyword)
+        eligible = set()
+        for dept in (department.upper(), 'GENERAL', 'ALL'):
+            eligible |= self.by_department.get(dept, set())
+        return [self.records[i] for i in sorted(matched & eligible & self.for_year(str(year)))]
+
+# Parsed college CSVs and faculty index, reused until one of the files changes
+_college_data = {}
+_college_data_lock = threading.Lock()
+
+# Process pool for multi-restart routine search. Workers are spawned, not forked:
+# the server process is threaded (uvicorn, the job manager), and a fork can inherit
+# a lock some other thread was holding.
+ROUTINE_WORKERS = int(os.getenv("ROUTINE_WORKERS", "0")) or os.cpu_count() or 1
+# CP-SAT refinement budget. Greedy passes take milliseconds, so the solver gets at
+# most CPSAT_TIME_FACTOR times the greedy time (never less than CPSAT_MIN_TIME),
+# capped by CPSAT_MAX_TIME and by any limit the request asks for.
+CPSAT_MAX_TIME = float(os.getenv("CPSAT_MAX_TIME", "10"))
+CPSAT_MIN_TIME = float(os.getenv("CPSAT_MIN_TIME", "1"))
+CPSAT_TIME_FACTOR = float(os.getenv("CPSAT_TIME_FACTOR", "20"))
+CPSAT_MAX_WORKERS = int(os.getenv("CPSAT_MAX_WORKERS", "0")) or min(8, os.cpu_count() or 1)
+_routine_pool = None
+_routine_pool_lock = threading.Lock()
+
+def get_routine_pool(workers=None):
+    global _routine_pool
+    with _routine_pool_lock:
+        if _routine_pool is None:
+            _routine_pool = ProcessPoolExecutor(max_workers=workers or ROUTINE_WORKERS,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _routine_pool
+
+def _run_routine_pass(subject_requirements, sections, grid_template, student_count, seed, deadline=None):
+    return SmartRoutineGenerator().run_pass(subject_requirements, sections, grid_template, student_count, seed,
+                                            deadline)
+
+# Generated routines by generation ID, so exports are built on demand from memory
+# instead of being written to a shared output directory on every request
+ROUTINE_STORE_SIZE = int(os.getenv("ROUTINE_STORE_SIZE", "128"))
+_routine_store = OrderedDict()
+_routine_store_lock = threading.Lock()
+
+def remember_routine(routine):
+    generation_id = routine.get('generation_id') or uuid.uuid4().hex
+    routine['generation_id'] = generation_id
+    with _routine_store_lock:
+        _routine_store[generation_id] = routine
+        while len(_routine_store) > ROUTINE_STORE_SIZE:
+            _routine_store.popitem(last=False)
+    return generation_id
+
+def get_routine(generation_id):
+    with _routine_store_lock:
+        routine = _routine_store.get(generation_id)
+        if routine is not None:
+            _routine_store.move_to_end(generation_id)
+        return routine
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable write target that collects bytes until drained. zipfile falls back
+    to data descriptors on unseekable files, so an archive can be streamed out."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+SUMMARY_COLUMNS = ['Section', 'Total Classes', 'Subject', 'Hours/Week', 'Faculty', 'Workload (Hours/Week)']
+
 # SmartRoutineGenerator class
 class SmartRoutineGenerator:
-    DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri']
-    TIME_SLOTS = ['9-10', '10-11', '11-12', '12-1', '2-3', '3-4', '4-5']
+    SLOT_GRID = WEEK.with_labels("short")
+    DAYS = SLOT_GRID.days
+    TIME_SLOTS = SLOT_GRID.labels
+    BREAK_SLOT = TIME_SLOTS[SLOT_GRID.break_slots[0]]
     
     def __init__(self):
         self.faculty_df = None
         self.room_df = None
         self.student_df = None
+        self.faculty_index = None
+        self.last_run = None
     
     def load_data(self, faculty_file, room_file, student_file):
         try:
-            self.faculty_df = pd.read_csv(faculty_file)
-            self.room_df = pd.read_csv(room_file)
-            self.student_df = pd.read_csv(student_file)
-            
-            self.faculty_df.columns = self.faculty_df.columns.str.strip()
-            self.room_df.columns = self.room_df.columns.str.strip()
-            self.student_df.columns = self.student_df.columns.str.strip()
+            paths = tuple(os.path.abspath(f) for f in (faculty_file, room_file, student_file))
+            stats = tuple((st.st_mtime_ns, st.st_size) for st in map(os.stat, paths))
+            with _college_data_lock:
+                cached = _college_data.get(paths)
+                if cached is None or cached[0] != stats:
+                    cached = (stats, self.read_college_data(*paths))
+                    _college_data[paths] = cached
+            self.faculty_df, self.room_df, self.student_df, self.faculty_index = cached[1]
             return True
         except Exception as e:
             print(f"[ERROR] Load data: {e}")
             return False
+    
+    def read_college_data(self, faculty_file, room_file, student_file):
+        faculty_df = pd.read_csv(faculty_file)
+        room_df = pd.read_csv(room_file)
+        student_df = pd.read_csv(student_file)
+        
+        faculty_df.columns = faculty_df.columns.str.strip()
+        room_df.columns = room_df.columns.str.strip()
+        student_df.columns = student_df.columns.str.strip()
+        return faculty_df, room_df, student_df, self.build_faculty_index(faculty_df)
+    
+    def build_faculty_index(self, faculty_df):
+        records, subjects, departments, years = [], [], [], []
+        for faculty in faculty_df.to_dict('records'):
+            max_load = faculty.get('max_load_hours', 20)
+            records.append({
+                'name': faculty.get('name', ''),
+                'max_load_hours': 20 if pd.isna(max_load) else max_load,
+                'unavailable_mask': self.SLOT_GRID.mask(faculty.get('unavailable_slots')),
+                'preferred_mask': self.SLOT_GRID.mask(faculty.get('preferred_slots'))
+            })
+            subjects.append(str(faculty.get('subjects', '')).lower())
+            departments.append(str(faculty.get('department', '')).upper())
+            years.append(str(faculty.get('year_to_teach', '')))
+        return FacultyIndex(records, subjects, departments, years)
 
     def parse_contact_hours(self, contact_hour_string):
         if not contact_hour_string or contact_hour_string == "Unknown":
@@ -152,27 +602,7 @@ class SmartRoutineGenerator:
         return hours
     
     def parse_unavailable_slots(self, unavailable_str):
-        if pd.isna(unavailable_str) or unavailable_str == "":
-            return []
-        slots = []
-        for slot in str(unavailable_str).split('|'):
-            slot = slot.strip()
-            if ':' in slot:
-                parts = slot.split()
-                if len(parts) >= 2:
-                    day = parts[0]
-                    time_range = parts[1]
-                    if '10:00-12:00' in time_range:
-                        slots.extend([(day, '10-11'), (day, '11-12')])
-                    elif '14:00-16:00' in time_range:
-                        slots.extend([(day, '2-3'), (day, '3-4')])
-                    elif '09:00-10:00' in time_range:
-                        slots.append((day, '9-10'))
-                    elif '11:00-13:00' in time_range:
-                        slots.extend([(day, '11-12'), (day, '12-1')])
-                    elif '13:00-15:00' in time_range:
-                        slots.extend([(day, '12-1'), (day, '2-3')])
-        return slots
+        return self.SLOT_GRID.slots(self.SLOT_GRID.mask(unavailable_str))
     
     def get_suitable_rooms(self, subject_name, department, student_count):
         room_type = 'Lab' if 'Lab' in subject_name or 'lab' in subject_name.lower() else 'Classroom'
@@ -188,178 +618,356 @@ class SmartRoutineGenerator:
             suitable_rooms = self.room_df['room_name'].tolist()[:3]
         return suitable_rooms or ['DefaultRoom']
     
+    def subject_keywords(self, subject_name):
+        name = subject_name.lower()
+        if 'biology' in name:
+            return ['biology', 'bio']
+        elif 'computer architecture' in name:
+            return ['computer architecture', 'architecture', 'computer']
+        elif 'lab' in name:
+            return ['lab', 'laboratory', 'practical']
+        elif 'algorithm' in name:
+            return ['algorithm', 'algorithms']
+        elif 'discrete mathematics' in name:
+            return ['discrete', 'mathematics', 'math']
+        elif 'environmental' in name:
+            return ['environmental', 'environment']
+        elif 'formal language' in name or 'automata' in name:
+            return ['formal', 'language', 'automata', ' theory']
+        return [word.lower().strip('()[]') for word in subject_name.split()
+                if len(word.strip('()[]')) > 2]
+    
     def get_qualified_faculty(self, subject_name, department, year):
-        qualified_faculty = []
-        for _, faculty in self.faculty_df.iterrows():
-            faculty_subjects = str(faculty.get('subjects', '')).lower()
-            faculty_name = faculty.get('name', '')
-            subject_keywords = []
-            if 'biology' in subject_name.lower():
-                subject_keywords.extend(['biology', 'bio'])
-            elif 'computer architecture' in subject_name.lower():
-                subject_keywords.extend(['computer architecture', 'architecture', 'computer'])
-            elif 'lab' in subject_name.lower():
-                subject_keywords.extend(['lab', 'laboratory', 'practical'])
-            elif 'algorithm' in subject_name.lower():
-                subject_keywords.extend(['algorithm', 'algorithms'])
-            elif 'discrete mathematics' in subject_name.lower():
-                subject_keywords.extend(['discrete', 'mathematics', 'math'])
-            elif 'environmental' in subject_name.lower():
-                subject_keywords.extend(['environmental', 'environment'])
-            elif 'formal language' in subject_name.lower() or 'automata' in subject_name.lower():
-                subject_keywords.extend(['formal', 'language', 'automata', ' theory'])
-            else:
-                subject_keywords = [word.lower().strip('()[]') for word in subject_name.split() 
-                                  if len(word.strip('()[]')) > 2]
-            
-            if any(keyword in faculty_subjects for keyword in subject_keywords) or 'general' in faculty_subjects or 'all' in faculty_subjects:
-                faculty_dept = str(faculty.get('department', '')).upper()
-                faculty_year = str(faculty.get('year_to_teach', ''))
-                if (faculty_dept in [department.upper(), 'GENERAL', 'ALL'] and 
-                    (str(year) in faculty_year or faculty_year.upper() == 'ALL' or faculty_year == '')):
-                    qualified_faculty.append({
-                        'name': faculty_name,
-                        'max_load_hours': faculty.get('max_load_hours', 20),
-                        'unavailable_slots': self.parse_unavailable_slots(faculty.get('unavailable_slots', ''))
-                    })
-        
+        qualified_faculty = self.faculty_index.qualified(self.subject_keywords(subject_name), department, year)
         return qualified_faculty or [{
             'name': faculty['name'],
             'max_load_hours': 20,
-            'unavailable_slots': []
-        } for _, faculty in self.faculty_df.head(2).iterrows()]
+            'unavailable_mask': 0,
+            'preferred_mask': 0
+        } for faculty in self.faculty_index.records[:2]]
     
-    def is_faculty_available(self, faculty_name, day, time_slot, faculty_schedule):
-        return faculty_schedule.get(faculty_name, {}).get(day, {}).get(time_slot) is None
+    def slot_mask(self, slots):
+        mask = 0
+        for day, time_slot in slots:
+            day_idx, slot_idx = self.SLOT_GRID.day_index(day), self.SLOT_GRID.slot_index(time_slot)
+            if day_idx is not None and slot_idx is not None:
+                mask |= self.SLOT_GRID.bit(day_idx, slot_idx)
+        return mask
     
-    def is_room_available(self, room_name, day, time_slot, room_schedule):
-        return room_schedule.get(room_name, {}).get(day, {}).get(time_slot) is None
+    def build_occupancy_grid(self, sections, subject_requirements):
+        faculty_names = self.faculty_df['name'].tolist()
+        room_names = self.room_df['room_name'].tolist()
+        for _, faculty_list, rooms in subject_requirements.values():
+            faculty_names.extend(f['name'] for f in faculty_list)
+            room_names.extend(rooms)
+        room_capacity = dict(zip(self.room_df['room_name'], pd.to_numeric(self.room_df['capacity'], errors='coerce')))
+        return OccupancyGrid(list(dict.fromkeys(faculty_names)), list(dict.fromkeys(room_names)),
+                             sections, len(self.TIME_SLOTS), room_capacity)
     
-    def assign_class(self, subject_name, contact_hours, faculty_list, rooms, 
-                    section, day, time_slot, faculty_schedule, room_schedule, 
-                    faculty_workload, section_schedule):
-        available_faculty = [
-            f for f in faculty_list
-            if self.is_faculty_available(f['name'], day, time_slot, faculty_schedule) and
-            (day, time_slot) not in f['unavailable_slots'] and
-            faculty_workload.get(f['name'], 0) < f['max_load_hours']
-        ]
-        if not available_faculty:
+    def index_requirements(self, subject_requirements, grid):
+        indexed = {}
+        for subject_name, (contact_hours, faculty_list, rooms) in subject_requirements.items():
+            faculty = (
+                np.array([grid.faculty_ids[f['name']] for f in faculty_list], dtype=np.intp),
+                np.array([f['max_load_hours'] for f in faculty_list], dtype=np.int32),
+                np.array([f['unavailable_mask'] for f in faculty_list], dtype=np.uint64),
+                np.array([f['preferred_mask'] for f in faculty_list], dtype=np.uint64),
+            )
+            room_ids = np.array([grid.room_ids[room] for room in rooms], dtype=np.intp)
+            indexed[subject_name] = (contact_hours, faculty, room_ids)
+        return indexed
+    
+    def assign_class(self, subject_name, faculty, room_ids, section, day_idx, slot_idx,
+                    grid, section_schedules, rng=random):
+        bit = grid.bit(day_idx, slot_idx)
+        faculty_ids, max_load, unavailable, preferred = faculty
+        available_faculty = grid.free_faculty(faculty_ids, max_load, unavailable, bit, preferred)
+        if not available_faculty.size:
             return False
         
-        chosen_faculty = random.choice(available_faculty)
-        faculty_name = chosen_faculty['name']
-        available_rooms = [room for room in rooms if self.is_room_available(room, day, time_slot, room_schedule)]
-        if not available_rooms:
+        chosen_faculty = rng.choice(available_faculty)
+        available_rooms = grid.free_rooms(room_ids, bit)
+        if not available_rooms.size:
             return False
         
-        chosen_room = random.choice(available_rooms)
+        chosen_room = rng.choice(available_rooms)
         
-        faculty_schedule.setdefault(faculty_name, {}).setdefault(day, {})[time_slot] = f"{subject_name} - {section}"
-        room_schedule.setdefault(chosen_room, {}).setdefault(day, {})[time_slot] = f"{subject_name} - {section}"
-        faculty_workload[faculty_name] = faculty_workload.get(faculty_name, 0) + 1
-        section_schedule.setdefault(section, {}).setdefault(day, {})[time_slot] = {
+        grid.book(chosen_faculty, chosen_room, grid.section_ids[section], bit)
+        section_schedules[section][self.DAYS[day_idx]][self.TIME_SLOTS[slot_idx]] = {
             'subject': subject_name,
-            'faculty': faculty_name,
-            'room': chosen_room
+            'faculty': grid.faculty_names[chosen_faculty],
+            'room': grid.room_names[chosen_room]
         }
         return True
     
-    def distribute_classes(self, subject_requirements, sections, faculty_schedule, 
-                         room_schedule, faculty_workload, section_schedules):
+    def distribute_classes(self, subject_requirements, sections, grid, section_schedules, rng=random,
+                           deadline=None):
+        """Greedy placement, subject by subject. Returns None (abandoned) once the
+        wall-clock ``deadline`` (time.time()) passes."""
         assignments_made = {f"{subject_name}-{section}": 0 
                           for subject_name in subject_requirements for section in sections}
+        teaching_slots = self.SLOT_GRID.teaching_slots
         
-        for subject_name, (contact_hours, faculty_list, rooms) in subject_requirements.items():
+        for subject_name, (contact_hours, faculty, room_ids) in subject_requirements.items():
+            if deadline is not None and time.time() >= deadline:
+                return None
             total_hours = sum(contact_hours.values())
             for section in sections:
+                section_id = grid.section_ids[section]
                 hours_assigned = 0
-                for day in self.DAYS:
+                for day_idx in range(len(self.DAYS)):
                     if hours_assigned >= total_hours:
                         break
-                    for time_slot in [t for t in self.TIME_SLOTS if t != "12-1"]:
-                        if section_schedules[section][day].get(time_slot):
+                    for slot_idx in teaching_slots:
+                        if not grid.is_section_free(section_id, grid.bit(day_idx, slot_idx)):
                             continue
-                        if self.assign_class(subject_name, contact_hours, faculty_list, rooms, 
-                                          section, day, time_slot, faculty_schedule, 
-                                          room_schedule, faculty_workload, section_schedules):
+                        if self.assign_class(subject_name, faculty, room_ids, section, day_idx,
+                                             slot_idx, grid, section_schedules, rng):
                             assignments_made[f"{subject_name}-{section}"] += 1
                             hours_assigned += 1
                             if hours_assigned >= total_hours:
                                 break
         return section_schedules
     
-    def export_to_csv(self, section_schedules, sem):
-        output_dir = 'backend-rp/data/output/'
-        os.makedirs(output_dir, exist_ok=True)
+    def score_routine(self, subject_requirements, section_schedules, grid, student_count):
+        """Lower is better: (unmet contact hours, faculty load spread, room capacity misfit)."""
+        assigned = {}
+        misfit = 0.0
+        for section, days in section_schedules.items():
+            for slots in days.values():
+                for slot_info in slots.values():
+                    key = (slot_info['subject'], section)
+                    assigned[key] = assigned.get(key, 0) + 1
+                    capacity = grid.room_capacity[grid.room_ids[slot_info['room']]]
+                    if not np.isnan(capacity):
+                        misfit += abs(capacity - student_count) / max(student_count, 1)
+        unmet = sum(
+            max(0, sum(contact_hours.values()) - assigned.get((subject_name, section), 0))
+            for subject_name, (contact_hours, _, _) in subject_requirements.items()
+            for section in section_schedules
+        )
+        loads = grid.faculty_load[grid.faculty_load > 0]
+        spread = float(loads.std()) if loads.size else 0.0
+        return (unmet, round(spread, 4), round(float(misfit), 4))
+    
+    def run_pass(self, subject_requirements, sections, grid_template, student_count, seed, deadline=None):
+        """One seeded greedy pass. Subjects needing the most hours go first; the seed
+        breaks ties and drives every faculty/room choice, so a pass is reproducible.
+        Returns None if the pass is abandoned at ``deadline``."""
+        rng = random.Random(seed)
+        order = list(subject_requirements)
+        rng.shuffle(order)
+        order.sort(key=lambda name: -sum(subject_requirements[name][0].values()))
+        ordered = {name: subject_requirements[name] for name in order}
         
-        for section in sorted(section_schedules.keys()):
-            timetable_data = []
-            for time_slot in self.TIME_SLOTS:
-                row = {'Time': time_slot}
-                for day in self.DAYS:
-                    slot_info = section_schedules[section][day].get(time_slot)
-                    if time_slot == "12-1":
-                        row[day] = "BREAK"
-                    elif slot_info:
-                        row[day] = f"{slot_info['subject']} by {slot_info['faculty']} in {slot_info['room']}"
-                    else:
-                        row[day] = "FREE"
-                timetable_data.append(row)
-            
-            timetable_df = pd.DataFrame(timetable_data)
-            timetable_df.to_csv(os.path.join(output_dir, f'timetable_section_{section}.csv'), index=False)
+        grid = copy.deepcopy(grid_template)
+        section_schedules = {section: {day: {} for day in self.DAYS} for section in sections}
+        if self.distribute_classes(ordered, sections, grid, section_schedules, rng, deadline) is None:
+            return None
+        score = self.score_routine(subject_requirements, section_schedules, grid, student_count)
+        return score, seed, section_schedules
+    
+    def search_routines(self, subject_requirements, sections, grid_template, student_count,
+                        seed=None, restarts=1, time_limit=None, workers=None):
+        """Run ``restarts`` seeded passes (in a process pool when there is more than one)
+        and return ``(score, seed, section_schedules)`` for the best pass finished in time.
+
+        Cancelling a future only drops queued passes, so with a ``time_limit`` every
+        pass but the first also gets it as a deadline and stops at its next subject
+        once it has passed; the first pass always finishes, so there is a result even
+        if nothing beat the limit. Without a time_limit all passes run to completion
+        (passes take milliseconds to a few seconds)."""
+        if seed is None:
+            seed = random.randrange(2**31)
+        seeds = [seed + i for i in range(max(1, restarts))]
+        if len(seeds) == 1:
+            return self.run_pass(subject_requirements, sections, grid_template, student_count, seeds[0])
+        
+        pool = get_routine_pool(workers)
+        deadline = time.time() + time_limit if time_limit is not None else None
+        futures = [pool.submit(_run_routine_pass, subject_requirements, sections, grid_template,
+                               student_count, pass_seed, None if i == 0 else deadline)
+                   for i, pass_seed in enumerate(seeds)]
+        done, pending = wait(futures, timeout=time_limit)
+        results = [result for result in (future.result() for future in done) if result is not None]
+        if not results:
+            results = [futures[0].result()]
+        for future in pending:
+            future.cancel()
+        return min(results, key=lambda result: (result[0], result[1]))
+    
+    
+    def build_routine_payload(self, section_schedules, dept, sem):
+        """Columnar routine in a single pass over section_schedules: one entry per
+        scheduled class as integer IDs into the string tables, plus the summary."""
+        sections = sorted(section_schedules)
+        tables = {'subjects': {}, 'faculty': {}, 'rooms': {}}
+        entries = {'section': [], 'day': [], 'slot': [], 'subject': [], 'faculty': [], 'room': []}
+        classes = [0] * len(sections)
+        subject_hours = {}
+        faculty_hours = {}
+        slot_ids = {time_slot: i for i, time_slot in enumerate(self.TIME_SLOTS)}
         
+        for section_id, section in enumerate(sections):
+            for day_id, day in enumerate(self.DAYS):
+                for time_slot, slot_info in section_schedules[section][day].items():
+                    subject_id = tables['subjects'].setdefault(slot_info['subject'], len(tables['subjects']))
+                    faculty_id = tables['faculty'].setdefault(slot_info['faculty'], len(tables['faculty']))
+                    room_id = tables['rooms'].setdefault(slot_info['room'], len(tables['rooms']))
+                    entries['section'].append(section_id)
+                    entries['day'].append(day_id)
+                    entries['slot'].append(slot_ids[time_slot])
+                    entries['subject'].append(subject_id)
+                    entries['faculty'].append(faculty_id)
+                    entries['room'].append(room_id)
+                    classes[section_id] += 1
+                    subject_hours[(section_id, subject_id)] = subject_hours.get((section_id, subject_id), 0) + 1
+                    faculty_hours[faculty_id] = faculty_hours.get(faculty_id, 0) + 1
+        
+        return {
+            'dept': dept,
+            'sem': str(sem),
+            'days': self.DAYS,
+            'time_slots': self.TIME_SLOTS,
+            'break_slot': self.BREAK_SLOT,
+            'sections': [str(section) for section in sections],
+            'subjects': list(tables['subjects']),
+            'faculty': list(tables['faculty']),
+            'rooms': list(tables['rooms']),
+            'entries': entries,
+            'summary': {
+                'classes': classes,
+                'subject_hours': {
+                    'section': [section_id for section_id, _ in subject_hours],
+                    'subject': [subject_id for _, subject_id in subject_hours],
+                    'hours': list(subject_hours.values()),
+                },
+                'faculty_hours': [faculty_hours[i] for i in range(len(tables['faculty']))],
+            },
+            'run': self.last_run,
+        }
+    
+    def section_grids(self, routine):
+        """Per-section {(day_id, slot_id): (subject, faculty, room)} lookups for the views."""
+        grids = [{} for _ in routine['sections']]
+        e = routine['entries']
+        for section_id, day_id, slot_id, subject_id, faculty_id, room_id in zip(
+                e['section'], e['day'], e['slot'], e['subject'], e['faculty'], e['room']):
+            grids[section_id][(day_id, slot_id)] = (
+                routine['subjects'][subject_id], routine['faculty'][faculty_id], routine['rooms'][room_id])
+        return grids
+    
+    def section_subject_hours(self, routine):
+        hours = [{} for _ in routine['sections']]
+        sh = routine['summary']['subject_hours']
+        for section_id, subject_id, count in zip(sh['section'], sh['subject'], sh['hours']):
+            hours[section_id][routine['subjects'][subject_id]] = count
+        return hours
+    
+    def section_rows(self, routine, grid):
+        for slot_id, time_slot in enumerate(self.TIME_SLOTS):
+            row = {'Time': time_slot}
+            for day_id, day in enumerate(self.DAYS):
+                slot_info = grid.get((day_id, slot_id))
+                if time_slot == routine['break_slot']:
+                    row[day] = "BREAK"
+                elif slot_info:
+                    row[day] = "{} by {} in {}".format(*slot_info)
+                else:
+                    row[day] = "FREE"
+            yield row
+    
+    def iter_csv(self, fieldnames, rows):
+        """Yield CSV text row by row so responses can stream without a temp file."""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.getvalue():
+            yield buffer.getvalue()
+    
+    def iter_section_csv(self, routine, section):
+        section_id = routine['sections'].index(section)
+        grid = self.section_grids(routine)[section_id]
+        return self.iter_csv(['Time'] + self.DAYS, self.section_rows(routine, grid))
+    
+    def iter_summary_csv(self, routine):
+        return self.iter_csv(SUMMARY_COLUMNS, self.summary_rows(routine))
+    
+    def export_zip(self, routine):
+        """Yield the zip bundle in chunks as its CSV entries are written, so the
+        whole archive is never held in memory."""
+        sink = _ChunkSink()
+        entries = [(f'timetable_section_{section}.csv', self.iter_section_csv(routine, section))
+                   for section in routine['sections']]
+        entries.append(('timetable_summary.csv', self.iter_summary_csv(routine)))
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as bundle:
+            for name, rows in entries:
+                with bundle.open(name, 'w') as entry:
+                    for text in rows:
+                        entry.write(text.encode('utf-8'))
+                        chunk = sink.drain()
+                        if chunk:
+                            yield chunk
+        yield sink.drain()
+    
+    def export_xlsx(self, routine, path):
+        """Write the workbook to ``path``; write_only streams rows to disk instead of
+        keeping cell objects."""
+        from openpyxl import Workbook
+        
+        workbook = Workbook(write_only=True)
+        for section, grid in zip(routine['sections'], self.section_grids(routine)):
+            sheet = workbook.create_sheet(f'Section {section}'[:31])
+            sheet.append(['Time'] + self.DAYS)
+            for row in self.section_rows(routine, grid):
+                sheet.append([row['Time']] + [row[day] for day in self.DAYS])
+        sheet = workbook.create_sheet('Summary')
+        sheet.append(SUMMARY_COLUMNS)
+        for row in self.summary_rows(routine):
+            sheet.append([row.get(column) for column in SUMMARY_COLUMNS])
+        workbook.save(path)
+    
+    def summary_rows(self, routine):
         summary_data = []
-        faculty_workload = {}
-        for section in sorted(section_schedules.keys()):
-            total_classes = 0
-            subject_count = {}
-            for day in self.DAYS:
-                for time_slot in self.TIME_SLOTS:
-                    if time_slot == "12-1":
-                        continue
-                    slot_info = section_schedules[section][day].get(time_slot)
-                    if slot_info:
-                        total_classes += 1
-                        subject = slot_info['subject']
-                        faculty = slot_info['faculty']
-                        subject_count[subject] = subject_count.get(subject, 0) + 1
-                        faculty_workload[faculty] = faculty_workload.get(faculty, 0) + 1
-            
-            summary_data.append({'Section': section, 'Total Classes': total_classes})
-            for subject, count in sorted(subject_count.items()):
+        subject_hours = self.section_subject_hours(routine)
+        for section_id, section in enumerate(routine['sections']):
+            summary_data.append({'Section': section, 'Total Classes': routine['summary']['classes'][section_id]})
+            for subject, count in sorted(subject_hours[section_id].items()):
                 summary_data.append({'Section': '', 'Subject': subject, 'Hours/Week': count})
         
-        for faculty, hours in sorted(faculty_workload.items()):
+        for faculty, hours in sorted(zip(routine['faculty'], routine['summary']['faculty_hours'])):
             summary_data.append({'Section': '', 'Faculty': faculty, 'Workload (Hours/Week)': hours})
-        
-        summary_df = pd.DataFrame(summary_data)
-        summary_df.to_csv(os.path.join(output_dir, 'timetable_summary.csv'), index=False)
+        return summary_data
     
-    def format_routine_output_table(self, section_schedules, sem):
+    def format_routine_output_table(self, routine):
+        def cell(text):
+            return text[:17] + "..." if len(text) > 17 else text
+        
         output = []
-        for section in sorted(section_schedules.keys()):
+        for section, grid in zip(routine['sections'], self.section_grids(routine)):
             output.append(f"\n{'='*100}")
-            output.append(f"ROUTINE FOR SECTION {section} - CSE {sem}th Semester")
+            output.append(f"ROUTINE FOR SECTION {section} - {routine['dept']} {routine['sem']}th Semester")
             output.append(f"{'='*100}")
             output.append(f"{'Time':<8}│{'Monday':<20}│{'Tuesday':<20}│{'Wednesday':<20}│{'Thursday':<20}│{'Friday':<20}")
             output.append("─" * 8 + "┼" + "─" * 20 + "┼" + "─" * 20 + "┼" + "─" * 20 + "┼" + "─" * 20 + "┼" + "─" * 20)
             
-            for time_slot in self.TIME_SLOTS:
-                if time_slot == "12-1":
-                    output.append(f"{'12-1':<8}│{'BREAK':<20}│{'BREAK':<20}│{'BREAK':<20}│{'BREAK':<20}│{'BREAK':<20}")
+            for slot_id, time_slot in enumerate(self.TIME_SLOTS):
+                if time_slot == routine['break_slot']:
+                    output.append(f"{time_slot:<8}│{'BREAK':<20}│{'BREAK':<20}│{'BREAK':<20}│{'BREAK':<20}│{'BREAK':<20}")
                 else:
                     lines = ["", "", ""]
-                    for day in self.DAYS:
-                        slot_info = section_schedules[section][day].get(time_slot)
+                    for day_id in range(len(self.DAYS)):
+                        slot_info = grid.get((day_id, slot_id))
                         if slot_info:
-                            subject = slot_info['subject'][:17] + "..." if len(slot_info['subject']) > 17 else slot_info['subject']
-                            faculty = slot_info['faculty'][:17] + "..." if len(slot_info['faculty']) > 17 else slot_info['faculty'] 
-                            room = slot_info['room'][:17] + "..." if len(slot_info['room']) > 17 else slot_info['room']
-                            lines[0] += f"│{subject:<20}"
-                            lines[1] += f"│{faculty:<20}"
-                            lines[2] += f"│{room:<20}"
+                            subject, faculty, room = slot_info
+                            lines[0] += f"│{cell(subject):<20}"
+                            lines[1] += f"│{cell(faculty):<20}"
+                            lines[2] += f"│{cell(room):<20}"
                         else:
                             lines[0] += f"│{'FREE':<20}"
                             lines[1] += f"│{'':<20}"
@@ -376,35 +984,139 @@ class SmartRoutineGenerator:
         output.append("TIMETABLE SUMMARY")
         output.append(f"{'='*100}")
         
-        faculty_workload = {}
-        for section in sorted(section_schedules.keys()):
-            total_classes = 0
-            subject_count = {}
-            for day in self.DAYS:
-                for time_slot in self.TIME_SLOTS:
-                    if time_slot == "12-1":
-                        continue
-                    slot_info = section_schedules[section][day].get(time_slot)
-                    if slot_info:
-                        total_classes += 1
-                        subject = slot_info['subject']
-                        faculty = slot_info['faculty']
-                        subject_count[subject] = subject_count.get(subject, 0) + 1
-                        faculty_workload[faculty] = faculty_workload.get(faculty, 0) + 1
-            
-            output.append(f"\nSection {section}: {total_classes} classes scheduled")
-            for subject, count in sorted(subject_count.items()):
+        subject_hours = self.section_subject_hours(routine)
+        for section_id, section in enumerate(routine['sections']):
+            output.append(f"\nSection {section}: {routine['summary']['classes'][section_id]} classes scheduled")
+            for subject, count in sorted(subject_hours[section_id].items()):
                 output.append(f"  • {subject}: {count} hours/week")
         
+        run = routine.get('run')
+        if run:
+            passes = run['restarts']
+            output.append(f"\nSeed {run['seed']} (best of {passes} pass{'es' if passes > 1 else ''})")
+            if run['engine'] == 'cpsat':
+                output.append(f"Refined with CP-SAT ({run['status']})")
+            elif run.get('cpsat_status'):
+                output.append(f"CP-SAT ({run['cpsat_status']}) did not improve on the greedy routine")
+        
         output.append(f"\n{'-'*50}")
         output.append("FACULTY WORKLOAD DISTRIBUTION")
         output.append(f"{'-'*50}")
-        for faculty, hours in sorted(faculty_workload.items()):
+        for faculty, hours in sorted(zip(routine['faculty'], routine['summary']['faculty_hours'])):
             output.append(f"{faculty:<25}: {hours} hours/week")
         
         return "\n".join(output)
     
-    def generate_routine(self, dept, sem, contact_hours_dict):
+    def cpsat_budget(self, greedy_seconds, time_limit=None, workers=None):
+        """(time limit, worker count) for a CP-SAT refinement after a greedy run that
+        took ``greedy_seconds``; request values can only lower the caps."""
+        limit = min(CPSAT_MAX_TIME, max(CPSAT_MIN_TIME, greedy_seconds * CPSAT_TIME_FACTOR))
+        if time_limit is not None:
+            limit = min(limit, max(0.1, float(time_limit)))
+        return limit, max(1, min(int(workers or CPSAT_MAX_WORKERS), CPSAT_MAX_WORKERS))
+
+    def solve_cpsat(self, subject_requirements, sections, grid_template, hint=None,
+                    time_limit=CPSAT_MAX_TIME, workers=CPSAT_MAX_WORKERS):
+        """Section-aware CP-SAT model over the same requirements as the greedy passes.
+        Maximises scheduled contact hours subject to section, faculty and room clashes,
+        faculty load limits, unavailable slots and the break slot. ``hint`` is a
+        section_schedules dict used as the starting solution. Returns
+        ``(section_schedules, grid, status_name)``, or None if nothing was found in time."""
+        model = cp_model.CpModel()
+        slots_per_day = len(self.TIME_SLOTS)
+        teaching = [(d, t) for d in range(len(self.DAYS)) for t in self.SLOT_GRID.teaching_slots]
+        
+        placements = {}
+        section_slot_vars = {}
+        faculty_slot_vars = {}
+        room_slot_vars = {}
+        faculty_vars = {}
+        faculty_limit = {}
+        scheduled = []
+        for subject_name, (contact_hours, (faculty_ids, max_load, unavailable, _), room_ids) in subject_requirements.items():
+            hours = sum(contact_hours.values())
+            candidates = {}
+            for f, limit, mask in zip(faculty_ids.tolist(), max_load.tolist(), unavailable.tolist()):
+                candidates.setdefault(f, mask)
+                faculty_limit[f] = max(faculty_limit.get(f, 0), limit)
+            rooms = list(dict.fromkeys(room_ids.tolist()))
+            for section in sections:
+                subject_slots = []
+                for d, t in teaching:
+                    bit = 1 << (d * slots_per_day + t)
+                    free = [f for f, mask in candidates.items() if not mask & bit]
+                    if not free or not rooms or not hours:
+                        continue
+                    occupied = model.NewBoolVar('')
+                    fvars = [(f, model.NewBoolVar('')) for f in free]
+                    rvars = [(r, model.NewBoolVar('')) for r in rooms]
+                    model.Add(sum(var for _, var in fvars) == occupied)
+                    model.Add(sum(var for _, var in rvars) == occupied)
+                    placements[(subject_name, section, d, t)] = (occupied, fvars, rvars)
+                    section_slot_vars.setdefault((section, d, t), []).append(occupied)
+                    for f, var in fvars:
+                        faculty_slot_vars.setdefault((f, d, t), []).append(var)
+                        faculty_vars.setdefault(f, []).append(var)
+                    for r, var in rvars:
+                        room_slot_vars.setdefault((r, d, t), []).append(var)
+                    subject_slots.append(occupied)
+                if subject_slots:
+                    model.Add(sum(subject_slots) <= hours)
+                    scheduled.extend(subject_slots)
+        
+        for group in (section_slot_vars, faculty_slot_vars, room_slot_vars):
+            for variables in group.values():
+                if len(variables) > 1:
+                    model.AddAtMostOne(variables)
+        for f, variables in faculty_vars.items():
+            model.Add(sum(variables) <= int(faculty_limit[f]))
+        model.Maximize(sum(scheduled))
+        
+        if hint:
+            for (subject_name, section, d, t), (occupied, fvars, rvars) in placements.items():
+                slot_info = hint[section][self.DAYS[d]].get(self.TIME_SLOTS[t])
+                used = bool(slot_info) and slot_info['subject'] == subject_name
+                model.AddHint(occupied, used)
+                for f, var in fvars:
+                    model.AddHint(var, used and grid_template.faculty_names[f] == slot_info['faculty'])
+                for r, var in rvars:
+                    model.AddHint(var, used and grid_template.room_names[r] == slot_info['room'])
+        
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = float(time_limit)
+        solver.parameters.num_workers = workers
+        # Symmetry detection and probing can eat the whole budget on these highly
+        # symmetric room/faculty models before the greedy hint is ever used.
+        solver.parameters.symmetry_level = 0
+        solver.parameters.cp_model_probing_level = 0
+        status = solver.Solve(model)
+        proto = model.Proto()
+        metrics.inc("rag_cpsat_solves_total", status=solver.StatusName(status))
+        metrics.set("rag_cpsat_variables", len(proto.variables))
+        metrics.set("rag_cpsat_constraints", len(proto.constraints))
+        metrics.set("rag_cpsat_conflicts", solver.NumConflicts())
+        metrics.set("rag_cpsat_branches", solver.NumBranches())
+        metrics.set("rag_cpsat_wall_time", solver.WallTime())
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return None
+        
+        grid = copy.deepcopy(grid_template)
+        section_schedules = {section: {day: {} for day in self.DAYS} for section in sections}
+        for (subject_name, section, d, t), (occupied, fvars, rvars) in placements.items():
+            if not solver.BooleanValue(occupied):
+                continue
+            f = next(f for f, var in fvars if solver.BooleanValue(var))
+            r = next(r for r, var in rvars if solver.BooleanValue(var))
+            grid.book(f, r, grid.section_ids[section], grid.bit(d, t))
+            section_schedules[section][self.DAYS[d]][self.TIME_SLOTS[t]] = {
+                'subject': subject_name,
+                'faculty': grid.faculty_names[f],
+                'room': grid.room_names[r]
+            }
+        return section_schedules, grid, solver.StatusName(status)
+    
+    def generate_routine(self, dept, sem, contact_hours_dict, seed=None, restarts=1, time_limit=None,
+                         engine="greedy", cpsat_time_limit=None, cpsat_workers=None):
         try:
             year = int(sem)
             sections_data = self.student_df[
@@ -417,10 +1129,6 @@ class SmartRoutineGenerator:
                 return f"No sections found for {dept} Year {year}"
             
             sections = sections_data['section'].tolist()
-            faculty_schedule = {}
-            room_schedule = {}
-            faculty_workload = {}
-            section_schedules = {section: {day: {} for day in self.DAYS} for section in sections}
             
             student_count = sections_data.iloc[0].get('total_number_of_students', 
                                                    sections_data.iloc[0].get('total_students', 50))
@@ -436,106 +1144,309 @@ class SmartRoutineGenerator:
                 print(f"[ERROR] No valid subjects to schedule")
                 return "No valid subjects to schedule"
             
-            section_schedules = self.distribute_classes(subject_requirements, sections, 
-                                                     faculty_schedule, room_schedule, 
-                                                     faculty_workload, section_schedules)
+            grid = self.build_occupancy_grid(sections, subject_requirements)
+            indexed_requirements = self.index_requirements(subject_requirements, grid)
+            started = time.perf_counter()
+            score, seed, section_schedules = self.search_routines(
+                indexed_requirements, sections, grid, student_count,
+                seed=seed, restarts=restarts, time_limit=time_limit)
+            greedy_seconds = time.perf_counter() - started
+            self.last_run = {'engine': 'greedy', 'seed': seed, 'restarts': max(1, restarts), 'score': list(score)}
             
-            self.export_to_csv(section_schedules, sem)
+            if engine == "cpsat":
+                if cp_model is None:
+                    print("[WARN] ortools is not installed; falling back to the greedy engine")
+                elif score[0] == 0:
+                    # Every contact hour is placed: CP-SAT maximises nothing else
+                    self.last_run.update(cpsat_status='SKIPPED')
+                else:
+                    limit, workers = self.cpsat_budget(greedy_seconds, cpsat_time_limit, cpsat_workers)
+                    solved = self.solve_cpsat(indexed_requirements, sections, grid, hint=section_schedules,
+                                              time_limit=limit, workers=workers)
+                    self.last_run.update(cpsat_status=solved[2] if solved else 'UNKNOWN', cpsat_time_limit=limit)
+                    if solved is not None:
+                        cpsat_schedules, solved_grid, status = solved
+                        cpsat_score = self.score_routine(indexed_requirements, cpsat_schedules,
+                                                         solved_grid, student_count)
+                        # Keep the greedy routine unless CP-SAT actually improved on it
+                        if cpsat_score < score:
+                            section_schedules, score = cpsat_schedules, cpsat_score
+                            self.last_run.update(engine='cpsat', status=status, score=list(score))
             
-            return self.format_routine_output_table(section_schedules, sem)
+            return self.build_routine_payload(section_schedules, dept, sem)
         except Exception as e:
             print(f"[ERROR] Error in generate_routine: {e}")
             return f"Failed to generate routine: {e}"
 
-# Function to get subjects
-def get_subjects(dept, sem, data_dir):
-    cse_file = os.path.join(data_dir, 'CSE_Syllabus_Complete.xlsx')
-    ece_file = os.path.join(data_dir, 'ECE_Syllabus_Final.xlsx')
-    it_file = os.path.join(data_dir, 'IT_Complete_Syllabus.xlsx')
+# Syllabus subject index
+# Parsing the Excel workbooks is slow, so the dept -> sem -> subjects catalogue is
+# compiled once, pickled next to the workbooks and kept in memory. The index is
+# rebuilt only when a workbook's mtime/size changes and its content hash differs.
+SYLLABUS_FILES = {
+    'CSE': 'CSE_Syllabus_Complete.xlsx',
+    'ECE': 'ECE_Syllabus_Final.xlsx',
+    'IT': 'IT_Complete_Syllabus.xlsx',
+}
+SUBJECT_INDEX_FILE = '.subject_index.pkl'
+SUBJECT_INDEX_FORMAT = 1
+
+_subject_indexes = {}
+_subject_index_lock = threading.Lock()
+
+def _file_digest(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _syllabus_stats(data_dir):
+    stats = {}
+    for dept, name in SYLLABUS_FILES.items():
+        st = os.stat(os.path.join(data_dir, name))
+        stats[dept] = (st.st_mtime_ns, st.st_size)
+    return stats
+
+def _parse_syllabus(df):
+    semesters = pd.to_numeric(df['Semester'], errors='coerce')
+    if 'Subject (with Paper Code)' in df.columns:
+        subjects = df['Subject (with Paper Code)']
+        if 'Subject' in df.columns:
+            subjects = subjects.fillna(df['Subject'])
+    elif 'Subject' in df.columns:
+        subjects = df['Subject']
+    else:
+        return {}
+    mask = semesters.notna() & subjects.notna()
+    subjects = subjects[mask].astype(str).str.replace(r'\s+', ' ', regex=True).str.strip()
 
-    def load_df(file_path, dept):
-        df = pd.read_excel(file_path)
-        df['Department'] = dept
-        df['Semester'] = pd.to_numeric(df['Semester'], errors='coerce')
-        df = df.dropna(subset=['Semester'])
-        return df
+    data = {}
+    for sem, subject in zip(semesters[mask].astype(int), subjects):
+        if subject:
+            data.setdefault(sem, {})[subject] = None
+    return {sem: tuple(names) for sem, names in data.items()}
 
+def build_subject_index(data_dir):
+    stats = _syllabus_stats(data_dir)
+    digests = {}
+    subjects = {}
+    for dept, name in SYLLABUS_FILES.items():
+        file_path = os.path.join(data_dir, name)
+        digests[dept] = _file_digest(file_path)
+        subjects[dept] = _parse_syllabus(pd.read_excel(file_path))
+    version = hashlib.sha256(
+        '|'.join(f"{dept}:{digests[dept]}" for dept in sorted(digests)).encode()
+    ).hexdigest()[:16]
+    return {
+        'format': SUBJECT_INDEX_FORMAT,
+        'stats': stats,
+        'digests': digests,
+        'version': version,
+        'subjects': subjects,
+    }
+
+def _read_index_file(index_path):
+    try:
+        with open(index_path, 'rb') as f:
+            index = pickle.load(f)
+        if isinstance(index, dict) and index.get('format') == SUBJECT_INDEX_FORMAT:
+            return index
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"[INDEX] Ignoring unreadable subject index: {e}")
+    return None
+
+def _write_index_file(index_path, index):
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        print(f"[INDEX] Could not persist subject index: {e}")
+
+def _index_is_current(index, data_dir, stats):
+    if index['stats'] == stats:
+        return True
+    # mtime/size moved (e.g. the file was touched or copied); fall back to content hashes
+    for dept, name in SYLLABUS_FILES.items():
+        if index['stats'].get(dept) != stats[dept] and \
+                index['digests'].get(dept) != _file_digest(os.path.join(data_dir, name)):
+            return False
+    index['stats'] = stats
+    return True
+
+def load_subject_index(data_dir):
+    key = os.path.abspath(data_dir)
+    stats = _syllabus_stats(data_dir)
+    index = _subject_indexes.get(key)
+    if index is not None and index['stats'] == stats:
+        return index
+
+    with _subject_index_lock:
+        index = _subject_indexes.get(key)
+        if index is not None and _index_is_current(index, data_dir, stats):
+            return index
+
+        index_path = os.path.join(data_dir, SUBJECT_INDEX_FILE)
+        index = _read_index_file(index_path)
+        refreshed = index is not None and index['stats'] != stats
+        if index is None or not _index_is_current(index, data_dir, stats):
+            index = build_subject_index(data_dir)
+            _write_index_file(index_path, index)
+        elif refreshed:
+            _write_index_file(index_path, index)
+        _subject_indexes[key] = index
+        return index
+
+# Function to get subjects
+def get_subjects(dept, sem, data_dir):
     try:
-        cse_df = load_df(cse_file, 'CSE')
-        ece_df = load_df(ece_file, 'ECE')
-        it_df = load_df(it_file, 'IT')
+        index = load_subject_index(data_dir)
     except Exception as e:
         print(f"[ERROR] Failed to load syllabus files: {e}")
         return []
 
-    all_df = pd.concat([cse_df, ece_df, it_df], ignore_index=True)
-
-    def parse_data(df):
-        data = {}
-        for _, row in df.iterrows():
-            sem = int(row['Semester'])
-            if 'Subject (with Paper Code)' in df.columns and pd.notna(row.get('Subject (with Paper Code)', None)):
-                subject = row['Subject (with Paper Code)']
-            elif 'Subject' in df.columns and pd.notna(row.get('Subject', None)):
-                subject = row['Subject']
-            else:
-                continue
-            dept = row['Department']
-            if pd.isna(subject):
-                continue
-            subject = re.sub(r'\s+', ' ', str(subject)).strip()
-            if not subject:
-                continue
-            if dept not in data:
-                data[dept] = {}
-            if sem not in data[dept]:
-                data[dept][sem] = []
-            if subject not in data[dept][sem]:
-                data[dept][sem].append(subject)
-        return data
-
-    all_data = parse_data(all_df)
     dept = dept.upper()
     try:
         sem = int(sem)
     except ValueError:
         print(f"[ERROR] Invalid semester: {sem}")
         return []
-    if dept in all_data and sem in all_data[dept]:
-        return all_data[dept][sem]
-    return []
+    return list(index['subjects'].get(dept, {}).get(sem, ()))
+
+# Generation cache
+# A seeded routine is fully determined by dept, sem, the college CSVs, the syllabus
+# index version, the RAG index version (which fixes the contact-hour answers) and
+# the scheduling parameters, so identical requests are served from the cache
+# (memory, then disk) and concurrent ones share a single computation. Unseeded
+# runs differ every time and are never cached.
+# Data paths are anchored to this file so the service works from any working directory.
+DATA_DIR = Path(__file__).resolve().parent / 'data'
+SYLLABUS_DATA_DIR = str(DATA_DIR / 'syllabus-data-new') + os.sep
+RAG_DIR = str(DATA_DIR / 'full-final-rag-nep' / 'MAKAUT_Syllabus')
+COLLEGE_DATA_DIR = str(DATA_DIR / 'college-data') + os.sep
+
+generation_cache = GenerationCache(
+    max_entries=int(os.getenv("GENERATION_CACHE_SIZE", "64")),
+    cache_dir=os.getenv("GENERATION_CACHE_DIR", str(DATA_DIR / 'cache')) or None,
+    max_disk_entries=int(os.getenv("GENERATION_CACHE_DISK_ENTRIES", "256")) or None,
+    max_disk_bytes=int(os.getenv("GENERATION_CACHE_DISK_BYTES", str(256 * 1024 * 1024))) or None,
+)
+
+# Content digest per college data file, replaced when the file's mtime or size
+# changes, so the memo holds one entry per file
+_content_digests = {}
+
+def content_digest(file_path):
+    st = os.stat(file_path)
+    path, stamp = os.path.abspath(file_path), (st.st_mtime_ns, st.st_size)
+    cached = _content_digests.get(path)
+    if cached is None or cached[0] != stamp:
+        cached = _content_digests[path] = (stamp, _file_digest(file_path))
+    return cached[1]
+
+def college_data_files(college_data_dir=COLLEGE_DATA_DIR):
+    return (os.path.join(college_data_dir, 'faculty_assignments.csv'),
+            os.path.join(college_data_dir, 'room_assignments.csv'),
+            os.path.join(college_data_dir, 'student_sections.csv'))
+
+def generation_key(dept, sem, seed=None, restarts=1, engine="greedy", cpsat_time_limit=None, cpsat_workers=None):
+    faculty_file, room_file, student_file = college_data_files()
+    if engine != "cpsat":
+        cpsat_time_limit = cpsat_workers = None
+    return make_cache_key(
+        dept=dept, sem=str(sem), seed=seed, restarts=restarts, engine=engine,
+        cpsat_time_limit=cpsat_time_limit, cpsat_workers=cpsat_workers,
+        faculty=content_digest(faculty_file),
+        rooms=content_digest(room_file),
+        students=content_digest(student_file),
+        syllabus=load_subject_index(SYLLABUS_DATA_DIR)['version'],
+        rag=rag_index_version(RAG_DIR),
+    )
 
 # Main generation function
-def generate_timetable(dept, sem):
-    data_dir = 'backend-rp/data/syllabus-data-new/'
-    rag_dir = 'backend-rp/data/full-final-rag-nep/MAKAUT_Syllabus'
-    college_data_dir = 'backend-rp/data/college-data/'
+# ``progress(stage, done, total)`` is called at each pipeline stage (see jobs.STAGES);
+# background jobs pass a callback that raises JobCancelled to stop the run.
+def _no_progress(stage, done=0, total=1):
+    pass
 
-    query_results = get_subjects(dept, sem, data_dir)
+def generate_timetable(dept, sem, seed=None, restarts=1, engine="greedy", progress=None,
+                       cpsat_time_limit=None, cpsat_workers=None):
+    progress = progress or _no_progress
+    if not all(os.path.exists(f) for f in college_data_files()):
+        print(f"[ERROR] One or more data files missing")
+        return "Required data files are missing"
+
+    def compute():
+        routine = run_generation(dept, sem, seed=seed, restarts=restarts, engine=engine, progress=progress,
+                                 cpsat_time_limit=cpsat_time_limit, cpsat_workers=cpsat_workers)
+        if isinstance(routine, dict):
+            remember_routine(routine)
+        return routine
+
+    key = None
+    if seed is not None:
+        try:
+            key = generation_key(dept, sem, seed=seed, restarts=restarts, engine=engine,
+                                 cpsat_time_limit=cpsat_time_limit, cpsat_workers=cpsat_workers)
+        except Exception as e:
+            print(f"[CACHE] Could not compute generation key, bypassing cache: {e}")
+    if key is None:
+        return compute()
+
+    while True:
+        try:
+            routine = generation_cache.get_or_compute(key, compute, cacheable=lambda r: isinstance(r, dict))
+            break
+        except JobCancelled:
+            # Raised either for this run or for the run we were sharing; in the
+            # latter case progress() returns and we compute it ourselves.
+            progress("scheduling")
+    if isinstance(routine, dict):
+        progress("export")
+        with metrics.span("rag_generate", "export"):
+            remember_routine(routine)
+    return routine
+
+def run_generation(dept, sem, seed=None, restarts=1, engine="greedy", progress=_no_progress,
+                   cpsat_time_limit=None, cpsat_workers=None):
+    spans = metrics.spans("rag_generate")
+    progress("subjects")
+    query_results = get_subjects(dept, sem, SYLLABUS_DATA_DIR)
+    spans.mark("load_subjects")
     if not query_results:
         return "No subjects found"
 
-    vs = build_vectorstore(rag_dir)
-    rag_chain = build_rag_chain(vs)
+    progress("index")
+    index_version = rag_index_version(RAG_DIR)
+    answer_cache.set_version(index_version)
+    queries = {subject: f"Contact hours/week of {subject}" for subject in query_results}
+    if not all(answer_cache.contains(query) for query in queries.values()):
+        get_rag_chain(RAG_DIR, index_version)
+    spans.mark("index")
 
     contact_hours_dict = {}
-    for subject in query_results:
-        query = f"Contact hours/week of {subject}"
-        response = rag_query(rag_chain, query)
-        contact_hours = extract_contact_hours(response.get('result', '') if isinstance(response, dict) else response)
+    for done, (subject, query) in enumerate(queries.items()):
+        progress("contact_hours", done, len(queries))
+        response = cached_rag_query(RAG_DIR, query, version=index_version)
+        contact_hours = extract_contact_hours(response['result'])
         contact_hours_dict[subject] = contact_hours if contact_hours else "Unknown"
+    # retrieve / llm spans are recorded per query inside rag_query
+    spans.skip()
 
+    progress("scheduling")
     generator = SmartRoutineGenerator()
-    faculty_file = os.path.join(college_data_dir, 'faculty_assignments.csv')
-    room_file = os.path.join(college_data_dir, 'room_assignments.csv')
-    student_file = os.path.join(college_data_dir, 'student_sections.csv')
-
-    if not os.path.exists(faculty_file) or not os.path.exists(room_file) or not os.path.exists(student_file):
-        print(f"[ERROR] One or more data files missing")
-        return "Required data files are missing"
+    faculty_file, room_file, student_file = college_data_files()
 
-    if generator.load_data(faculty_file, room_file, student_file):
-        routine = generator.generate_routine(dept, sem, contact_hours_dict)
+    loaded = generator.load_data(faculty_file, room_file, student_file)
+    spans.mark("load_college")
+    if loaded:
+        routine = generator.generate_routine(dept, sem, contact_hours_dict, seed=seed, restarts=restarts,
+                                             engine=engine, cpsat_time_limit=cpsat_time_limit,
+                                             cpsat_workers=cpsat_workers)
+        spans.mark("schedule")
         return routine
     else:
-        return "Failed to load data"
\ No newline at end of file
+        return "Failed to load data"
@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# backend-rp is a flat set of modules run from its own directory, so the tests
+# import them the same way. Run from backend-rp/:
+#   python -m pytest tests
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import rag_utils  # noqa: E402
+
+DEPT = "CSE"
+YEAR = 2
+CONTACT_HOURS = {
+    "Operating Systems": "3L+1T",
+    "Database Management Systems": "3L",
+    "Software Engineering": "3L",
+    "Database Management Systems Lab": "2P",
+}
+
+
+@pytest.fixture
+def generator():
+    """A generator loaded with the college CSVs shipped in data/college-data."""
+    generator = rag_utils.SmartRoutineGenerator()
+    assert generator.load_data(*rag_utils.college_data_files())
+    return generator
+
+
+@pytest.fixture
+def problem(generator):
+    """Indexed requirements for CSE year 2: (requirements, sections, grid, student_count)."""
+    sections = generator.student_df[(generator.student_df["department"] == DEPT)
+                                    & (generator.student_df["year"] == YEAR)]["section"].tolist()
+    requirements = {
+        subject: (generator.parse_contact_hours(hours),
+                  generator.get_qualified_faculty(subject, DEPT, YEAR),
+                  generator.get_suitable_rooms(subject, DEPT, 60))
+        for subject, hours in CONTACT_HOURS.items()
+    }
+    grid = generator.build_occupancy_grid(sections, requirements)
+    return generator.index_requirements(requirements, grid), sections, grid, 60
+
+
+@pytest.fixture
+def routine(generator):
+    """A seeded CSE year 2 routine in the columnar payload format."""
+    return generator.generate_routine(DEPT, YEAR, CONTACT_HOURS, seed=1)
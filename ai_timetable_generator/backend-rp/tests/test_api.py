@@ -0,0 +1,71 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from generation_cache import GenerationCache
+from jobs import JobManager
+
+ROUTINE = {"generation_id": "g1", "dept": "CSE", "sem": "3", "sections": ["A"]}
+PARAMS = {"dept": "CSE", "sem": "3", "seed": 0}
+
+
+def fake_key(dept, sem, seed=None, **params):
+    return f"{dept}-{sem}-{seed}"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    runs = []
+
+    def run(progress, **params):
+        runs.append(params)
+        return dict(ROUTINE)
+
+    monkeypatch.setattr(main, "generation_key", fake_key)
+    monkeypatch.setattr(main, "generation_cache", GenerationCache())
+    monkeypatch.setattr(main, "jobs", JobManager(run, workers=1))
+    client = TestClient(main.app)
+    client.runs = runs
+    return client
+
+
+def test_cached_routine_is_a_404_until_generated(client):
+    assert client.get("/routines/cached", params=PARAMS).status_code == 404
+    assert client.runs == []
+
+
+def test_cached_routine_is_served_with_its_etag(client):
+    main.generation_cache.put("CSE-3-0", ROUTINE)
+    response = client.get("/routines/cached", params=PARAMS)
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"CSE-3-0"'
+    assert response.json() == {"routine": ROUTINE}
+    head = client.head("/routines/cached", params=PARAMS)
+    assert head.status_code == 200 and head.content == b""
+
+
+def test_cached_routine_honours_if_none_match(client):
+    response = client.get("/routines/cached", params=PARAMS, headers={"If-None-Match": '"CSE-3-0"'})
+    assert response.status_code == 304
+    assert client.get("/routines/cached", params=PARAMS,
+                      headers={"If-None-Match": '"CSE-3-1"'}).status_code == 404
+
+
+def test_job_submission_with_a_matching_etag_fails_the_precondition(client):
+    response = client.post("/jobs", params=PARAMS, headers={"If-None-Match": '"CSE-3-0"'})
+    assert response.status_code == 412
+    assert client.runs == []
+
+
+def test_submitted_job_produces_the_routine(client):
+    job = client.post("/jobs", params=PARAMS).json()
+    assert job["etag"] == '"CSE-3-0"'
+    deadline = time.time() + 5
+    while job["status"] in ("queued", "running") and time.time() < deadline:
+        time.sleep(0.01)
+        job = client.get(f"/jobs/{job['job_id']}").json()
+    response = client.get(f"/jobs/{job['job_id']}/result")
+    assert response.headers["etag"] == '"CSE-3-0"'
+    assert response.json() == {"routine": ROUTINE}
@@ -0,0 +1,57 @@
+from langchain_core.documents import Document
+
+from rag_utils import chunk_documents
+
+HEADER = "MAKAUT Syllabus B.Tech CSE"
+
+
+def _pages(source, *texts):
+    return [Document(page_content=f"{HEADER}\nPage {i + 1}/ 9\n{text}", metadata={"source": source, "page": i})
+            for i, text in enumerate(texts)]
+
+
+def test_curriculum_rows_become_contact_hour_chunks():
+    chunks = chunk_documents(_pages("cse.pdf", "1 PCC-CS 301 Data Structures 3 0 0 3",
+                                    "2 PCC-CS302 Operating Systems 3 1 0 4 4.0", "Notes"))
+    rows = [chunk for chunk in chunks if chunk.metadata["chunk"] == "row"]
+    assert [chunk.page_content for chunk in rows] == [
+        "PCC-CS301 Data Structures: Contact hours/week 3L+0T+0P",
+        "PCC-CS302 Operating Systems: Contact hours/week 3L+1T+0P",
+    ]
+    assert [chunk.metadata["paper_code"] for chunk in rows] == ["PCC-CS301", "PCC-CS302"]
+
+
+def test_sections_split_at_course_boundaries_without_page_boilerplate():
+    chunks = chunk_documents(_pages(
+        "cse.pdf",
+        "Course Title: Compilers Code: PCC-CS 501\nContact Hours: 3L",
+        "Lexical analysis\nCO1 3 2 - 1\nCourse Title: Networks Code: PCC-CS 502",
+        "Routing"))
+    sections = [chunk.page_content for chunk in chunks if chunk.metadata["chunk"] == "section"]
+    assert sections == [
+        "Course Title: Compilers Code: PCC-CS 501\nContact Hours: 3L\nLexical analysis",
+        "Course Title: Networks Code: PCC-CS 502\nRouting",
+    ]
+    assert [chunk.metadata["paper_code"] for chunk in chunks] == ["PCC-CS501", "PCC-CS502"]
+
+
+def test_pages_shared_between_documents_are_indexed_once():
+    first_year = "Course Title: Physics Code: BSC 101\nMechanics and optics"
+    chunks = chunk_documents(_pages("cse.pdf", first_year, "Course Title: Compilers", "Parsing")
+                             + _pages("ece.pdf", first_year, "Course Title: Signals", "Sampling"))
+    assert sum("Physics" in chunk.page_content for chunk in chunks) == 1
+    assert len(chunks) == 3
+
+
+def test_spreadsheet_rows_are_kept_whole_and_deduplicated():
+    row = Document(page_content="Paper Code: PCC-CS301; Name: Data Structures",
+                   metadata={"source": "cse.xlsx", "row": 0, "chunk": "row"})
+    chunks = chunk_documents([row, Document(page_content=row.page_content, metadata=dict(row.metadata, row=1))])
+    assert [chunk.page_content for chunk in chunks] == [row.page_content]
+
+
+def test_oversized_sections_fall_back_to_the_character_splitter():
+    text = "Course Title: Long\n" + "\n".join(f"Topic {i} " + "x" * 60 for i in range(60))
+    chunks = chunk_documents([Document(page_content=text, metadata={"source": "notes.txt"})], max_chars=1500)
+    assert len(chunks) > 1
+    assert all(len(chunk.page_content) <= 1000 for chunk in chunks)
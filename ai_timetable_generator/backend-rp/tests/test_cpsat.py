@@ -0,0 +1,55 @@
+import pytest
+
+import rag_utils
+from conftest import CONTACT_HOURS, DEPT, YEAR
+
+pytest.importorskip("ortools")
+
+
+def _classes(schedules):
+    return [(section, day, time_slot, info) for section, days in schedules.items()
+            for day, slots in days.items() for time_slot, info in slots.items()]
+
+
+def test_solution_has_no_clashes_and_keeps_the_break(generator, problem):
+    requirements, sections, grid, _ = problem
+    schedules, solved_grid, status = generator.solve_cpsat(requirements, sections, grid, time_limit=5, workers=2)
+    assert status in ("OPTIMAL", "FEASIBLE")
+    classes = _classes(schedules)
+    assert classes
+    for resource in ("faculty", "room"):
+        booked = [(day, time_slot, info[resource]) for _, day, time_slot, info in classes]
+        assert len(booked) == len(set(booked))
+    assert all(time_slot != generator.BREAK_SLOT for _, _, time_slot, _ in classes)
+    assert solved_grid.faculty_load.sum() == len(classes)
+    # The template grid is left untouched
+    assert not grid.faculty_busy.any()
+
+
+def test_solution_places_no_more_than_the_contact_hours(generator, problem):
+    requirements, sections, grid, _ = problem
+    schedules, _, _ = generator.solve_cpsat(requirements, sections, grid, time_limit=5, workers=2)
+    for section in sections:
+        for subject, (hours, _, _) in requirements.items():
+            placed = sum(info["subject"] == subject for s, _, _, info in _classes(schedules) if s == section)
+            assert placed <= sum(hours.values())
+
+
+def test_cpsat_never_returns_a_worse_routine_than_greedy(generator):
+    greedy = generator.generate_routine(DEPT, YEAR, CONTACT_HOURS, seed=1)
+    refined = generator.generate_routine(DEPT, YEAR, CONTACT_HOURS, seed=1, engine="cpsat", cpsat_time_limit=2)
+    assert sum(refined["summary"]["classes"]) >= sum(greedy["summary"]["classes"])
+    assert generator.last_run["cpsat_status"] in ("SKIPPED", "OPTIMAL", "FEASIBLE", "UNKNOWN")
+
+
+def test_budget_scales_with_the_greedy_time_within_the_caps(generator, monkeypatch):
+    monkeypatch.setattr(rag_utils, "CPSAT_MAX_TIME", 10)
+    monkeypatch.setattr(rag_utils, "CPSAT_MIN_TIME", 1)
+    monkeypatch.setattr(rag_utils, "CPSAT_TIME_FACTOR", 20)
+    monkeypatch.setattr(rag_utils, "CPSAT_MAX_WORKERS", 4)
+    assert generator.cpsat_budget(0.01) == (1, 4)
+    assert generator.cpsat_budget(0.2) == (4.0, 4)
+    assert generator.cpsat_budget(5) == (10, 4)
+    # Request values can lower the caps, never raise them
+    assert generator.cpsat_budget(5, time_limit=2, workers=2) == (2.0, 2)
+    assert generator.cpsat_budget(5, time_limit=60, workers=16) == (10, 4)
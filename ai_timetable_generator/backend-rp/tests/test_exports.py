@@ -0,0 +1,74 @@
+import csv
+import io
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+
+import main
+import rag_utils
+
+
+def _csv(chunks):
+    return list(csv.reader(io.StringIO("".join(chunks))))
+
+
+def test_section_csv_lays_out_the_week(generator, routine):
+    section = routine["sections"][0]
+    rows = _csv(generator.iter_section_csv(routine, section))
+    assert rows[0] == ["Time"] + generator.DAYS
+    assert [row[0] for row in rows[1:]] == generator.TIME_SLOTS
+    break_row = rows[1 + generator.TIME_SLOTS.index(routine["break_slot"])]
+    assert set(break_row[1:]) == {"BREAK"}
+    booked = sum(cell not in ("FREE", "BREAK") for row in rows[1:] for cell in row[1:])
+    assert booked == routine["summary"]["classes"][0]
+
+
+def test_summary_csv_lists_sections_and_faculty_load(generator, routine):
+    rows = _csv(generator.iter_summary_csv(routine))
+    assert rows[0] == rag_utils.SUMMARY_COLUMNS
+    assert [row[0] for row in rows[1:] if row[0]] == routine["sections"]
+    workload = {row[4]: int(row[5]) for row in rows[1:] if row[4]}
+    assert workload == dict(zip(routine["faculty"], routine["summary"]["faculty_hours"]))
+
+
+def test_zip_streams_one_csv_per_section_and_the_summary(generator, routine):
+    chunks = list(generator.export_zip(routine))
+    assert len(chunks) > 1
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as bundle:
+        assert bundle.namelist() == ([f"timetable_section_{s}.csv" for s in routine["sections"]]
+                                     + ["timetable_summary.csv"])
+        section = routine["sections"][0]
+        assert (bundle.read(f"timetable_section_{section}.csv").decode()
+                == "".join(generator.iter_section_csv(routine, section)))
+
+
+def test_xlsx_has_a_sheet_per_section_and_the_summary(generator, routine, tmp_path):
+    path = tmp_path / "timetable.xlsx"
+    generator.export_xlsx(routine, str(path))
+    workbook = load_workbook(path, read_only=True)
+    assert workbook.sheetnames == [f"Section {s}" for s in routine["sections"]] + ["Summary"]
+    rows = list(workbook[f"Section {routine['sections'][0]}"].values)
+    assert list(rows[0]) == ["Time"] + generator.DAYS
+    assert list(next(workbook["Summary"].values)) == rag_utils.SUMMARY_COLUMNS
+
+
+@pytest.fixture
+def client(routine):
+    rag_utils.remember_routine(routine)
+    return TestClient(main.app)
+
+
+def test_export_endpoints(client, routine, tmp_path, monkeypatch):
+    monkeypatch.setattr(main.tempfile, "tempdir", str(tmp_path))
+    base = f"/exports/{routine['generation_id']}"
+    bundle = client.get(f"{base}/bundle.zip")
+    assert bundle.headers["content-type"] == "application/zip"
+    assert zipfile.ZipFile(io.BytesIO(bundle.content)).testzip() is None
+    workbook = client.get(f"{base}/timetable.xlsx")
+    assert workbook.headers["content-type"] == main.XLSX_MIME
+    assert workbook.content.startswith(b"PK")
+    # The per-request workbook is removed once sent
+    assert list(tmp_path.iterdir()) == []
+    assert client.get("/exports/unknown/bundle.zip").status_code == 404
@@ -0,0 +1,44 @@
+import pandas as pd
+
+from rag_utils import SmartRoutineGenerator
+
+FACULTY = pd.DataFrame([
+    {"name": "Ada", "department": "CSE", "subjects": "Operating Systems|Compilers", "year_to_teach": "2|3",
+     "max_load_hours": 12, "unavailable_slots": "Mon 09:00-10:00", "preferred_slots": ""},
+    {"name": "Bo", "department": "ECE", "subjects": "Operating Systems", "year_to_teach": "2",
+     "max_load_hours": None, "unavailable_slots": "", "preferred_slots": ""},
+    {"name": "Cy", "department": "General", "subjects": "General Studies", "year_to_teach": "ALL",
+     "max_load_hours": 8, "unavailable_slots": "", "preferred_slots": ""},
+    {"name": "Di", "department": "CSE", "subjects": "Compilers", "year_to_teach": "4",
+     "max_load_hours": 8, "unavailable_slots": "", "preferred_slots": ""},
+])
+
+
+def _index():
+    return SmartRoutineGenerator().build_faculty_index(FACULTY)
+
+
+def _names(records):
+    return [record["name"] for record in records]
+
+
+def test_qualified_matches_keyword_department_and_year():
+    index = _index()
+    # Bo is in another department; Cy is a catch-all for every department and year
+    assert _names(index.qualified(["operating"], "cse", 2)) == ["Ada", "Cy"]
+    assert _names(index.qualified(["compilers"], "CSE", 4)) == ["Cy", "Di"]
+    assert _names(index.qualified(["compilers"], "CSE", 1)) == ["Cy"]
+
+
+def test_lookups_are_memoised():
+    index = _index()
+    assert index.with_keyword("compilers") is index.with_keyword("compilers")
+    assert index.for_year("2") is index.for_year("2")
+
+
+def test_records_carry_load_and_slot_masks():
+    generator = SmartRoutineGenerator()
+    ada, bo = _index().records[:2]
+    assert ada["max_load_hours"] == 12 and bo["max_load_hours"] == 20
+    assert ada["unavailable_mask"] == generator.slot_mask([("Mon", generator.TIME_SLOTS[0])])
+    assert bo["unavailable_mask"] == 0
@@ -0,0 +1,59 @@
+import faiss
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag_utils import INDEX_TYPES, build_faiss_index, vectorstore_from_chunks
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    return np.random.default_rng(0).standard_normal((2000, 32)).astype(np.float32)
+
+
+def _recall(index, vectors, k=5):
+    queries = vectors[:50]
+    truth = faiss.IndexFlatL2(vectors.shape[1])
+    truth.add(vectors)
+    _, expected = truth.search(queries, k)
+    _, found = index.search(queries, k)
+    return np.mean([len(set(a) & set(b)) / k for a, b in zip(expected, found)])
+
+
+@pytest.mark.parametrize("index_type, expected", [
+    ("flat", faiss.IndexFlatL2),
+    ("sq8", faiss.IndexScalarQuantizer),
+    ("ivf", faiss.IndexIVFFlat),
+    ("ivf-sq8", faiss.IndexIVFScalarQuantizer),
+    # too few vectors to train 8-bit PQ codebooks
+    ("ivf-pq", faiss.IndexIVFScalarQuantizer),
+])
+def test_index_types_build_and_search(vectors, index_type, expected):
+    index = build_faiss_index(vectors, index_type=index_type, nprobe=16)
+    assert type(index) is expected
+    assert index.ntotal == len(vectors)
+    assert _recall(index, vectors) >= (1.0 if index_type == "flat" else 0.8)
+
+
+def test_ivf_falls_back_to_flat_types_when_too_small_to_train(vectors):
+    assert type(build_faiss_index(vectors[:50], "ivf")) is faiss.IndexFlatL2
+    assert type(build_faiss_index(vectors[:50], "ivf-sq8")) is faiss.IndexScalarQuantizer
+
+
+def test_nprobe_is_capped_at_the_list_count(vectors):
+    index = build_faiss_index(vectors[:100], "ivf", nprobe=64)
+    assert index.nprobe == index.nlist == 2
+
+
+def test_unknown_index_type_is_rejected(vectors):
+    with pytest.raises(ValueError, match="hnsw"):
+        build_faiss_index(vectors, "hnsw")
+
+
+def test_vectorstore_maps_hits_back_to_chunks():
+    chunks = [Document(page_content=f"Subject {i}: Contact hours/week {i}L") for i in range(20)]
+    store = vectorstore_from_chunks(chunks, DeterministicFakeEmbedding(size=16), index_type="sq8")
+    hit = store.similarity_search("Subject 7: Contact hours/week 7L", k=1)[0]
+    assert hit.page_content == "Subject 7: Contact hours/week 7L"
+    assert hit.metadata["chunk_id"] == "7"
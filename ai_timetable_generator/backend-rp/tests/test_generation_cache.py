@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+
+import pytest
+
+import rag_utils
+from generation_cache import GenerationCache, make_cache_key
+
+
+def test_concurrent_callers_share_one_computation():
+    cache = GenerationCache()
+    calls, results = [], []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"routine": len(calls)}
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{"routine": 1}] * 5
+
+
+def test_failure_reaches_every_waiter_and_is_not_cached():
+    cache = GenerationCache()
+    started = threading.Event()
+
+    def compute():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("no feasible routine")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_compute("k", compute)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=call)
+    follower.start()
+    leader.join()
+    follower.join()
+    assert len(errors) == 2
+    assert cache.get_or_compute("k", lambda: "retried") == "retried"
+
+
+def test_uncacheable_results_are_recomputed():
+    cache = GenerationCache()
+    values = iter(["Required data files are missing", {"routine": 1}])
+    cacheable = lambda value: isinstance(value, dict)
+    assert cache.get_or_compute("k", lambda: next(values), cacheable) == "Required data files are missing"
+    assert cache.get_or_compute("k", lambda: next(values), cacheable) == {"routine": 1}
+    assert cache.get_or_compute("k", lambda: pytest.fail("cached"), cacheable) == {"routine": 1}
+
+
+def test_disk_tier_round_trip(tmp_path):
+    key = make_cache_key(dept="CSE", sem="1", seed=0)
+    GenerationCache(cache_dir=str(tmp_path)).put(key, {"routine": [1, 2, 3]})
+    fresh = GenerationCache(cache_dir=str(tmp_path))
+    assert fresh.get_or_compute(key, lambda: pytest.fail("not read from disk")) == {"routine": [1, 2, 3]}
+    assert fresh.stats() == {"entries": 1, "hits": 1, "misses": 0}
+
+
+def test_unreadable_disk_entry_is_a_miss(tmp_path):
+    cache = GenerationCache(cache_dir=str(tmp_path))
+    (tmp_path / "k.pkl").write_bytes(b"not a pickle")
+    assert cache.get("k") is None
+    assert cache.get_or_compute("k", lambda: "fresh") == "fresh"
+    assert GenerationCache(cache_dir=str(tmp_path)).get("k") == "fresh"
+
+
+def test_memory_tier_is_bounded():
+    cache = GenerationCache(max_entries=2)
+    for key in "abc":
+        cache.put(key, key)
+    assert cache.get("a") is None
+    assert (cache.get("b"), cache.get("c")) == ("b", "c")
+
+
+def test_cache_key_ignores_argument_order():
+    assert make_cache_key(dept="CSE", sem="1") == make_cache_key(sem="1", dept="CSE")
+    assert make_cache_key(dept="CSE", sem="1") != make_cache_key(dept="CSE", sem="2")
+
+
+def _age(path, seconds_ago):
+    stamp = time.time() - seconds_ago
+    os.utime(path, (stamp, stamp))
+
+
+def test_disk_tier_prunes_least_recently_used_entries(tmp_path):
+    cache = GenerationCache(cache_dir=str(tmp_path), max_disk_entries=2)
+    cache.put("a", "a")
+    cache.put("b", "b")
+    _age(tmp_path / "a.pkl", 20)
+    _age(tmp_path / "b.pkl", 10)
+    # A disk hit counts as a use, so "b" is now the oldest
+    assert GenerationCache(cache_dir=str(tmp_path)).get("a") == "a"
+    cache.put("c", "c")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.pkl", "c.pkl"]
+
+
+def test_disk_tier_is_bounded_by_size(tmp_path):
+    cache = GenerationCache(cache_dir=str(tmp_path), max_disk_bytes=2500)
+    for age, key in enumerate("abc"):
+        cache.put(key, "x" * 1000)
+        _age(tmp_path / f"{key}.pkl", 10 - age)
+    cache.put("d", "x" * 1000)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["c.pkl", "d.pkl"]
+
+
+def test_content_digests_hold_one_entry_per_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag_utils, "_content_digests", {})
+    data = tmp_path / "faculty.csv"
+    digests = set()
+    for version in range(3):
+        data.write_text(f"name\nFaculty {version}\n")
+        _age(data, 10 - version)
+        digests.add(rag_utils.content_digest(str(data)))
+    assert len(digests) == 3
+    assert list(rag_utils._content_digests) == [str(data)]
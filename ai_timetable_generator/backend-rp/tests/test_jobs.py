@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from jobs import STAGES, JobManager, JobQueueFull
+
+
+def _wait(job, timeout=5):
+    deadline = time.time() + timeout
+    while job.status in ("queued", "running") and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+class Pipeline:
+    """Fake generation: reports each stage, blocking at ``pause_at`` until released."""
+
+    def __init__(self, pause_at=None):
+        self.pause_at = pause_at
+        self.reached = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, progress, **params):
+        for stage in STAGES:
+            progress(stage)
+            if stage == self.pause_at:
+                self.reached.set()
+                self.release.wait(5)
+        return {"generation_id": "g1", **params}
+
+
+def test_job_runs_to_completion():
+    job = _wait(JobManager(Pipeline()).submit(dept="CSE", sem="3"))
+    assert job.status == "done"
+    assert job.result == {"generation_id": "g1", "dept": "CSE", "sem": "3"}
+    assert job.snapshot()["progress"] == 1.0 and job.snapshot()["generation_id"] == "g1"
+
+
+def test_running_job_stops_at_the_next_stage():
+    pipeline = Pipeline(pause_at="index")
+    manager = JobManager(pipeline)
+    job = manager.submit()
+    assert pipeline.reached.wait(5)
+    manager.cancel(job.id)
+    pipeline.release.set()
+    assert _wait(job).status == "cancelled"
+    assert job.stage == "index" and job.result is None
+
+
+def test_queued_job_is_cancelled_before_it_starts():
+    pipeline = Pipeline(pause_at="subjects")
+    manager = JobManager(pipeline, workers=1)
+    running = manager.submit()
+    assert pipeline.reached.wait(5)
+    queued = manager.submit()
+    manager.cancel(queued.id)
+    assert queued.status == "cancelled" and queued.started is None
+    pipeline.release.set()
+    assert _wait(running).status == "done"
+
+
+def test_cancel_during_export_keeps_the_result():
+    pipeline = Pipeline(pause_at="export")
+    manager = JobManager(pipeline)
+    job = manager.submit()
+    assert pipeline.reached.wait(5)
+    manager.cancel(job.id)
+    pipeline.release.set()
+    assert _wait(job).status == "done"
+
+
+def test_finished_jobs_ignore_cancel():
+    manager = JobManager(Pipeline())
+    job = _wait(manager.submit())
+    assert manager.cancel(job.id).status == "done"
+    assert manager.cancel("unknown") is None
+
+
+def test_queue_is_bounded():
+    pipeline = Pipeline(pause_at="subjects")
+    manager = JobManager(pipeline, workers=1, max_pending=1)
+    manager.submit()
+    assert pipeline.reached.wait(5)
+    manager.submit()
+    with pytest.raises(JobQueueFull):
+        manager.submit()
+    assert manager.stats()["jobs"] == {"running": 1, "queued": 1}
+    pipeline.release.set()
+
+
+def test_failures_are_reported():
+    def run(progress, **params):
+        return "No sections found for CSE Year 9"
+
+    job = _wait(JobManager(run).submit())
+    assert job.status == "failed" and job.error == "No sections found for CSE Year 9"
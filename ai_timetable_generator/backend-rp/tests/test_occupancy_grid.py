@@ -0,0 +1,50 @@
+import numpy as np
+
+from rag_utils import OccupancyGrid
+
+
+def _grid():
+    return OccupancyGrid(["F1", "F2", "F3"], ["R1", "R2"], ["A", "B"], slots_per_day=4,
+                         room_capacity={"R1": 60})
+
+
+def test_bits_cover_the_week_without_overlap():
+    grid = _grid()
+    bits = {int(grid.bit(day, slot)) for day in range(5) for slot in range(4)}
+    assert len(bits) == 20
+    assert grid.bit(1, 0) == np.uint64(1 << 4)
+
+
+def test_booking_blocks_faculty_room_and_section():
+    grid = _grid()
+    bit, other = grid.bit(0, 1), grid.bit(0, 2)
+    grid.book(faculty_id=1, room_id=0, section_id=0, bit=bit)
+    faculty = np.arange(3)
+    assert list(grid.free_faculty(faculty, np.full(3, 10), np.zeros(3, dtype=np.uint64), bit)) == [0, 2]
+    assert list(grid.free_rooms(np.arange(2), bit)) == [1]
+    assert not grid.is_section_free(0, bit) and grid.is_section_free(1, bit)
+    assert grid.is_section_free(0, other)
+    assert list(grid.faculty_load) == [0, 1, 0]
+
+
+def test_free_faculty_respects_load_and_unavailability():
+    grid = _grid()
+    bit = grid.bit(2, 0)
+    grid.faculty_load[0] = 2
+    unavailable = np.array([0, int(bit), 0], dtype=np.uint64)
+    assert list(grid.free_faculty(np.arange(3), np.array([2, 5, 5]), unavailable, bit)) == [2]
+
+
+def test_free_faculty_prefers_keen_faculty_when_any_are_free():
+    grid = _grid()
+    bit = grid.bit(3, 3)
+    no_limits = (np.full(3, 10), np.zeros(3, dtype=np.uint64))
+    preferred = np.array([0, int(bit), 0], dtype=np.uint64)
+    assert list(grid.free_faculty(np.arange(3), *no_limits, bit, preferred)) == [1]
+    grid.book(1, 0, 0, bit)
+    assert list(grid.free_faculty(np.arange(3), *no_limits, bit, preferred)) == [0, 2]
+
+
+def test_room_capacity_is_nan_when_unknown():
+    grid = _grid()
+    assert grid.room_capacity[0] == 60 and np.isnan(grid.room_capacity[1])
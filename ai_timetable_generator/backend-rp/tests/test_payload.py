@@ -0,0 +1,31 @@
+def _schedules():
+    return {
+        "B": {"Mon": {}, "Tue": {"9-10": {"subject": "OS", "faculty": "Ada", "room": "R1"}},
+              "Wed": {}, "Thu": {}, "Fri": {}},
+        "A": {"Mon": {"9-10": {"subject": "OS", "faculty": "Ada", "room": "R1"},
+                      "10-11": {"subject": "DBMS", "faculty": "Bo", "room": "R2"}},
+              "Tue": {}, "Wed": {}, "Thu": {}, "Fri": {}},
+    }
+
+
+def test_payload_interns_strings_and_counts_hours(generator, monkeypatch):
+    monkeypatch.setattr(generator, "DAYS", ["Mon", "Tue", "Wed", "Thu", "Fri"])
+    monkeypatch.setattr(generator, "TIME_SLOTS", ["9-10", "10-11"])
+    payload = generator.build_routine_payload(_schedules(), "CSE", 2)
+    assert payload["sem"] == "2"
+    assert payload["sections"] == ["A", "B"]
+    assert payload["subjects"] == ["OS", "DBMS"]
+    assert payload["faculty"] == ["Ada", "Bo"]
+    assert payload["entries"] == {"section": [0, 0, 1], "day": [0, 0, 1], "slot": [0, 1, 0],
+                                  "subject": [0, 1, 0], "faculty": [0, 1, 0], "room": [0, 1, 0]}
+    assert payload["summary"]["classes"] == [2, 1]
+    assert payload["summary"]["faculty_hours"] == [2, 1]
+    assert generator.section_subject_hours(payload) == [{"OS": 1, "DBMS": 1}, {"OS": 1}]
+
+
+def test_section_grids_round_trip_the_schedule(generator, routine):
+    for section_id, grid in enumerate(generator.section_grids(routine)):
+        assert len(grid) == routine["summary"]["classes"][section_id]
+        for (day_id, slot_id), (subject, faculty, room) in grid.items():
+            assert subject in routine["subjects"] and faculty in routine["faculty"] and room in routine["rooms"]
+            assert generator.TIME_SLOTS[slot_id] != routine["break_slot"]
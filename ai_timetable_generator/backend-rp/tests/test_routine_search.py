@@ -0,0 +1,42 @@
+import time
+
+import rag_utils
+
+
+def test_pass_is_reproducible_for_a_seed(generator, problem):
+    first = generator.run_pass(*problem, seed=7)
+    second = generator.run_pass(*problem, seed=7)
+    assert first == second
+    assert first[1] == 7
+
+
+def test_pass_does_not_book_the_template_grid(generator, problem):
+    grid = problem[2]
+    generator.run_pass(*problem, seed=7)
+    assert not grid.faculty_busy.any() and not grid.section_busy.any()
+
+
+def test_pass_is_abandoned_past_its_deadline(generator, problem):
+    assert generator.run_pass(*problem, seed=7, deadline=time.time() - 1) is None
+
+
+def test_restarts_keep_the_best_pass(generator, problem):
+    passes = [generator.run_pass(*problem, seed=seed) for seed in range(3, 7)]
+    best = generator.search_routines(*problem, seed=3, restarts=4, workers=2)
+    assert best == min(passes, key=lambda result: (result[0], result[1]))
+
+
+def test_single_pass_runs_in_process(generator, problem, monkeypatch):
+    monkeypatch.setattr(rag_utils, "get_routine_pool", None)
+    assert generator.search_routines(*problem, seed=3) == generator.run_pass(*problem, seed=3)
+
+
+def test_time_limit_still_returns_the_first_pass(generator, problem):
+    score, seed, schedules = generator.search_routines(*problem, seed=3, restarts=4, time_limit=0, workers=2)
+    assert 3 <= seed < 7
+    assert set(schedules) == set(problem[1])
+
+
+def test_routine_pool_spawns_workers():
+    pool = rag_utils.get_routine_pool(2)
+    assert pool._mp_context.get_start_method() == "spawn"
@@ -0,0 +1,18 @@
+import rag_utils
+from backend_shared import metrics_module
+
+from conftest import CONTACT_HOURS, DEPT, YEAR
+
+
+def test_phases_are_timed_under_distinct_names(monkeypatch):
+    # Stand in for the syllabus index and the RAG chain; the college CSVs are real
+    monkeypatch.setattr(rag_utils, "get_subjects", lambda *args: list(CONTACT_HOURS))
+    monkeypatch.setattr(rag_utils, "rag_index_version", lambda *args: "v1")
+    monkeypatch.setattr(rag_utils, "get_rag_chain", lambda *args: None)
+    monkeypatch.setattr(rag_utils, "cached_rag_query",
+                        lambda root, query, version=None: {"result": "3L+1T+0P"})
+    with metrics_module.trace() as spans:
+        routine = rag_utils.run_generation(DEPT, YEAR, seed=1)
+    assert isinstance(routine, dict)
+    assert [name for name, _ in spans] == ["rag_generate.load_subjects", "rag_generate.index",
+                                           "rag_generate.load_college", "rag_generate.schedule"]
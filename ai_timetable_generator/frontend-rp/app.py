@@ -3,7 +3,15 @@ import streamlit as st
 import requests
 import pandas as pd
 import os
-import re
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_URL = os.getenv("TIMETABLE_API_URL", "http://localhost:8000")
+REQUEST_TIMEOUT = (5, 60)
+POLL_INTERVAL = 0.5
+# Seeded generations are reproducible, so the backend can cache them and hand out ETags
+ROUTINE_SEED = int(os.getenv("ROUTINE_SEED", "0"))
 
 # Set page config for better layout
 st.set_page_config(
@@ -88,39 +96,134 @@ with st.sidebar:
 st.markdown("<h1 class='main-title'>AI-Powered Timetable Generator</h1>", unsafe_allow_html=True)
 st.write("Generate a timetable for your department and semester using AI-driven scheduling.")
 
+DAY_NAMES = {"Mon": "Monday", "Tue": "Tuesday", "Wed": "Wednesday", "Thu": "Thursday", "Fri": "Friday"}
+
+# Data layer
+# One pooled session per server process; routines are cached per (dept, sem, ETag),
+# where the ETag is the backend's generation key. Generate first asks the backend's
+# cached-result endpoint, sending the last known ETag as If-None-Match: a 304 renders
+# from the local cache, a 200 carries the backend's cached routine, and a 404 means
+# nothing is cached, so a background job is submitted and polled with a progress bar.
+@st.cache_resource
+def get_session():
+    session = requests.Session()
+    retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def routine_params(dept, sem):
+    return {"dept": dept, "sem": sem, "seed": ROUTINE_SEED}
+
+class RoutineError(Exception):
+    """Error payload from the backend; raised so st.cache_data never caches it."""
+
+    def __init__(self, payload):
+        super().__init__(payload.get("error"))
+        self.payload = payload
+
+class RoutineMissing(Exception):
+    """Neither this app nor the backend still holds the routine."""
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_routine(dept, sem, etag, _job_id=None):
+    # _job_id is excluded from the cache key: it only says where to fetch a miss from
+    if _job_id:
+        response = get_session().get(f"{API_URL}/jobs/{_job_id}/result", timeout=REQUEST_TIMEOUT)
+    else:
+        response = get_session().get(f"{API_URL}/routines/cached", params=routine_params(dept, sem),
+                                     timeout=REQUEST_TIMEOUT)
+        if response.status_code == 404:
+            raise RoutineMissing(etag)
+    response.raise_for_status()
+    result = response.json()
+    if "error" in result:
+        raise RoutineError(result)
+    return result
+
+def fetch_routine(dept, sem, etag, job_id=None):
+    try:
+        return cached_routine(dept, sem, etag, _job_id=job_id)
+    except RoutineError as e:
+        return e.payload
+    except RoutineMissing:
+        return generate_routine(dept, sem)
+
+STAGE_LABELS = {
+    "subjects": "Loading subjects",
+    "index": "Preparing syllabus index",
+    "contact_hours": "Looking up contact hours",
+    "scheduling": "Scheduling classes",
+    "export": "Preparing exports",
+}
+
+def wait_for_job(job, progress_bar):
+    session = get_session()
+    while job["status"] in ("queued", "running"):
+        label = STAGE_LABELS.get(job.get("stage"), "Waiting for a free worker")
+        progress_bar.progress(job["progress"], text=f"{label}...")
+        time.sleep(POLL_INTERVAL)
+        response = session.get(f"{API_URL}/jobs/{job['job_id']}", timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        job = response.json()
+    progress_bar.progress(1.0, text="Done")
+    return job
+
+def generate_routine(dept, sem):
+    response = get_session().post(f"{API_URL}/jobs", params=routine_params(dept, sem), timeout=REQUEST_TIMEOUT)
+    if response.status_code == 429:
+        return {"error": "The server is busy generating other timetables. Please try again shortly."}
+    response.raise_for_status()
+
+    job = wait_for_job(response.json(), st.progress(0.0, text="Submitting..."))
+    if job["status"] == "cancelled":
+        return {"error": "Generation was cancelled."}
+    result = fetch_routine(dept, sem, job.get("etag"), job_id=job["job_id"])
+    if job.get("etag") and "error" not in result:
+        st.session_state.setdefault("etags", {})[(dept, sem)] = job["etag"]
+    return result
+
+def load_routine(dept, sem):
+    known = st.session_state.setdefault("etags", {})
+    etag = known.get((dept, sem))
+    headers = {"If-None-Match": etag} if etag else {}
+    response = get_session().get(f"{API_URL}/routines/cached", params=routine_params(dept, sem),
+                                 headers=headers, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 304:
+        return fetch_routine(dept, sem, etag)
+    if response.status_code == 404:
+        return generate_routine(dept, sem)
+    response.raise_for_status()
+    known[(dept, sem)] = response.headers["ETag"]
+    return response.json()
+
 # Function to format timetable as a table
 def format_timetable_to_df(routine):
-    if not routine or "No subjects found" in routine or "Failed" in routine:
+    if not routine or not routine.get("sections"):
         return None
     
-    # Parse the routine string into a DataFrame
-    lines = routine.split("\n")
-    timetable_data = []
-    current_section = None
-    current_row = None
-    time_slots = ["9-10", "10-11", "11-12", "12-1", "2-3", "3-4", "4-5"]
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+    # Index the columnar entries by (section, slot, day) once, then lay out the grid
+    days = [DAY_NAMES.get(day, day) for day in routine["days"]]
+    entries = routine["entries"]
+    cells = {}
+    for section_id, day_id, slot_id, subject_id, faculty_id, room_id in zip(
+            entries["section"], entries["day"], entries["slot"],
+            entries["subject"], entries["faculty"], entries["room"]):
+        cells[(section_id, slot_id, day_id)] = (
+            f"{routine['subjects'][subject_id]} "
+            f"({routine['faculty'][faculty_id]}, {routine['rooms'][room_id]})"
+        )
     
-    for line in lines:
-        if line.startswith("ROUTINE FOR SECTION"):
-            current_section = line.split("SECTION ")[1].split(" -")[0]
-        elif line.startswith("Time") and "│" in line:
-            continue  # Skip header
-        elif any(time_slot in line for time_slot in time_slots):
-            parts = line.split("│")
-            time = parts[0].strip()
-            row = {"Time": time, "Section": current_section}
-            for i, day in enumerate(days, 1):
-                cell = parts[i].strip()
-                if cell == "BREAK" or cell == "FREE":
-                    row[day] = cell
+    timetable_data = []
+    for section_id, section in enumerate(routine["sections"]):
+        for slot_id, time_slot in enumerate(routine["time_slots"]):
+            row = {"Time": time_slot, "Section": section}
+            for day_id, day in enumerate(days):
+                if time_slot == routine["break_slot"]:
+                    row[day] = "BREAK"
                 else:
-                    # Extract subject, faculty, room
-                    match = re.match(r"(.+?)\.\.\.?\sby\s(.+?)\.\.\.?\sin\s(.+?)\.\.\.?", cell)
-                    if match:
-                        row[day] = f"{match.group(1)} ({match.group(2)}, {match.group(3)})"
-                    else:
-                        row[day] = cell
+                    row[day] = cells.get((section_id, slot_id, day_id), "FREE")
             timetable_data.append(row)
     
     if timetable_data:
@@ -128,16 +231,22 @@ def format_timetable_to_df(routine):
         return df.set_index(["Section", "Time"])
     return None
 
-# Handle timetable generation
+# Handle timetable generation. Reruns (widget changes, tab switches) re-render the
+# last generated routine from the cache without contacting the backend.
 if generate_button:
+    st.session_state["shown"] = (dept, sem)
+shown = st.session_state.get("shown")
+shown_etag = st.session_state.get("etags", {}).get(shown) if shown else None
+
+if generate_button or shown_etag:
     if dept and sem:
         with st.spinner("Generating timetable... This may take a moment."):
             try:
-                response = requests.get(f"http://localhost:8000/generate_timetable?dept={dept}&sem={sem}")
-                if response.status_code == 200:
-                    routine = response.json()["routine"]
-                    if "No subjects found" in routine or "Failed" in routine:
-                        st.markdown(f"<div class='error-box'>Error: {routine}</div>", unsafe_allow_html=True)
+                result = load_routine(dept, sem) if generate_button else fetch_routine(*shown, shown_etag)
+                if result is not None:
+                    routine = result.get("routine")
+                    if "error" in result:
+                        st.markdown(f"<div class='error-box'>Error: {result['error']}</div>", unsafe_allow_html=True)
                     else:
                         st.markdown("<div class='success-box'>Timetable generated successfully!</div>", unsafe_allow_html=True)
                         
@@ -154,20 +263,16 @@ if generate_button:
                                 }
                             )
                             
-                            # Provide download link for CSV
-                            csv_file = f"backend-rp/data/output/timetable_summary.csv"
-                            if os.path.exists(csv_file):
-                                with open(csv_file, "rb") as file:
-                                    st.download_button(
-                                        label="Download Timetable Summary (CSV)",
-                                        data=file,
-                                        file_name="timetable_summary.csv",
-                                        mime="text/csv"
-                                    )
+                            # Exports are built by the backend only when a link is followed
+                            export_url = f"{API_URL}/exports/{routine['generation_id']}"
+                            col1, col2, col3 = st.columns(3)
+                            col1.link_button("Download Timetable Summary (CSV)", f"{export_url}/summary.csv")
+                            col2.link_button("Download All Sections (ZIP)", f"{export_url}/bundle.zip")
+                            col3.link_button("Download Workbook (XLSX)", f"{export_url}/timetable.xlsx")
                         else:
-                            st.text_area("Raw Timetable Output", routine, height=500)
-                else:
-                    st.markdown("<div class='error-box'>Error generating timetable: Server responded with an error.</div>", unsafe_allow_html=True)
+                            st.json(routine)
+            except requests.RequestException as e:
+                st.markdown(f"<div class='error-box'>Error generating timetable: {str(e)}</div>", unsafe_allow_html=True)
             except Exception as e:
                 st.markdown(f"<div class='error-box'>Error: {str(e)}</div>", unsafe_allow_html=True)
     else:
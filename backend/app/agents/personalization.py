@@ -0,0 +1,107 @@
+import re
+import pandas as pd
+from supabase import create_client
+from fastapi import HTTPException
+from typing import Dict, List, Optional
+from app.config import settings
+from app.utils.http_utils import dumps
+from app.utils.slot_grid import APP_WEEK
+
+class StudentSchedules:
+    """Per-student timetables for one timetable version.
+
+    Students are grouped by their elective combination; each distinct combination
+    has one schedule (and one serialised body), and a student lookup is a dict hit
+    on roll_no -> combination id.
+    """
+
+    def __init__(self, combos: List[tuple], schedules: List[List[Dict]], clashes: List[List[Dict]],
+                 student_combo: Dict[str, int]):
+        self.combos = combos
+        self.schedules = schedules
+        self.clashes = clashes
+        self.student_combo = student_combo
+        self._bodies: Dict[int, bytes] = {}
+
+    def __contains__(self, roll_no):
+        return str(roll_no) in self.student_combo
+
+    def __len__(self):
+        return len(self.student_combo)
+
+    def for_student(self, roll_no: str) -> Optional[Dict]:
+        combo_id = self.student_combo.get(str(roll_no))
+        if combo_id is None:
+            return None
+        return {"roll_no": str(roll_no), "electives": list(self.combos[combo_id]),
+                "timetable": self.schedules[combo_id], "clashes": self.clashes[combo_id]}
+
+    def body(self, roll_no: str, header: Dict) -> Optional[bytes]:
+        """JSON body for one student; the combination part is serialised once and shared."""
+        combo_id = self.student_combo.get(str(roll_no))
+        if combo_id is None:
+            return None
+        shared = self._bodies.get(combo_id)
+        if shared is None:
+            shared = self._bodies[combo_id] = dumps({
+                "electives": list(self.combos[combo_id]),
+                "timetable": self.schedules[combo_id],
+                "clashes": self.clashes[combo_id],
+            })
+        prefix = dumps(dict(header, roll_no=str(roll_no)))
+        return prefix[:-1] + b"," + shared[1:]
+
+class PersonalizationAgent:
+    def __init__(self, client=None):
+        self.supabase = client or create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+
+    def fetch_students(self, program: str) -> pd.DataFrame:
+        try:
+            response = self.supabase.table("students").select("roll_no,electives").eq("program", program).execute()
+            return pd.DataFrame(response.data or [], columns=["roll_no", "electives"])
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error fetching students: {str(e)}")
+
+    @staticmethod
+    def parse_electives(electives: pd.Series, course_codes) -> pd.Series:
+        """Vectorised parse of elective lists ("History Political Science", JSON lists, ...)
+        into sorted tuples of known course codes. Codes are matched longest first so
+        multi-word codes are not split."""
+        codes = sorted({str(code) for code in course_codes}, key=len, reverse=True)
+        if not codes:
+            return pd.Series([()] * len(electives), index=electives.index, dtype=object)
+        pattern = r"(?<!\w)(" + "|".join(map(re.escape, codes)) + r")(?!\w)"
+        found = electives.fillna("").astype(str).str.findall(pattern)
+        return found.map(lambda matched: tuple(sorted(set(matched))))
+
+    def build(self, program: str, timetable: List[Dict], students: Optional[pd.DataFrame] = None) -> StudentSchedules:
+        if students is None:
+            students = self.fetch_students(program)
+        rows = pd.DataFrame(timetable, columns=["course_code", "faculty_id", "room_id", "day", "time_slot"])
+
+        combos = self.parse_electives(students["electives"], rows["course_code"].unique())
+        combo_ids, unique_combos = pd.factorize(combos)
+
+        # Join each distinct combination (not each student) against the timetable
+        members = pd.DataFrame({"combo": range(len(unique_combos)), "course_code": list(unique_combos)})
+        members = members.explode("course_code").dropna(subset=["course_code"])
+        joined = members.merge(rows, on="course_code")
+        # Chronological (grid day, slot start time), as in the views and exports;
+        # ranked once per distinct (day, time_slot) rather than per joined row
+        slots = sorted(set(zip(rows["day"], rows["time_slot"])), key=lambda slot: APP_WEEK.sort_key(*slot))
+        rank = {slot: i for i, slot in enumerate(slots)}
+        joined["slot_rank"] = [rank[slot] for slot in zip(joined["day"], joined["time_slot"])]
+        joined = joined.sort_values(["combo", "slot_rank", "course_code"])
+        joined["clash"] = joined.duplicated(["combo", "day", "time_slot"], keep=False)
+
+        schedules = [[] for _ in unique_combos]
+        clashes = [[] for _ in unique_combos]
+        fields = ["course_code", "faculty_id", "room_id", "day", "time_slot"]
+        for combo, clash, entry in zip(joined["combo"].tolist(), joined["clash"].tolist(),
+                                       joined[fields].to_dict("records")):
+            schedules[combo].append(entry)
+            if clash:
+                clashes[combo].append(entry)
+
+        student_combo = dict(zip(students["roll_no"].astype(str), combo_ids.tolist()))
+        return StudentSchedules([tuple(combo) for combo in unique_combos], schedules, clashes, student_combo)
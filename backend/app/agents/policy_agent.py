@@ -5,8 +5,8 @@ from fastapi import HTTPException
 from app.config import settings
 
 class PolicyComplianceAgent:
-    def __init__(self):
-        self.supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    def __init__(self, client=None):
+        self.supabase: Client = client or create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
 
     def fetch_data(self) -> Dict[str, pd.DataFrame]:
         """Fetch data from Supabase tables."""
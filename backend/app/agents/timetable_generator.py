@@ -154,13 +154,62 @@ from ortools.sat.python import cp_model
 from supabase import create_client
 from fastapi import HTTPException
 from app.config import settings
+from app.db.timetable_store import TimetableStore
+from app.utils.metrics import metrics
+from app.utils.slot_grid import APP_WEEK
+import os
 import pandas as pd
+import threading
+
+# Opt-in: seconds spent improving preferred-slot placement after a feasible
+# timetable is found. 0 (the default) keeps generate to a single feasibility solve,
+# with preferred slots used only as hints.
+PREFERENCE_SECONDS = float(os.getenv("TIMETABLE_PREFERENCE_SECONDS", "0"))
+
+class SolveHandle:
+    """Cancellation token for one generate() run. cancel() may come from any thread
+    (client disconnect, explicit cancel call); a running CP-SAT search is stopped
+    via StopSearch, and the run aborts at its next checkpoint otherwise."""
+
+    def __init__(self, program):
+        self.program = program
+        self.reason = None
+        self._cancelled = threading.Event()
+        self._solver = None
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self, reason="cancelled"):
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self.reason = reason
+            self._cancelled.set()
+            if self._solver is not None:
+                self._solver.StopSearch()
+
+    def attach(self, solver):
+        with self._lock:
+            self._solver = solver
+            if self._cancelled.is_set():
+                solver.StopSearch()
+
+    def check(self):
+        if self._cancelled.is_set():
+            metrics.inc("timetable_solves_cancelled_total", reason=self.reason)
+            raise HTTPException(status_code=409, detail=f"Generation for {self.program} was cancelled ({self.reason})")
 
 class TimetableGeneratorAgent:
-    def __init__(self):
-        self.supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
-        self.days = ["Mon", "Tue", "Wed", "Thu", "Fri"]
-        self.slots = ["9:00-10:00", "10:00-11:00", "11:00-12:00", "13:00-14:00", "14:00-15:00", "15:00-16:00"]
+    def __init__(self, client=None):
+        self.supabase = client or create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        self.grid = APP_WEEK
+        self.last_version = None
+        self.last_stats = None
+        self.days = self.grid.days
+        self.slots = [self.grid.labels[t] for t in self.grid.teaching_slots]
 
     def fetch_data(self):
         try:
@@ -173,8 +222,23 @@ class TimetableGeneratorAgent:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Data fetch error: {str(e)}")
 
-    def generate(self, program="FYUP"):
+    def faculty_masks(self, faculty_df):
+        """Compile each faculty row's availability into (available, preferred) slot masks.
+        ``availability`` ("Mon Tue Wed" or "Mon 09:00-12:00|...") defaults to the whole
+        week when missing or unparseable; ``unavailable_slots`` is subtracted from it."""
+        masks = {}
+        for faculty in faculty_df.to_dict("records"):
+            available = self.grid.mask(faculty.get("availability")) or self.grid.full_mask
+            available &= ~self.grid.mask(faculty.get("unavailable_slots"))
+            masks[faculty["id"]] = (available, self.grid.mask(faculty.get("preferred_slots")))
+        return masks
+
+    def generate(self, program="FYUP", handle=None):
+        handle = handle or SolveHandle(program)
+        handle.check()
+        spans = metrics.spans("timetable_generate", program=program)
         faculty_df, courses_df, rooms_df, students_df = self.fetch_data()
+        spans.mark("fetch")
 
         if faculty_df.empty or courses_df.empty or rooms_df.empty:
             raise HTTPException(status_code=400, detail="Missing required data")
@@ -183,26 +247,42 @@ class TimetableGeneratorAgent:
         program_students = students_df[students_df["program"] == program]
         if program_students.empty:
             raise HTTPException(status_code=400, detail=f"No students for program {program}")
+        spans.mark("validate")
 
         model = cp_model.CpModel()
         solver = cp_model.CpSolver()
         solver.parameters.max_time_in_seconds = 30.0  # Limit solve time
 
         assignments = {}
+        preferred = []
+        masks = self.faculty_masks(faculty_df)
+        slot_bits = {(day, slot): self.grid.bit(d, t)
+                     for d, day in enumerate(self.days)
+                     for slot, t in zip(self.slots, self.grid.teaching_slots)}
+        spans.mark("prune")
 
         # Create variables: course, day, slot, faculty, room -> bool
         for _, course in courses_df.iterrows():
+            handle.check()
             for day in self.days:
                 for slot in self.slots:
+                    bit = slot_bits[(day, slot)]
                     for _, faculty in faculty_df.iterrows():
+                        available, preferred_mask = masks[faculty["id"]]
+                        if not available & bit:
+                            continue
                         if course["code"] in faculty["expertise"]:
                             for _, room in rooms_df.iterrows():
                                 if course["is_practical"] == room["is_lab"]:
                                     var_name = f"{course['code']}_{day}_{slot}_{faculty['name']}_{room['name']}"
-                                    assignments[(course["code"], day, slot, faculty["id"], room["id"])] = model.NewBoolVar(var_name)
+                                    var = model.NewBoolVar(var_name)
+                                    assignments[(course["code"], day, slot, faculty["id"], room["id"])] = var
+                                    if preferred_mask & bit:
+                                        preferred.append(var)
 
         # Constraint 1: Each course exactly once
         for _, course in courses_df.iterrows():
+            handle.check()
             exprs = []
             for day in self.days:
                 for slot in self.slots:
@@ -218,6 +298,7 @@ class TimetableGeneratorAgent:
 
         # Constraint 2: No faculty clash
         for _, faculty in faculty_df.iterrows():
+            handle.check()
             for day in self.days:
                 for slot in self.slots:
                     exprs = []
@@ -232,6 +313,7 @@ class TimetableGeneratorAgent:
 
         # Constraint 3: No room clash
         for _, room in rooms_df.iterrows():
+            handle.check()
             for day in self.days:
                 for slot in self.slots:
                     exprs = []
@@ -244,8 +326,46 @@ class TimetableGeneratorAgent:
                                         exprs.append(assignments[key])
                     model.AddAtMostOne(exprs)
 
-        # Solve
+        # Solve for feasibility first, hinting faculty preferred slots
+        for var in preferred:
+            model.AddHint(var, True)
+        handle.check()
+        spans.mark("model_build")
+        handle.attach(solver)
         status = solver.Solve(model)
+        handle.check()
+
+        # If enabled, spend a bounded budget improving preferred-slot placement from
+        # that solution; a full optimisation would otherwise run to the 30 s limit
+        if PREFERENCE_SECONDS > 0 and preferred and status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+            model.ClearHints()
+            for var in assignments.values():
+                model.AddHint(var, solver.BooleanValue(var))
+            model.Maximize(sum(preferred))
+            refiner = cp_model.CpSolver()
+            refiner.parameters.max_time_in_seconds = PREFERENCE_SECONDS
+            handle.attach(refiner)
+            refined = refiner.Solve(model)
+            handle.check()
+            if refined in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+                solver, status = refiner, refined
+        spans.mark("solve")
+        metrics.inc("timetable_solves_total", status=solver.StatusName(status))
+        proto = model.Proto()
+        self.last_stats = {
+            "status": solver.StatusName(status),
+            "wall_time": solver.WallTime(),
+            "conflicts": solver.NumConflicts(),
+            "branches": solver.NumBranches(),
+            # Sessions placed in a faculty preferred slot
+            "objective": sum(solver.BooleanValue(var) for var in preferred)
+            if status in [cp_model.OPTIMAL, cp_model.FEASIBLE] else None,
+            "variables": len(proto.variables),
+            "constraints": len(proto.constraints),
+        }
+        for name, value in self.last_stats.items():
+            if name != "status" and value is not None:
+                metrics.set(f"timetable_solver_{name}", value, program=program)
 
         if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
             raise HTTPException(status_code=400, detail="No feasible timetable found with current data")
@@ -263,13 +383,15 @@ class TimetableGeneratorAgent:
                     "day": day,
                     "time_slot": slot
                 })
+        spans.mark("extract")
 
-        # Save to Supabase
+        # Save to Supabase as a new version (only the changed rows are written)
         if timetable:
             try:
-                self.supabase.table("timetables").delete().eq("program", program).execute()  # Clear old
-                self.supabase.table("timetables").insert(timetable).execute()
-            except Exception as e:
-                print("Save error:", str(e))  # Log but continue
+                self.last_version = TimetableStore(self.supabase).publish(program, timetable)
+            except HTTPException as e:
+                print("Save error:", e.detail)  # Log but continue
+        spans.mark("persist")
+        self.last_stats["phases"] = spans.timings
 
         return timetable
\ No newline at end of file
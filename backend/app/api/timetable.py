@@ -70,11 +70,13 @@
 #         raise HTTPException(status_code=500, detail=f"Error negotiating timetable: {str(e)}")
 
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Response
 from fastapi.responses import JSONResponse
 import pandas as pd
 import io
+from typing import Optional
 from app.agents.data_curator import DataCuratorAgent
+from app.utils.metrics import metrics
 
 router = APIRouter(prefix="/timetable", tags=["timetable"])
 
@@ -85,22 +87,21 @@ async def upload_csv(table_name: str, file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="Only CSV files are allowed")
 
     try:
+        spans = metrics.spans("csv_upload", table=table_name)
         # Read the file content
         contents = await file.read()
         # Decode and read with pandas
         df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
+        spans.mark("parse")
         
         if df.empty:
             raise HTTPException(status_code=400, detail="CSV file is empty")
-
-        # Log for debugging
-        print(f"Received {len(df)} rows for table {table_name}")
-        print(f"Columns: {list(df.columns)}")
-        print(f"First row: {df.iloc[0].to_dict()}")
+        metrics.inc("csv_upload_rows_total", len(df), table=table_name)
 
         # Use the agent
         agent = DataCuratorAgent()
         cleaned_df, errors = agent.clean_and_validate(df, table_name)
+        spans.mark("validate")
 
         if errors:
             return JSONResponse(
@@ -114,6 +115,10 @@ async def upload_csv(table_name: str, file: UploadFile = File(...)):
 
         # Upload to Supabase
         result = agent.upload_to_supabase(cleaned_df, table_name)
+        spans.mark("persist")
+        inputs_changed()
+        if table_name == "students":
+            views.invalidate_students()
         
         return {
             "message": f"Successfully uploaded {len(cleaned_df)} records to {table_name}",
@@ -129,18 +134,118 @@ async def upload_csv(table_name: str, file: UploadFile = File(...)):
         print(f"Unexpected error: {str(e)}")  # This will show in terminal
         raise HTTPException(status_code=500, detail="Internal server error - check terminal logs")
 
-from app.agents.timetable_generator import TimetableGeneratorAgent
+from app.agents.timetable_generator import SolveHandle, TimetableGeneratorAgent
+from app.schemas.timetable import GenerateResponse, StudentTimetableResponse, TimetableResponse
+from app.services.notifications import get_notifier
+from app.services.timetable_views import views
+from app.utils.http_utils import COMPRESS_MIN_SIZE, negotiate
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import os
+
+# Solves run on a bounded pool rather than the event loop. Each in-flight run has a
+# SolveHandle so a client disconnect or POST /generate/{program}/cancel stops the
+# CP-SAT search and frees its slot immediately.
+#
+# Identical requests are coalesced: a run is keyed by program and input version
+# (bumped by every upload), so requests arriving while one is in flight attach to it
+# as followers and get its result - one solve, one publish and one round of
+# notifications per program however many people press Generate. The run is only
+# cancelled once every request waiting on it has disconnected.
+SOLVER_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("SOLVER_WORKERS", "2")), thread_name_prefix="solver")
+DISCONNECT_POLL_SECONDS = 0.5
+active_solves = {}
+flights = {}
+input_version = 0
+
+def inputs_changed():
+    global input_version
+    input_version += 1
+
+class SolveFlight:
+    def __init__(self, key, handle, task):
+        self.key = key
+        self.handle = handle
+        self.task = task
+        self.waiters = 0
+
+    def leave(self):
+        self.waiters -= 1
+        if self.waiters == 0:
+            self.handle.cancel("disconnect")
+
+def _notify(program: str, version):
+    # Notifications must never fail a generation that was already published
+    try:
+        students = views.students(views.get(program))
+        result = get_notifier().published(program, version, students)
+        if result["queued"]:
+            print(f"Notifications for {program}: {result}")
+    except Exception as e:
+        print(f"Notification error for {program}: {str(e)}")
 
-@router.post("/generate/{program}")
-async def generate_timetable(program: str = "FYUP"):
+async def _generate(program: str, handle: SolveHandle):
+    loop = asyncio.get_running_loop()
     agent = TimetableGeneratorAgent()
+    # A copy of the context carries the leader's timing trace into the solver thread
+    timetable = await loop.run_in_executor(SOLVER_POOL, contextvars.copy_context().run,
+                                           agent.generate, program, handle)
+    await loop.run_in_executor(None, views.published, program, agent.last_version)
+    await loop.run_in_executor(None, _notify, program, agent.last_version)
+    return {"message": f"Timetable generated for {program}", "count": len(timetable), "timetable": timetable,
+            "version": agent.last_version, "stats": agent.last_stats}
+
+def _join(program: str):
+    """The in-flight run for ``program`` at the current input version, started if
+    there is none (or the one there was cancelled). Returns (flight, leader)."""
+    key = (program, input_version)
+    flight = flights.get(key)
+    if flight is not None and not flight.handle.cancelled:
+        metrics.inc("timetable_generate_coalesced_total", program=program)
+        return flight, False
+    handle = SolveHandle(program)
+    flight = SolveFlight(key, handle, asyncio.ensure_future(_generate(program, handle)))
+    flights[key] = flight
+    active_solves.setdefault(program, set()).add(handle)
+
+    def finished(task):
+        if flights.get(key) is flight:
+            del flights[key]
+        active_solves[program].discard(handle)
+        if not active_solves[program]:
+            del active_solves[program]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every waiter has gone
+
+    flight.task.add_done_callback(finished)
+    return flight, True
+
+@router.post("/generate/{program}", response_model=GenerateResponse)
+async def generate_timetable(request: Request, program: str = "FYUP"):
+    flight, leader = _join(program)
+    flight.waiters += 1
     try:
-        timetable = agent.generate(program)
-        return {"message": f"Timetable generated for {program}", "count": len(timetable), "timetable": timetable}
+        while True:
+            done, _ = await asyncio.wait({flight.task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                break
+            if await request.is_disconnected():
+                flight.leave()
+                raise HTTPException(status_code=409, detail=f"Generation for {program} abandoned (client disconnected)")
+        flight.waiters -= 1
+        return dict(flight.task.result(), joined=not leader)
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
+
+@router.post("/generate/{program}/cancel")
+async def cancel_generation(program: str):
+    handles = list(active_solves.get(program, ()))
+    for handle in handles:
+        handle.cancel("request")
+    return {"message": f"Cancelled {len(handles)} running generation(s) for {program}", "cancelled": len(handles)}
     
 from app.agents.negotiator import NegotiatorAgent
 
@@ -159,6 +264,19 @@ async def negotiate_timetable(program: str = "FYUP"):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
+from app.agents.policy_agent import PolicyComplianceAgent
+from app.schemas.timetable import ViolationsResponse
+
+@router.get("/validate-constraints", response_model=ViolationsResponse)
+def validate_constraints():
+    try:
+        result = PolicyComplianceAgent().validate_constraints()
+        return {"message": "Constraints validated", "violations": result["violations"]}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error validating constraints: {str(e)}")
+
 
 @router.get("/faculty")
 async def get_faculty():
@@ -172,14 +290,149 @@ async def get_faculty():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching faculty: {str(e)}")
 
-@router.get("/timetable/{program}")
-async def get_timetable(program: str = "FYUP"):
-    from supabase import create_client
-    from app.config import settings
+CACHE_CONTROL = f"public, max-age={int(os.getenv('TIMETABLE_CACHE_MAX_AGE', '30'))}, must-revalidate"
 
-    client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+def _current_view(program: str):
     try:
-        response = client.table("timetables").select("*").eq("program", program).execute()
-        return {"timetable": response.data}
+        return views.get(program)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching timetable: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error fetching timetable: {str(e)}")
+
+def _view_response(request: Request, view, name: Optional[str] = None, key: Optional[str] = None):
+    if name is not None and key not in view.index[name]:
+        raise HTTPException(status_code=404, detail=f"No {name} {key} in the {view.program} timetable")
+    headers = {"ETag": view.etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if view.etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    body = view.body(name, key)
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    if encoding is not None and len(body) >= COMPRESS_MIN_SIZE:
+        # Compressed once per version instead of by the middleware on every request
+        body = view.encoded(name, key, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/timetable/{program}", response_model=TimetableResponse)
+def get_timetable(request: Request, program: str = "FYUP", version: Optional[int] = None):
+    view = _current_view(program)
+    if version is None or version == view.version:
+        return _view_response(request, view)
+
+    from app.db.timetable_store import TimetableStore
+    try:
+        return {"program": program, "version": version, "timetable": TimetableStore().rows(program, version)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching timetable: {str(e)}")
+
+@router.get("/timetable/{program}/faculty/{faculty_id}", response_model=TimetableResponse)
+def get_faculty_timetable(request: Request, program: str, faculty_id: str):
+    return _view_response(request, _current_view(program), "faculty", faculty_id)
+
+@router.get("/timetable/{program}/room/{room_id}", response_model=TimetableResponse)
+def get_room_timetable(request: Request, program: str, room_id: str):
+    return _view_response(request, _current_view(program), "room", room_id)
+
+@router.get("/timetable/{program}/day/{day}", response_model=TimetableResponse)
+def get_day_timetable(request: Request, program: str, day: str):
+    return _view_response(request, _current_view(program), "day", day)
+
+@router.get("/timetable/{program}/student/{roll_no}", response_model=StudentTimetableResponse)
+def get_student_timetable(request: Request, program: str, roll_no: str):
+    view = _current_view(program)
+    try:
+        students = views.students(view)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error building student timetables: {str(e)}")
+    if roll_no not in students:
+        raise HTTPException(status_code=404, detail=f"No student {roll_no} in {program}")
+    headers = {"ETag": view.students_etag, "Cache-Control": CACHE_CONTROL}
+    if view.students_etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    body = students.body(roll_no, {"program": program, "version": view.version, "version_id": view.version_id})
+    return Response(content=body, media_type="application/json", headers=headers)
+
+from fastapi.responses import FileResponse
+from app.services.exporter import EXPORTS, TimetableExporter
+
+def _export_response(program: str, name: str, version: Optional[int]):
+    path, record = TimetableExporter().export(program, name, version)
+    media_type = EXPORTS.get(name, "application/pdf")
+    filename = f"{program}_v{record['version']}_{name.replace('/', '_')}"
+    # Exports are immutable per version id; FileResponse streams the cached file
+    return FileResponse(path, media_type=media_type, filename=filename,
+                        headers={"Cache-Control": CACHE_CONTROL})
+
+@router.get("/export/{program}/{name}")
+def export_timetable(program: str, name: str, version: Optional[int] = None):
+    if name not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export {name}; expected one of {sorted(EXPORTS)}")
+    return _export_response(program, name, version)
+
+@router.get("/export/{program}/faculty/{faculty_id}.pdf")
+def export_faculty_pdf(program: str, faculty_id: str, version: Optional[int] = None):
+    return _export_response(program, f"faculty/{faculty_id}.pdf", version)
+
+@router.get("/export/{program}/room/{room_id}.pdf")
+def export_room_pdf(program: str, room_id: str, version: Optional[int] = None):
+    return _export_response(program, f"room/{room_id}.pdf", version)
+
+from email.utils import format_datetime, parsedate_to_datetime
+from datetime import datetime, timezone
+from app.services.calendar_sync import feeds
+
+ICS_MIME = "text/calendar; charset=utf-8"
+
+def _calendar_response(request: Request, body: Optional[bytes], etag: str, modified: datetime, missing: str):
+    if body is None:
+        raise HTTPException(status_code=404, detail=missing)
+    modified = modified.replace(microsecond=0)
+    headers = {"ETag": etag, "Last-Modified": format_datetime(modified, usegmt=True), "Cache-Control": CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            if parsedate_to_datetime(request.headers["if-modified-since"]) >= modified:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    return Response(content=body, media_type=ICS_MIME, headers=headers)
+
+def _published(view) -> datetime:
+    try:
+        published = datetime.fromisoformat(str(view.published_at).replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        published = datetime.fromtimestamp(0, timezone.utc)
+    return published if published.tzinfo else published.replace(tzinfo=timezone.utc)
+
+@router.get("/calendar/{program}/faculty/{faculty_id}.ics")
+def faculty_calendar(request: Request, program: str, faculty_id: str):
+    view = _current_view(program)
+    return _calendar_response(request, feeds.feed(view, "faculty", faculty_id), f'{view.etag[:-1]}-ics"',
+                              _published(view), f"No faculty {faculty_id} in the {program} timetable")
+
+@router.get("/calendar/{program}/room/{room_id}.ics")
+def room_calendar(request: Request, program: str, room_id: str):
+    view = _current_view(program)
+    return _calendar_response(request, feeds.feed(view, "room", room_id), f'{view.etag[:-1]}-ics"',
+                              _published(view), f"No room {room_id} in the {program} timetable")
+
+@router.get("/calendar/{program}/student/{roll_no}.ics")
+def student_calendar(request: Request, program: str, roll_no: str):
+    view = _current_view(program)
+    try:
+        students = views.students(view)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error building student timetables: {str(e)}")
+    modified = max(_published(view), view.students_built_at or _published(view))
+    return _calendar_response(request, feeds.student_feed(view, students, roll_no), f'{view.students_etag[:-1]}-ics"',
+                              modified, f"No student {roll_no} in {program}")
+
+@router.get("/notifications/stats")
+def notification_stats():
+    return get_notifier().outbox.stats()
@@ -0,0 +1,30 @@
+-- Versioned timetable storage used by app/db/timetable_store.py.
+-- Run once against the Supabase (Postgres) database; safe to re-run.
+
+alter table timetables add column if not exists valid_from integer not null default 0;
+alter table timetables add column if not exists valid_to integer;
+
+create index if not exists timetables_program_version
+    on timetables (program, valid_from, valid_to);
+
+create table if not exists timetable_versions (
+    version_id text primary key,
+    program text not null,
+    version integer not null,
+    parent text,
+    status text not null default 'pending' check (status in ('pending', 'published')),
+    row_count integer not null default 0,
+    inserted integer not null default 0,
+    updated integer not null default 0,
+    deleted integer not null default 0,
+    created_at timestamptz not null default now(),
+    -- makes claiming the next version exclusive across workers
+    unique (program, version)
+);
+
+create table if not exists timetable_current (
+    program text primary key,
+    version_id text not null references timetable_versions (version_id),
+    version integer not null,
+    published_at timestamptz not null default now()
+);
@@ -0,0 +1,258 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from fastapi import HTTPException
+from supabase import create_client
+from app.config import settings
+
+# Versioned timetable storage.
+#
+#   timetables          existing rows plus valid_from int not null default 0 and
+#                       valid_to int null; a row belongs to every version v with
+#                       valid_from <= v < valid_to (valid_to null = still live)
+#   timetable_versions  version_id text pk, program, version int, parent text,
+#                       status ('pending' | 'published'), row_count, inserted,
+#                       updated, deleted, created_at; unique (program, version)
+#   timetable_current   program text pk, version_id text, version int, published_at
+#
+# (DDL in app/db/migrations/001_timetable_versions.sql.)
+#
+# publish() diffs the new timetable against the current version and first claims
+# the next version number by inserting a pending timetable_versions record; the
+# unique (program, version) constraint makes the claim exclusive across workers,
+# and a per-program lock serialises publishes within one. The claimant writes only
+# what changed (batched inserts stamped valid_from = its version; changed and
+# removed rows are closed with one batched update per chunk of ids), marks the
+# record published and moves the pointer with a compare-and-swap on the parent
+# version_id. Readers resolve the pointer first and filter rows by version, so they
+# see either the old or the new snapshot, never a half-written one. A failed
+# publish rolls back the rows stamped with its version; a claim left behind by a
+# crashed worker is taken over once it is older than STALE_CLAIM_SECONDS.
+
+VALUE_FIELDS = ("faculty_id", "room_id", "day", "time_slot")
+STALE_CLAIM_SECONDS = float(os.getenv("TIMETABLE_STALE_CLAIM_SECONDS", "300"))
+CLAIM_WAIT_SECONDS = float(os.getenv("TIMETABLE_CLAIM_WAIT_SECONDS", "30"))
+UNIQUE_VIOLATION = "23505"
+
+_publish_locks: Dict[str, threading.Lock] = {}
+_publish_locks_guard = threading.Lock()
+
+
+def _publish_lock(program: str) -> threading.Lock:
+    with _publish_locks_guard:
+        return _publish_locks.setdefault(program, threading.Lock())
+
+
+class PublishConflict(Exception):
+    """The version a publish was about to claim or move to is held by another."""
+
+
+class TimetableStore:
+    def __init__(self, client=None, batch_size: int = 500, keep_versions: int = 10):
+        self.supabase = client or create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        self.batch_size = batch_size
+        self.keep_versions = keep_versions
+
+    def current(self, program: str) -> Optional[Dict]:
+        response = self.supabase.table("timetable_current").select("*").eq("program", program).execute()
+        return response.data[0] if response.data else None
+
+    def rows(self, program: str, version: Optional[int] = None) -> List[Dict]:
+        if version is None:
+            pointer = self.current(program)
+            if pointer is None:
+                # Nothing published yet: legacy rows are version 0
+                version = 0
+            else:
+                version = pointer["version"]
+        # Paged: a single select stops at the server's max-rows cap
+        return [row for page in self.iter_rows(program, version) for row in page]
+
+    def version(self, program: str, version: Optional[int] = None) -> Optional[Dict]:
+        """Version record (version_id, version, ...) for ``version``, or the current one."""
+        if version is None:
+            return self.current(program)
+        response = (self.supabase.table("timetable_versions").select("*")
+                    .eq("program", program).eq("version", version).eq("status", "published").execute())
+        return response.data[0] if response.data else None
+
+    def iter_rows(self, program: str, version: int, order: Tuple[str, ...] = (), page_size: int = 1000,
+                  exclude: Optional[Dict[str, Iterable]] = None, **filters) -> Iterator[List[Dict]]:
+        """Rows of ``version`` a page at a time, ordered by ``order`` (then id); rows
+        whose ``exclude`` fields hold one of the listed values are skipped. Pages
+        advance by the rows actually returned, so a server max-rows cap below
+        ``page_size`` only shortens the pages."""
+        start = 0
+        while True:
+            query = (self.supabase.table("timetables").select("*")
+                     .eq("program", program)
+                     .lte("valid_from", version)
+                     .or_(f"valid_to.is.null,valid_to.gt.{version}"))
+            for field, value in filters.items():
+                query = query.eq(field, value)
+            for field, values in (exclude or {}).items():
+                for value in values:
+                    query = query.neq(field, value)
+            for field in order + ("id",):
+                query = query.order(field)
+            page = query.range(start, start + page_size - 1).execute().data or []
+            if not page:
+                return
+            yield page
+            start += len(page)
+
+    @staticmethod
+    def _keyed(rows: List[Dict]) -> Dict[Tuple, Dict]:
+        # A course normally appears once; repeated sessions are told apart by their
+        # order within the course so an unchanged session still matches its old row.
+        keyed, seen = {}, {}
+        for row in sorted(rows, key=lambda r: (r["course_code"], str(r["day"]), str(r["time_slot"]))):
+            n = seen[row["course_code"]] = seen.get(row["course_code"], -1) + 1
+            keyed[(row["course_code"], n)] = row
+        return keyed
+
+    def diff(self, old_rows: List[Dict], new_rows: List[Dict]):
+        """Return (inserts, changed, removed): new rows without a match, (old_id, new_row)
+        pairs whose values differ, and ids of old rows that are gone."""
+        old, new = self._keyed(old_rows), self._keyed(new_rows)
+        inserts = [row for key, row in new.items() if key not in old]
+        changed = [(old[key]["id"], row) for key, row in new.items()
+                   if key in old and any(str(old[key].get(f)) != str(row.get(f)) for f in VALUE_FIELDS)]
+        removed = [row["id"] for key, row in old.items() if key not in new]
+        return inserts, changed, removed
+
+    def _batches(self, items):
+        for start in range(0, len(items), self.batch_size):
+            yield items[start:start + self.batch_size]
+
+    def publish(self, program: str, timetable: List[Dict]) -> Dict:
+        try:
+            with _publish_lock(program):
+                deadline = time.monotonic() + CLAIM_WAIT_SECONDS
+                while True:
+                    try:
+                        return self._publish(program, timetable)
+                    except PublishConflict:
+                        # Another worker is mid-publish: wait for it, then diff again
+                        if time.monotonic() >= deadline:
+                            raise
+                        time.sleep(0.2)
+        except PublishConflict as e:
+            raise HTTPException(status_code=409, detail=f"Timetable save conflict for {program}: {e}")
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Timetable save error: {str(e)}")
+
+    def _publish(self, program: str, timetable: List[Dict]) -> Dict:
+        pointer = self.current(program)
+        current_version = pointer["version"] if pointer else 0
+        old_rows = self.rows(program, current_version)
+        inserts, changed, removed = self.diff(old_rows, timetable)
+        if pointer is not None and not (inserts or changed or removed):
+            return dict(pointer, row_count=len(old_rows), inserted=0, updated=0, deleted=0, unchanged=True)
+
+        version = current_version + 1
+        now = datetime.now(timezone.utc).isoformat()
+        record = {
+            "version_id": uuid.uuid4().hex,
+            "program": program,
+            "version": version,
+            "parent": pointer["version_id"] if pointer else None,
+            "status": "pending",
+            "row_count": len(timetable),
+            "inserted": len(inserts),
+            "updated": len(changed),
+            "deleted": len(removed),
+            "created_at": now,
+        }
+        self._claim(record)
+        try:
+            # Rows stamped with this version can only be leftovers of an earlier,
+            # failed claim on it
+            self._discard_version(program, version)
+            new_rows = [dict(row, program=program, valid_from=version, valid_to=None)
+                        for row in inserts + [row for _, row in changed]]
+            for batch in self._batches(new_rows):
+                self.supabase.table("timetables").insert(batch).execute()
+            for batch in self._batches([old_id for old_id, _ in changed] + removed):
+                (self.supabase.table("timetables").update({"valid_to": version})
+                 .in_("id", batch).is_("valid_to", "null").execute())
+            (self.supabase.table("timetable_versions").update({"status": "published"})
+             .eq("version_id", record["version_id"]).execute())
+            self._move_pointer(program, pointer, record, now)
+        except Exception:
+            self._release(record)
+            raise
+        self._prune(program, version)
+        return dict(record, status="published", unchanged=False)
+
+    def _claim(self, record: Dict):
+        try:
+            self.supabase.table("timetable_versions").insert(record).execute()
+            return
+        except Exception as e:
+            if getattr(e, "code", None) != UNIQUE_VIOLATION:
+                raise
+        held = (self.supabase.table("timetable_versions").select("*")
+                .eq("program", record["program"]).eq("version", record["version"]).execute().data)
+        claim = held[0] if held else None
+        # A claim on current + 1 is unfinished by definition (the pointer has not moved)
+        if claim is None or not self._stale(claim):
+            raise PublishConflict(f"version {record['version']} is claimed by {claim and claim['version_id']}")
+        # Left by a worker that died mid-publish: take it over
+        self._release(claim)
+        try:
+            self.supabase.table("timetable_versions").insert(record).execute()
+        except Exception as e:
+            if getattr(e, "code", None) == UNIQUE_VIOLATION:
+                raise PublishConflict(f"version {record['version']} was taken over by another worker")
+            raise
+
+    @staticmethod
+    def _stale(claim: Dict) -> bool:
+        try:
+            created = datetime.fromisoformat(str(claim["created_at"]))
+        except (KeyError, ValueError):
+            return True
+        return (datetime.now(timezone.utc) - created).total_seconds() > STALE_CLAIM_SECONDS
+
+    def _move_pointer(self, program: str, pointer: Optional[Dict], record: Dict, now: str):
+        values = {"program": program, "version_id": record["version_id"], "version": record["version"],
+                  "published_at": now}
+        if pointer is None:
+            try:
+                self.supabase.table("timetable_current").insert(values).execute()
+                return
+            except Exception as e:
+                if getattr(e, "code", None) == UNIQUE_VIOLATION:
+                    raise PublishConflict("another version was published first")
+                raise
+        moved = (self.supabase.table("timetable_current").update(values)
+                 .eq("program", program).eq("version_id", pointer["version_id"]).execute().data)
+        if not moved:
+            raise PublishConflict("the current version moved during publish")
+
+    def _discard_version(self, program: str, version: int):
+        self.supabase.table("timetables").delete().eq("program", program).eq("valid_from", version).execute()
+        (self.supabase.table("timetables").update({"valid_to": None})
+         .eq("program", program).eq("valid_to", version).execute())
+
+    def _release(self, record: Dict):
+        # Best effort: a claim that cannot be released goes stale and is taken over
+        try:
+            self._discard_version(record["program"], record["version"])
+            self.supabase.table("timetable_versions").delete().eq("version_id", record["version_id"]).execute()
+        except Exception as e:
+            print(f"Could not release version {record['version']} of {record['program']}: {str(e)}")
+
+    def _prune(self, program: str, version: int):
+        # Rows that ended before the oldest retained version are unreachable
+        cutoff = version - self.keep_versions + 1
+        if cutoff <= 0:
+            return
+        self.supabase.table("timetables").delete().eq("program", program).lte("valid_to", cutoff).execute()
+        self.supabase.table("timetable_versions").delete().eq("program", program).lt("version", cutoff).execute()
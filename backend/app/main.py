@@ -12,13 +12,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.timetable import router as timetable_router
+from fastapi.responses import PlainTextResponse
+from app.utils.http_utils import CompressionMiddleware, DefaultResponse
+from app.utils.metrics import TimingMiddleware, metrics
 
 app = FastAPI(
     title="NEP 2020 AI Timetable Generator",
     description="Automated timetable for schools under NEP 2020",
-    version="1.0"
+    version="1.0",
+    default_response_class=DefaultResponse,
 )
 
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(TimingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -31,4 +38,8 @@ app.include_router(timetable_router)
 
 @app.get("/")
 def home():
-    return {"message": "Welcome to NEP 2020 AI Timetable Generator! Visit /docs for API"}
\ No newline at end of file
+    return {"message": "Welcome to NEP 2020 AI Timetable Generator! Visit /docs for API"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,79 @@
+from typing import Annotated, Any, Dict, List, Optional, Union
+from pydantic import BaseModel, BeforeValidator, ConfigDict
+from app.utils.validators import coerce_id, normalise_day, to_native
+
+Id = Annotated[Union[int, str], BeforeValidator(coerce_id)]
+Day = Annotated[str, BeforeValidator(normalise_day)]
+Native = Annotated[Any, BeforeValidator(to_native)]
+
+
+class TimetableEntry(BaseModel):
+    # Stored rows also carry id / program / valid_from / valid_to
+    model_config = ConfigDict(extra="allow")
+
+    course_code: str
+    faculty_id: Id
+    room_id: Id
+    day: Day
+    time_slot: str
+
+
+class VersionInfo(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    version_id: Optional[str] = None
+    program: Optional[str] = None
+    version: int = 0
+    parent: Optional[str] = None
+    row_count: int = 0
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: bool = False
+
+
+class SolverStats(BaseModel):
+    status: str
+    wall_time: float
+    conflicts: int = 0
+    branches: int = 0
+    objective: Optional[float] = None
+    variables: int = 0
+    constraints: int = 0
+    phases: Dict[str, float] = {}
+
+
+class GenerateResponse(BaseModel):
+    message: str
+    count: int
+    timetable: List[TimetableEntry]
+    version: Optional[VersionInfo] = None
+    stats: Optional[SolverStats] = None
+    # True when the request attached to a run already in flight for the same inputs
+    joined: bool = False
+
+
+class TimetableResponse(BaseModel):
+    # Entity views add the key they were looked up by (faculty / room / day)
+    model_config = ConfigDict(extra="allow")
+
+    program: str
+    version: int
+    version_id: Optional[str] = None
+    timetable: List[TimetableEntry]
+
+
+class StudentTimetableResponse(TimetableResponse):
+    roll_no: str
+    electives: List[str]
+    clashes: List[TimetableEntry]
+
+
+class Violation(BaseModel):
+    constraint_type: str
+    details: Dict[str, Native]
+
+
+class ViolationsResponse(BaseModel):
+    message: str
+    violations: List[Violation]
@@ -0,0 +1,163 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+from icalendar import Calendar, Event, Timezone, TimezoneDaylight, TimezoneStandard
+from app.agents.personalization import StudentSchedules
+from app.utils.slot_grid import APP_WEEK
+
+# ICS feeds for faculty, rooms and students, built from the materialised timetable
+# views. Each timetable row becomes one weekly-recurring VEVENT (DTSTART on the
+# row's day in the week the version was published, RRULE:FREQ=WEEKLY for the term)
+# and is serialised once per version; a feed is the shared calendar header plus the
+# pre-rendered events of its entity, joined once and cached on the view. Students
+# share the feed of their elective combination. Event times are local to
+# CALENDAR_TZ, so every feed carries a VTIMEZONE for it covering the term.
+
+CALENDAR_TZ = os.getenv("CALENDAR_TZ", "Asia/Kolkata")
+TERM_WEEKS = int(os.getenv("CALENDAR_TERM_WEEKS", "18"))
+PRODID = "-//NEP 2020 AI Timetable Generator//EN"
+
+
+def published_time(published_at: Optional[str]) -> datetime:
+    """``published_at`` as an aware datetime; now for missing or unparseable values.
+    Accepts a "Z" suffix, which fromisoformat only parses from Python 3.11."""
+    try:
+        published = datetime.fromisoformat(str(published_at).replace("Z", "+00:00")) if published_at else None
+    except ValueError:
+        published = None
+    if published is None:
+        return datetime.now(timezone.utc)
+    return published if published.tzinfo else published.replace(tzinfo=timezone.utc)
+
+
+def term_start(published_at: Optional[str]) -> datetime:
+    """Monday of the week the version was published (today for unpublished views)."""
+    day = published_time(published_at).date()
+    return datetime.combine(day - timedelta(days=day.weekday()), datetime.min.time())
+
+
+def _offset_changes(tz: ZoneInfo, start: datetime, end: datetime) -> List[datetime]:
+    """UTC instants in [start, end) where ``tz`` changes its UTC offset (found a day,
+    then an hour, then a minute at a time)."""
+    changes = []
+    moment = start.replace(tzinfo=timezone.utc)
+    end = end.replace(tzinfo=timezone.utc)
+    while moment < end:
+        day = moment + timedelta(days=1)
+        if moment.astimezone(tz).utcoffset() != day.astimezone(tz).utcoffset():
+            instant = moment
+            for step in (timedelta(hours=1), timedelta(minutes=1)):
+                while instant.astimezone(tz).utcoffset() == (instant + step).astimezone(tz).utcoffset():
+                    instant += step
+            changes.append(instant + timedelta(minutes=1))
+        moment = day
+    return changes
+
+
+class CalendarFeeds:
+    def __init__(self, tz: str = CALENDAR_TZ, weeks: int = TERM_WEEKS):
+        self.tz = ZoneInfo(tz)
+        self.weeks = weeks
+        self._timezones: Dict[datetime, Timezone] = {}
+
+    def _observance(self, at: datetime, before: timedelta, after: timedelta):
+        local = at.astimezone(self.tz)
+        observance = TimezoneDaylight() if local.dst() else TimezoneStandard()
+        # DTSTART is the wall-clock time of the change in the offset it changes from
+        observance.add("dtstart", (at.astimezone(timezone.utc) + before).replace(tzinfo=None))
+        observance.add("tzoffsetfrom", before)
+        observance.add("tzoffsetto", after)
+        observance.add("tzname", local.tzname())
+        return observance
+
+    def timezone(self, monday: datetime) -> Timezone:
+        """VTIMEZONE for the term starting ``monday``: one observance for the offset
+        in force at the start plus one per offset change during the term."""
+        component = self._timezones.get(monday)
+        if component is None:
+            end = monday + timedelta(weeks=self.weeks + 1)
+            component = Timezone()
+            component.add("tzid", str(self.tz))
+            offset = monday.replace(tzinfo=self.tz).utcoffset()
+            component.add_component(self._observance(monday.replace(tzinfo=self.tz), offset, offset))
+            for change in _offset_changes(self.tz, monday - timedelta(days=1), end):
+                before = (change - timedelta(minutes=1)).astimezone(self.tz).utcoffset()
+                component.add_component(self._observance(change, before, change.astimezone(self.tz).utcoffset()))
+            self._timezones[monday] = component
+        return component
+
+    def _header(self, view, name: str) -> bytes:
+        calendar = Calendar()
+        calendar.add("prodid", PRODID)
+        calendar.add("version", "2.0")
+        calendar.add("calscale", "GREGORIAN")
+        calendar.add("x-wr-calname", name)
+        calendar.add("x-wr-timezone", str(self.tz))
+        calendar.add_component(self.timezone(term_start(view.published_at)))
+        return calendar.to_ical()[:-len(b"END:VCALENDAR\r\n")]
+
+    def _event(self, view, row: Dict, monday: datetime, stamp: datetime) -> Optional[bytes]:
+        day_idx = APP_WEEK.day_index(row.get("day"))
+        slot_idx = APP_WEEK.slot_index(str(row.get("time_slot")))
+        if day_idx is None or slot_idx is None:
+            return None
+        start, end = APP_WEEK.times[slot_idx]
+        day = monday + timedelta(days=day_idx)
+        event = Event()
+        # The row id keeps sections of one course in the same slot apart; unchanged
+        # sessions keep their row (and so their UID) across versions
+        event.add("uid", f"{view.program}-{row.get('course_code')}-{APP_WEEK.days[day_idx]}-{start}"
+                         f"-{row.get('id', row.get('room_id'))}@nep-timetable")
+        event.add("dtstamp", stamp)
+        event.add("dtstart", (day + timedelta(minutes=start)).replace(tzinfo=self.tz))
+        event.add("dtend", (day + timedelta(minutes=end)).replace(tzinfo=self.tz))
+        event.add("rrule", {"freq": "weekly", "count": self.weeks})
+        event.add("summary", str(row.get("course_code")))
+        event.add("location", f"Room {row.get('room_id')}")
+        event.add("description", f"Faculty {row.get('faculty_id')}")
+        return event.to_ical()
+
+    def events(self, view) -> Dict[int, bytes]:
+        """Rendered VEVENT per row (keyed by id(row)), built in one pass per version."""
+        rendered = view._bodies.get(("ics", None, None))
+        if rendered is not None:
+            return rendered
+        monday = term_start(view.published_at)
+        stamp = published_time(view.published_at)
+        rendered = {}
+        for row in view.rows:
+            event = self._event(view, row, monday, stamp)
+            if event is not None:
+                rendered[id(row)] = event
+        with view._lock:
+            view._bodies[("ics", None, None)] = rendered
+        return rendered
+
+    def _feed(self, view, cache_key, name: str, rows: List[Dict]) -> bytes:
+        body = view._bodies.get(cache_key)
+        if body is None:
+            events = self.events(view)
+            body = b"".join([self._header(view, name)]
+                            + [events[id(row)] for row in rows if id(row) in events]
+                            + [b"END:VCALENDAR\r\n"])
+            with view._lock:
+                view._bodies[cache_key] = body
+        return body
+
+    def feed(self, view, entity: str, key: str) -> Optional[bytes]:
+        """Feed for one faculty member or room of ``view``; None if unknown."""
+        rows = view.index[entity].get(key)
+        if rows is None:
+            return None
+        return self._feed(view, ("ics", entity, key), f"{view.program} {entity} {key}", rows)
+
+    def student_feed(self, view, students: StudentSchedules, roll_no: str) -> Optional[bytes]:
+        combo_id = students.student_combo.get(str(roll_no))
+        if combo_id is None:
+            return None
+        rows = [row for code in students.combos[combo_id] for row in view.index["course"].get(code, [])]
+        return self._feed(view, ("ics", "combo", view.students_etag, combo_id), f"{view.program} timetable", rows)
+
+
+feeds = CalendarFeeds()
@@ -0,0 +1,229 @@
+import csv
+import io
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import zipfile
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+from fastapi import HTTPException
+from app.db.timetable_store import TimetableStore
+from app.utils.slot_grid import APP_WEEK, timetable_order
+
+# Downloadable exports of one stored timetable version: CSV, XLSX, per-faculty and
+# per-room PDF grids and a zip bundle of all of them.
+#
+# Rows are read from the store a page at a time (ordered by faculty / room for the
+# PDFs, so each entity's rows arrive together) and written straight to a file: CSV
+# and the zip bundle hold one page of rows plus one entity's PDF, XLSX uses
+# openpyxl's write-only mode, and the combined PDFs keep only rendered pages.
+# Files are cached on disk under <EXPORT_CACHE_DIR>/<program>/v<version>-<version_id>/
+# and served from there; a version never changes once published, so a repeat
+# download is a file send. Each file is built by one request while concurrent
+# requests wait for it. Pruning never touches the current or previous version,
+# which are the ones downloads may still be streaming from.
+
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "timetable_exports"))
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+EXPORT_KEEP_VERSIONS = int(os.getenv("EXPORT_KEEP_VERSIONS", "20"))
+
+COLUMNS = ["course_code", "faculty_id", "room_id", "day", "time_slot"]
+ENTITIES = {"faculty": "faculty_id", "room": "room_id"}
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+EXPORTS = {
+    "timetable.csv": "text/csv",
+    "timetable.xlsx": XLSX_MIME,
+    "faculty.pdf": "application/pdf",
+    "room.pdf": "application/pdf",
+    "bundle.zip": "application/zip",
+}
+
+
+def _atomic_write(path: str, write):
+    """Run write(tmp_path) and move the result into place."""
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class TimetableExporter:
+    def __init__(self, store: Optional[TimetableStore] = None, cache_dir: str = EXPORT_CACHE_DIR,
+                 page_size: int = EXPORT_PAGE_SIZE, keep_versions: int = EXPORT_KEEP_VERSIONS):
+        self.store = store or TimetableStore()
+        self.cache_dir = cache_dir
+        self.page_size = page_size
+        self.keep_versions = keep_versions
+
+    _locks: Dict[str, threading.Lock] = {}
+    _locks_guard = threading.Lock()
+
+    @classmethod
+    def _lock(cls, path: str) -> threading.Lock:
+        with cls._locks_guard:
+            return cls._locks.setdefault(path, threading.Lock())
+
+    def resolve(self, program: str, version: Optional[int] = None) -> Dict:
+        record = self.store.version(program, version)
+        if record is None:
+            if version is None:
+                raise HTTPException(status_code=404, detail=f"No published timetable for {program}")
+            raise HTTPException(status_code=404, detail=f"Unknown or pruned version {version} of {program}")
+        return record
+
+    def export(self, program: str, name: str, version: Optional[int] = None) -> Tuple[str, Dict]:
+        """Path of the cached export ``name`` (a key of EXPORTS, or "faculty/<id>.pdf" /
+        "room/<id>.pdf"), building it first if needed. Returns (path, version record)."""
+        if os.path.normpath(name) != name or name.startswith(("/", ".")):
+            raise HTTPException(status_code=404, detail=f"Unknown export {name}")
+        record = self.resolve(program, version)
+        directory = os.path.join(self.cache_dir, quote(program, safe=""),
+                                 f"v{record['version']}-{record['version_id']}")
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            with self._lock(path):
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    _atomic_write(path, lambda tmp: self._build(program, record["version"], name, tmp))
+                    self._prune(program, directory)
+        return path, record
+
+    def _build(self, program: str, version: int, name: str, path: str):
+        if name == "timetable.csv":
+            with open(path, "w", newline="") as fh:
+                self.write_csv(fh, self._rows(program, version))
+        elif name == "timetable.xlsx":
+            self.write_xlsx(path, self._rows(program, version))
+        elif name == "bundle.zip":
+            self.write_bundle(path, program, version)
+        elif name in ("faculty.pdf", "room.pdf"):
+            entity = name[:-4]
+            with open(path, "wb") as fh:
+                self.write_pdf(fh, entity, self._groups(program, version, entity))
+        else:
+            entity, _, filename = name.partition("/")
+            key = filename[:-4] if filename.endswith(".pdf") else None
+            if entity not in ENTITIES or not key:
+                raise HTTPException(status_code=404, detail=f"Unknown export {name}")
+            rows = list(self._rows(program, version, **{ENTITIES[entity]: key}))
+            if not rows:
+                raise HTTPException(status_code=404, detail=f"No {entity} {key} in the {program} timetable")
+            with open(path, "wb") as fh:
+                self.write_pdf(fh, entity, [(key, rows)])
+
+    def _stream(self, program: str, version: int, order: Tuple[str, ...] = (), **filters) -> Iterator[Dict]:
+        for page in self.store.iter_rows(program, version, order, self.page_size, **filters):
+            yield from page
+
+    def _rows(self, program: str, version: int, **filters) -> Iterator[Dict]:
+        """Rows in timetable order (day, slot start, course). The store can only sort
+        labels as text, so rows are fetched a day at a time and sorted in memory."""
+        for day in APP_WEEK.days:
+            yield from sorted(self._stream(program, version, day=day, **filters), key=timetable_order)
+        # Days off the grid, if any, come last
+        yield from sorted(self._stream(program, version, exclude={"day": APP_WEEK.days}, **filters),
+                          key=timetable_order)
+
+    def _groups(self, program: str, version: int, entity: str) -> Iterator[Tuple[str, List[Dict]]]:
+        field = ENTITIES[entity]
+        rows = self._stream(program, version, (field,))
+        for key, group in groupby(rows, key=lambda row: str(row.get(field))):
+            yield key, sorted(group, key=timetable_order)
+
+    @staticmethod
+    def write_csv(fh, rows: Iterable[Dict]):
+        writer = csv.writer(fh)
+        writer.writerow(COLUMNS)
+        for row in rows:
+            writer.writerow([row.get(column) for column in COLUMNS])
+
+    @staticmethod
+    def write_xlsx(path: str, rows: Iterable[Dict]):
+        from openpyxl import Workbook
+
+        # write_only streams rows to a temporary file instead of keeping cell objects
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Timetable")
+        sheet.append(COLUMNS)
+        for row in rows:
+            sheet.append([None if row.get(column) is None else str(row.get(column)) for column in COLUMNS])
+        workbook.save(path)
+
+    @staticmethod
+    def write_pdf(fh, entity: str, groups: Iterable[Tuple[str, List[Dict]]]):
+        """One landscape page per entity: days across, slots down."""
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.pdfgen import canvas
+        from reportlab.platypus import Table, TableStyle
+
+        width, height = landscape(A4)
+        pdf = canvas.Canvas(fh, pagesize=(width, height))
+        other = "room_id" if entity == "faculty" else "faculty_id"
+        other_label = "Room" if entity == "faculty" else "Faculty"
+        drawn = False
+        for key, rows in groups:
+            cells = [[""] * len(APP_WEEK.days) for _ in APP_WEEK.labels]
+            for row in rows:
+                day_idx, slot_idx = APP_WEEK.day_index(row.get("day")), APP_WEEK.slot_index(str(row.get("time_slot")))
+                if day_idx is None or slot_idx is None:
+                    continue
+                text = f"{row.get('course_code')}\n{other_label} {row.get(other)}"
+                cell = cells[slot_idx][day_idx]
+                cells[slot_idx][day_idx] = f"{cell}\n{text}" if cell else text
+            for slot_idx in APP_WEEK.break_slots:
+                cells[slot_idx] = ["Break"] * len(APP_WEEK.days)
+
+            data = [["Time"] + APP_WEEK.days] + [[label] + cells[i] for i, label in enumerate(APP_WEEK.labels)]
+            table = Table(data, colWidths=[70] + [(width - 110) / len(APP_WEEK.days)] * len(APP_WEEK.days))
+            style = [
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+                ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+                ("FONTSIZE", (0, 0), (-1, -1), 8),
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ]
+            style += [("BACKGROUND", (1, i + 1), (-1, i + 1), colors.whitesmoke) for i in APP_WEEK.break_slots]
+            table.setStyle(TableStyle(style))
+
+            pdf.setFont("Helvetica-Bold", 14)
+            pdf.drawString(40, height - 40, f"{entity.capitalize()} {key}")
+            _, table_height = table.wrapOn(pdf, width - 80, height - 100)
+            table.drawOn(pdf, 40, height - 60 - table_height)
+            pdf.showPage()
+            drawn = True
+        if not drawn:
+            pdf.drawString(40, height - 40, "No timetable entries")
+            pdf.showPage()
+        pdf.save()
+
+    def write_bundle(self, path: str, program: str, version: int):
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as bundle:
+            with bundle.open(f"{program}_timetable.csv", "w") as entry:
+                with io.TextIOWrapper(entry, newline="", encoding="utf-8") as fh:
+                    self.write_csv(fh, self._rows(program, version))
+            for entity in ENTITIES:
+                # Entries are written one entity at a time; only that entity's PDF is buffered
+                for key, rows in self._groups(program, version, entity):
+                    with bundle.open(f"{entity}/{key}.pdf", "w") as entry:
+                        self.write_pdf(entry, entity, [(key, rows)])
+
+    def _prune(self, program: str, keep: str):
+        """Drop cached versions of ``program`` beyond the ``keep_versions`` newest, but
+        only ones older than the previous version (and never ``keep``)."""
+        root = os.path.dirname(keep)
+        versions = []
+        for name in os.listdir(root):
+            number, _, _ = name[1:].partition("-")
+            if name.startswith("v") and number.isdigit():
+                versions.append((int(number), os.path.join(root, name)))
+        current = self.store.current(program)
+        floor = (current["version"] if current else 0) - 1
+        for number, directory in sorted(versions, reverse=True)[self.keep_versions:]:
+            if number < floor and directory != keep:
+                shutil.rmtree(directory, ignore_errors=True)
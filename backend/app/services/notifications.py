@@ -0,0 +1,271 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from app.agents.personalization import StudentSchedules
+from app.db.timetable_store import VALUE_FIELDS, TimetableStore
+
+# Change notifications for republished timetables.
+#
+# diff_assignments() matches the rows of two versions by the store's keys
+# (course_code, session order) and keeps only sessions that were added, removed or
+# changed. Each change is mapped to the people and rooms it touches: old and new
+# faculty, old and new room, and the students whose elective combination contains
+# the course. Changes are grouped into one message per recipient and queued in a
+# SQLite outbox keyed by (program, from, to, recipient), so re-running a publish
+# never queues twice. flush() hands pending messages to a Sender in batches and
+# marks them sent; failed batches stay pending until MAX_ATTEMPTS.
+#
+# Publishing only queues: delivery runs on the notifier's background flusher, woken
+# on each publish and every FLUSH_INTERVAL seconds to retry pending batches, so a
+# generate request never waits on a Sender. The outbox and the file sender's log
+# live under NOTIFY_DIR (a temp directory unless configured), not the working directory.
+
+NOTIFY_DIR = os.getenv("NOTIFY_DIR", os.path.join(tempfile.gettempdir(), "timetable_notifications"))
+OUTBOX_PATH = os.getenv("NOTIFY_OUTBOX_PATH", os.path.join(NOTIFY_DIR, "outbox.db"))
+NOTIFY_FILE_PATH = os.getenv("NOTIFY_FILE_PATH", os.path.join(NOTIFY_DIR, "notifications.jsonl"))
+BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "100"))
+MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5"))
+FLUSH_INTERVAL = float(os.getenv("NOTIFY_FLUSH_INTERVAL", "60"))
+SESSION_FIELDS = ("course_code",) + VALUE_FIELDS
+
+
+def _session(row: Dict) -> Dict:
+    return {field: row.get(field) for field in SESSION_FIELDS}
+
+
+def diff_assignments(old_rows: List[Dict], new_rows: List[Dict]) -> List[Dict]:
+    """Sessions that differ between two versions: added, removed or updated (with the
+    changed fields)."""
+    old, new = TimetableStore._keyed(old_rows), TimetableStore._keyed(new_rows)
+    changes = []
+    for key, row in new.items():
+        before = old.get(key)
+        if before is None:
+            changes.append({"course_code": key[0], "change": "added", "before": None, "after": _session(row)})
+            continue
+        fields = [f for f in VALUE_FIELDS if str(before.get(f)) != str(row.get(f))]
+        if fields:
+            changes.append({"course_code": key[0], "change": "updated", "fields": fields,
+                            "before": _session(before), "after": _session(row)})
+    for key, row in old.items():
+        if key not in new:
+            changes.append({"course_code": key[0], "change": "removed", "before": _session(row), "after": None})
+    return changes
+
+
+def recipients(changes: List[Dict], students: Optional[StudentSchedules] = None) -> Dict[tuple, List[Dict]]:
+    """Map changes to {(recipient_type, recipient_id): [changes]}. Students are matched
+    through ``students`` (built for the new version), so only courses it knows about
+    reach students."""
+    targets = defaultdict(list)
+    course_changes = defaultdict(list)
+    for change in changes:
+        touched = set()
+        for side in (change["before"], change["after"]):
+            if side:
+                touched.add(("faculty", str(side["faculty_id"])))
+                touched.add(("room", str(side["room_id"])))
+        for target in touched:
+            targets[target].append(change)
+        course_changes[change["course_code"]].append(change)
+
+    if students is not None and course_changes:
+        combo_changes = {}
+        for combo_id, combo in enumerate(students.combos):
+            matched = [change for code in combo for change in course_changes.get(code, ())]
+            if matched:
+                combo_changes[combo_id] = matched
+        for roll_no, combo_id in students.student_combo.items():
+            matched = combo_changes.get(combo_id)
+            if matched:
+                targets[("student", roll_no)] = matched
+    return targets
+
+
+class Sender(ABC):
+    """Delivery backend. send() gets a batch of messages and raises to signal failure."""
+
+    @abstractmethod
+    def send(self, messages: List[Dict]):
+        ...
+
+
+class MemorySender(Sender):
+    def __init__(self):
+        self.sent: List[Dict] = []
+
+    def send(self, messages: List[Dict]):
+        self.sent.extend(messages)
+
+
+class FileSender(Sender):
+    """Appends each message as a JSON line (local development / audit trail)."""
+
+    def __init__(self, path: str = NOTIFY_FILE_PATH):
+        self.path = path
+
+    def send(self, messages: List[Dict]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as fh:
+            for message in messages:
+                fh.write(json.dumps(message, default=str) + "\n")
+
+
+SENDERS = {"file": FileSender, "memory": MemorySender}
+
+
+class Outbox:
+    def __init__(self, path: str = OUTBOX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dedup_key TEXT UNIQUE NOT NULL,
+                program TEXT NOT NULL,
+                recipient_type TEXT NOT NULL,
+                recipient_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                sent_at REAL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (status, id)")
+
+    def enqueue(self, messages: Iterable[Dict]) -> int:
+        """Queue messages (dicts with dedup_key, program, recipient_type, recipient_id);
+        returns how many were new."""
+        rows = [(m["dedup_key"], m["program"], m["recipient_type"], m["recipient_id"],
+                 json.dumps(m, default=str), time.time()) for m in messages]
+        with self._lock:
+            before = self._db.total_changes
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR IGNORE INTO outbox (dedup_key, program, recipient_type, recipient_id, payload, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._db.execute("COMMIT")
+            return self._db.total_changes - before
+
+    def flush(self, sender: Sender, batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+        # One flusher at a time, so a pending batch is never handed out twice
+        with self._flush_lock:
+            return self._flush(sender, batch_size)
+
+    def _flush(self, sender: Sender, batch_size: int) -> Dict[str, int]:
+        sent = failed = 0
+        while True:
+            with self._lock:
+                batch = self._db.execute(
+                    "SELECT id, payload FROM outbox WHERE status = 'pending' ORDER BY id LIMIT ?",
+                    (batch_size,)).fetchall()
+            if not batch:
+                break
+            ids = [row[0] for row in batch]
+            marks = ",".join("?" * len(ids))
+            try:
+                sender.send([json.loads(row[1]) for row in batch])
+            except Exception as e:
+                with self._lock:
+                    self._db.execute(
+                        f"UPDATE outbox SET attempts = attempts + 1, last_error = ?,"
+                        f" status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END"
+                        f" WHERE id IN ({marks})", [str(e), MAX_ATTEMPTS] + ids)
+                failed += len(ids)
+                break
+            with self._lock:
+                self._db.execute(f"UPDATE outbox SET status = 'sent', attempts = attempts + 1, sent_at = ?"
+                                 f" WHERE id IN ({marks})", [time.time()] + ids)
+            sent += len(ids)
+        return {"sent": sent, "failed": failed}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+
+class ChangeNotifier:
+    def __init__(self, outbox: Optional[Outbox] = None, sender: Optional[Sender] = None,
+                 store: Optional[TimetableStore] = None, flush_interval: float = FLUSH_INTERVAL):
+        self.outbox = outbox or Outbox()
+        self.sender = sender or SENDERS[os.getenv("NOTIFY_SENDER", "file")]()
+        self.store = store
+        self.flush_interval = flush_interval
+        self._wake = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_lock = threading.Lock()
+
+    def messages(self, program: str, old: Dict, new: Dict, old_rows: List[Dict], new_rows: List[Dict],
+                 students: Optional[StudentSchedules] = None) -> List[Dict]:
+        changes = diff_assignments(old_rows, new_rows)
+        return [{
+            "dedup_key": f"{program}:{old['version_id']}:{new['version_id']}:{kind}:{target}",
+            "program": program,
+            "from_version": old["version"],
+            "to_version": new["version"],
+            "recipient_type": kind,
+            "recipient_id": target,
+            "changes": targeted,
+        } for (kind, target), targeted in sorted(recipients(changes, students).items())]
+
+    def published(self, program: str, version: Optional[Dict], students: Optional[StudentSchedules] = None) -> Dict:
+        """Queue notifications for a publish result from TimetableStore.publish; they
+        are sent by the background flusher."""
+        if not version or version.get("unchanged") or not version.get("parent"):
+            return {"queued": 0}
+        store = self.store or TimetableStore()
+        old = {"version_id": version["parent"], "version": version["version"] - 1}
+        messages = self.messages(program, old, version, store.rows(program, old["version"]),
+                                 store.rows(program, version["version"]), students)
+        queued = self.outbox.enqueue(messages)
+        if queued:
+            self.flush_soon()
+        return {"queued": queued}
+
+    def flush(self) -> Dict[str, int]:
+        """Send pending messages now, on the calling thread."""
+        return self.outbox.flush(self.sender)
+
+    def flush_soon(self):
+        """Wake the background flusher, starting it on first use."""
+        with self._flusher_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="notify-flusher", daemon=True)
+                self._flusher.start()
+        self._wake.set()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                result = self.flush()
+                if result["sent"] or result["failed"]:
+                    print(f"Notifications flushed: {result}")
+            except Exception as e:
+                print(f"Notification flush error: {str(e)}")
+
+
+_notifier: Optional[ChangeNotifier] = None
+_notifier_lock = threading.Lock()
+
+
+def get_notifier() -> ChangeNotifier:
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None:
+            _notifier = ChangeNotifier()
+            # Deliver anything left pending by a previous process
+            _notifier.flush_soon()
+        return _notifier
@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+from app.db.timetable_store import TimetableStore
+from app.agents.personalization import PersonalizationAgent, StudentSchedules
+from app.utils.http_utils import compress, dumps
+from app.utils.slot_grid import timetable_order
+
+# Materialised read views of the current timetable version per program, indexed by
+# faculty, room, day and course. A view is rebuilt when a new version is published
+# (or when the stored pointer is seen to move, checked at most every
+# POINTER_CHECK_SECONDS), and each entity's JSON body is serialised (and compressed)
+# once per version, so repeat reads are a dict lookup plus an ETag comparison.
+# Per-student schedules are materialised lazily, once per version, and rebuilt when
+# the students table is re-uploaded.
+
+POINTER_CHECK_SECONDS = float(os.getenv("TIMETABLE_VIEW_POINTER_CHECK", "5"))
+INDEXES = {"faculty": "faculty_id", "room": "room_id", "day": "day", "course": "course_code"}
+
+
+class TimetableView:
+    def __init__(self, program: str, pointer: Optional[Dict], rows: List[Dict]):
+        self.program = program
+        self.version = pointer["version"] if pointer else 0
+        self.version_id = pointer["version_id"] if pointer else None
+        self.published_at = pointer.get("published_at") if pointer else None
+        self.etag = f'"{program}-{self.version_id or self.version}"'
+        self.rows = sorted(rows, key=timetable_order)
+        self.index = {name: {} for name in INDEXES}
+        for row in self.rows:
+            for name, field in INDEXES.items():
+                self.index[name].setdefault(str(row.get(field)), []).append(row)
+        self._bodies = {}
+        self._lock = threading.Lock()
+        self.checked = time.monotonic()
+        self.students: Optional[StudentSchedules] = None
+        self.students_etag = None
+        self.students_built_at = None
+
+    def keys(self, name: str) -> List[str]:
+        return sorted(self.index[name])
+
+    def body(self, name: Optional[str] = None, key: Optional[str] = None) -> Optional[bytes]:
+        """Serialised response for the whole program (name=None) or one entity; None if unknown."""
+        cache_key = (name, key)
+        body = self._bodies.get(cache_key)
+        if body is not None:
+            return body
+        if name is None:
+            payload = {"program": self.program, "version": self.version, "version_id": self.version_id,
+                       "timetable": self.rows}
+        else:
+            rows = self.index[name].get(key)
+            if rows is None:
+                return None
+            payload = {"program": self.program, "version": self.version, "version_id": self.version_id,
+                       name: key, "timetable": rows}
+        body = dumps(payload)
+        with self._lock:
+            self._bodies[cache_key] = body
+        return body
+
+    def encoded(self, name: Optional[str], key: Optional[str], encoding: str) -> Optional[bytes]:
+        """Compressed variant of body(), compressed once per version and encoding."""
+        cache_key = (name, key, encoding)
+        body = self._bodies.get(cache_key)
+        if body is None:
+            raw = self.body(name, key)
+            if raw is None:
+                return None
+            body = compress(raw, encoding)
+            with self._lock:
+                self._bodies[cache_key] = body
+        return body
+
+
+class TimetableViews:
+    def __init__(self, store_factory=TimetableStore):
+        self.store_factory = store_factory
+        self._views: Dict[str, TimetableView] = {}
+        self._lock = threading.Lock()
+        self._rebuild_locks: Dict[str, threading.Lock] = {}
+        self._student_generation: Dict[str, int] = {}
+
+    def _rebuild_lock(self, program: str) -> threading.Lock:
+        with self._lock:
+            return self._rebuild_locks.setdefault(program, threading.Lock())
+
+    def rebuild(self, program: str, fresh: Optional[Callable[[TimetableView], bool]] = None) -> TimetableView:
+        """Build and install the view of the stored current version. Rebuilds of one
+        program are serialised; a caller that waited returns the installed view
+        instead when ``fresh(view)`` says it is already what it needed."""
+        with self._rebuild_lock(program):
+            installed = self._views.get(program)
+            if installed is not None and fresh is not None and fresh(installed):
+                return installed
+            store = self.store_factory()
+            pointer = store.current(program)
+            view = TimetableView(program, pointer, store.rows(program, pointer["version"] if pointer else 0))
+            with self._lock:
+                self._views[program] = view
+            return view
+
+    def get(self, program: str) -> TimetableView:
+        view = self._views.get(program)
+        if view is None:
+            return self.rebuild(program, fresh=lambda installed: True)
+        if time.monotonic() - view.checked > POINTER_CHECK_SECONDS:
+            pointer = self.store_factory().current(program)
+            version_id = pointer["version_id"] if pointer else None
+            if version_id != view.version_id:
+                return self.rebuild(program, fresh=lambda installed: installed.version_id == version_id)
+            view.checked = time.monotonic()
+        return view
+
+    def published(self, program: str, version: Optional[Dict]):
+        """Called after a publish: rebuild unless the version is the one already served."""
+        version_id = version.get("version_id") if version else None
+        view = self._views.get(program)
+        if view is None or version_id is None or version_id != view.version_id:
+            self.rebuild(program, fresh=lambda installed: version_id is not None and installed.version_id == version_id)
+
+    def students(self, view: TimetableView) -> StudentSchedules:
+        """Per-student schedules for ``view``, joined once per version / students upload."""
+        schedules = view.students
+        if schedules is not None:
+            return schedules
+        with view._lock:
+            if view.students is None:
+                generation = self._student_generation.get(view.program, 0)
+                agent = PersonalizationAgent(self.store_factory().supabase)
+                view.students = agent.build(view.program, view.rows)
+                view.students_etag = f'"{view.program}-{view.version_id or view.version}-s{generation}"'
+                view.students_built_at = datetime.now(timezone.utc)
+            return view.students
+
+    def invalidate_students(self, program: Optional[str] = None):
+        """Drop materialised student schedules (all programs if ``program`` is None)."""
+        with self._lock:
+            targets = [program] if program is not None else list(self._views)
+            for name in targets:
+                self._student_generation[name] = self._student_generation.get(name, 0) + 1
+                view = self._views.get(name)
+                if view is not None:
+                    view.students = None
+
+
+views = TimetableViews()
@@ -0,0 +1,34 @@
+import pytest
+from benchmarks.instances import sized_instance
+from benchmarks.memory_source import MemorySource
+import app.agents.personalization as personalization
+import app.agents.timetable_generator as timetable_generator
+import app.db.timetable_store as timetable_store
+import app.services.notifications as notifications
+from app.services.notifications import ChangeNotifier, MemorySender, Outbox
+
+# Tests run the real store, views and agents against benchmarks.MemorySource, the
+# in-memory Supabase stand-in, so no database is needed. Run from backend/:
+#   python -m pytest app/tests
+
+PROGRAM = "FYUP"
+
+
+def session(course: str, faculty_id, day: str = "Mon", time_slot: str = "9:00-10:00", room_id=1):
+    return {"course_code": course, "faculty_id": faculty_id, "room_id": room_id, "day": day, "time_slot": time_slot}
+
+
+@pytest.fixture
+def source(monkeypatch):
+    """A tiny synthetic instance; every create_client() call returns it."""
+    source = MemorySource(sized_instance("tiny")["tables"])
+    for module in (timetable_store, timetable_generator, personalization):
+        monkeypatch.setattr(module, "create_client", lambda *args: source)
+    return source
+
+
+@pytest.fixture
+def notifier(source, tmp_path, monkeypatch):
+    notifier = ChangeNotifier(Outbox(str(tmp_path / "outbox.db")), MemorySender(), timetable_store.TimetableStore(source))
+    monkeypatch.setattr(notifications, "_notifier", notifier)
+    return notifier
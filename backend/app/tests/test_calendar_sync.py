@@ -0,0 +1,118 @@
+import threading
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+import pytest
+from fastapi.testclient import TestClient
+from icalendar import Calendar
+import app.api.timetable as api
+from app.db.timetable_store import TimetableStore
+from app.main import app
+from app.services.calendar_sync import CalendarFeeds, _offset_changes
+from app.services.timetable_views import TimetableViews
+from conftest import PROGRAM, session
+
+ROWS = [
+    dict(session("C1", 1), id=1),
+    # Two sections of C1 in the same slot: different rows, different rooms
+    dict(session("C1", 2, room_id=2), id=2),
+    dict(session("C2", 1, day="Fri", time_slot="13:00-14:00"), id=3),
+    dict(session("C3", 1, day="Sun"), id=4),
+]
+
+
+def view(published_at: str):
+    return SimpleNamespace(program=PROGRAM, published_at=published_at, rows=ROWS, _bodies={}, _lock=threading.Lock(),
+                           index={"faculty": {"1": [ROWS[0], ROWS[2], ROWS[3]]}})
+
+
+def feed(tz: str, published_at: str = "2026-10-19T05:00:00+00:00") -> Calendar:
+    return Calendar.from_ical(CalendarFeeds(tz).feed(view(published_at), "faculty", "1"))
+
+
+def test_feed_is_a_valid_calendar():
+    calendar = feed("Asia/Kolkata")
+    assert calendar["VERSION"] == "2.0"
+    events = calendar.walk("VEVENT")
+    # The Sunday session is off the grid and skipped
+    assert [str(event["SUMMARY"]) for event in events] == ["C1", "C2"]
+    monday = events[0].decoded("DTSTART")
+    assert monday == datetime(2026, 10, 19, 9, 0, tzinfo=ZoneInfo("Asia/Kolkata"))
+    assert events[1].decoded("DTSTART") == datetime(2026, 10, 23, 13, 0, tzinfo=ZoneInfo("Asia/Kolkata"))
+    assert events[0].decoded("DTEND") - monday == timedelta(hours=1)
+    assert events[0]["RRULE"]["FREQ"] == ["WEEKLY"]
+
+
+@pytest.mark.parametrize("tz", ["Asia/Kolkata", "America/New_York", "Europe/Berlin"])
+def test_events_reference_an_embedded_vtimezone(tz):
+    calendar = feed(tz)
+    (timezone,) = calendar.walk("VTIMEZONE")
+    assert str(timezone["TZID"]) == tz
+    assert timezone.walk("STANDARD") or timezone.walk("DAYLIGHT")
+    for event in calendar.walk("VEVENT"):
+        assert event["DTSTART"].params["TZID"] == tz
+        assert event["DTEND"].params["TZID"] == tz
+
+
+def test_vtimezone_covers_offset_changes_in_the_term():
+    calendar = feed("America/New_York", "2026-10-19T05:00:00+00:00")
+    (timezone,) = calendar.walk("VTIMEZONE")
+    # DST ends on 2026-11-01 at 02:00 EDT, inside the 18-week term
+    (standard,) = timezone.walk("STANDARD")
+    assert standard.decoded("DTSTART") == datetime(2026, 11, 1, 2, 0)
+    assert standard.decoded("TZOFFSETFROM") == timedelta(hours=-4)
+    assert standard.decoded("TZOFFSETTO") == timedelta(hours=-5)
+
+
+def test_offset_changes_are_found_to_the_minute():
+    changes = _offset_changes(ZoneInfo("Europe/Berlin"), datetime(2026, 1, 1), datetime(2026, 12, 31))
+    assert [c.strftime("%Y-%m-%d %H:%M") for c in changes] == ["2026-03-29 01:00", "2026-10-25 01:00"]
+
+
+def test_uids_are_unique_per_row():
+    calendar = Calendar.from_ical(CalendarFeeds("Asia/Kolkata")._feed(view("2026-10-19T05:00:00+00:00"),
+                                                                     ("ics", None, "all"), "all", ROWS))
+    uids = [str(event["UID"]) for event in calendar.walk("VEVENT")]
+    assert len(uids) == 3
+    assert len(set(uids)) == 3
+
+
+@pytest.mark.parametrize("published_at", ["2026-10-19T05:00:00Z", "2026-10-19T05:00:00", "not a date", None])
+def test_feeds_tolerate_any_published_at(published_at):
+    calendar = Calendar.from_ical(CalendarFeeds("Asia/Kolkata").feed(view(published_at), "faculty", "1"))
+    assert len(calendar.walk("VEVENT")) == 2
+    if published_at and published_at[0].isdigit():
+        assert calendar.walk("VEVENT")[0].decoded("DTSTART").date() == date(2026, 10, 19)
+
+
+@pytest.fixture
+def client(source, monkeypatch):
+    monkeypatch.setattr(api, "views", TimetableViews())
+    monkeypatch.setattr(api, "feeds", CalendarFeeds("Asia/Kolkata"))
+    TimetableStore(source).publish(PROGRAM, [session("C0001", 1), session("C0002", 2, day="Tue", room_id=2)])
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", [f"/timetable/calendar/{PROGRAM}/faculty/1.ics",
+                                  f"/timetable/calendar/{PROGRAM}/room/2.ics",
+                                  f"/timetable/calendar/{PROGRAM}/student/S000001.ics"])
+def test_matching_etag_is_not_modified(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.headers["content-type"].startswith("text/calendar")
+    Calendar.from_ical(first.content)
+    second = client.get(path, headers={"If-None-Match": first.headers["etag"]})
+    assert (second.status_code, second.content) == (304, b"")
+
+
+def test_calendar_honours_if_modified_since(client):
+    path = f"/timetable/calendar/{PROGRAM}/room/1.ics"
+    modified = client.get(path).headers["last-modified"]
+    assert client.get(path, headers={"If-Modified-Since": modified}).status_code == 304
+    assert client.get(path, headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}).status_code == 200
+    # If-None-Match takes precedence over If-Modified-Since
+    assert client.get(path, headers={"If-None-Match": '"other"', "If-Modified-Since": modified}).status_code == 200
+
+
+def test_unknown_entities_are_not_found(client):
+    assert client.get(f"/timetable/calendar/{PROGRAM}/faculty/99.ics").status_code == 404
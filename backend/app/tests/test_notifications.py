@@ -0,0 +1,86 @@
+import time
+import app.services.notifications as notifications
+from app.db.timetable_store import TimetableStore
+from app.services.notifications import MemorySender, Outbox, Sender
+from conftest import PROGRAM, session
+
+
+class FlakySender(Sender):
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.sent = []
+
+    def send(self, messages):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("mail relay unavailable")
+        self.sent.extend(messages)
+
+
+def message(recipient_id: str, to_version: str = "v2"):
+    return {"dedup_key": f"{PROGRAM}:v1:{to_version}:faculty:{recipient_id}", "program": PROGRAM,
+            "recipient_type": "faculty", "recipient_id": recipient_id}
+
+
+def test_enqueue_ignores_duplicates(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    assert outbox.enqueue([message("1"), message("2")]) == 2
+    assert outbox.enqueue([message("2"), message("3")]) == 1
+    sender = MemorySender()
+    assert outbox.flush(sender) == {"sent": 3, "failed": 0}
+    assert outbox.enqueue([message("1")]) == 0
+    assert outbox.flush(sender) == {"sent": 0, "failed": 0}
+    assert [m["recipient_id"] for m in sender.sent] == ["1", "2", "3"]
+
+
+def test_failed_batches_are_retried(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    outbox.enqueue([message("1"), message("2")])
+    sender = FlakySender(failures=1)
+    assert outbox.flush(sender) == {"sent": 0, "failed": 2}
+    assert outbox.stats() == {"pending": 2}
+    assert outbox.flush(sender) == {"sent": 2, "failed": 0}
+    assert outbox.stats() == {"sent": 2}
+
+
+def test_messages_fail_after_max_attempts(tmp_path, monkeypatch):
+    monkeypatch.setattr(notifications, "MAX_ATTEMPTS", 2)
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    outbox.enqueue([message("1")])
+    sender = FlakySender(failures=5)
+    outbox.flush(sender)
+    outbox.flush(sender)
+    assert outbox.stats() == {"failed": 1}
+    assert outbox.flush(sender) == {"sent": 0, "failed": 0}
+
+
+def test_republishing_notifies_each_recipient_once(source, notifier):
+    store = TimetableStore(source)
+    store.publish(PROGRAM, [session("C1", 1), session("C2", 2)])
+    version = store.publish(PROGRAM, [session("C1", 3), session("C2", 2)])
+    assert notifier.published(PROGRAM, version) == {"queued": 3}
+    assert notifier.flush() == {"sent": 3, "failed": 0}
+    recipients = {(m["recipient_type"], m["recipient_id"]) for m in notifier.sender.sent}
+    assert recipients == {("faculty", "1"), ("faculty", "3"), ("room", "1")}
+    assert notifier.published(PROGRAM, version)["queued"] == 0
+    assert notifier.published(PROGRAM, store.publish(PROGRAM, [session("C1", 3), session("C2", 2)]))["queued"] == 0
+
+
+def test_publishing_does_not_wait_for_delivery(source, tmp_path):
+    class SlowSender(MemorySender):
+        def send(self, messages):
+            time.sleep(0.5)
+            super().send(messages)
+
+    store = TimetableStore(source)
+    notifier = notifications.ChangeNotifier(Outbox(str(tmp_path / "outbox.db")), SlowSender(), store)
+    store.publish(PROGRAM, [session("C1", 1)])
+    version = store.publish(PROGRAM, [session("C1", 2)])
+    started = time.monotonic()
+    assert notifier.published(PROGRAM, version) == {"queued": 3}
+    assert time.monotonic() - started < 0.5
+    deadline = time.monotonic() + 5
+    while len(notifier.sender.sent) < 3 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert notifier.outbox.stats() == {"sent": 3}
+
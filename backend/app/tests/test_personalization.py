@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+import app.api.timetable as api
+from app.agents.personalization import PersonalizationAgent
+from app.db.timetable_store import TimetableStore
+from app.main import app
+from app.services.timetable_views import TimetableViews
+from conftest import PROGRAM, session
+
+TIMETABLE = [
+    session("HIST", 1, day="Fri", time_slot="9:00-10:00"),
+    session("ECON", 2, day="Mon", time_slot="15:00-16:00"),
+    session("MATH", 3, day="Mon", time_slot="9:00-10:00"),
+    session("PHYS", 4, day="Mon", time_slot="9:00-10:00"),
+    session("CHEM", 5, day="Tue", time_slot="10:00-11:00"),
+]
+STUDENTS = pd.DataFrame([
+    {"roll_no": "S1", "electives": "['HIST', 'ECON', 'MATH']"},
+    {"roll_no": "S2", "electives": "MATH PHYS"},
+    {"roll_no": "S3", "electives": "['MATH', 'HIST', 'ECON']"},
+    {"roll_no": "S4", "electives": "UNKNOWN"},
+])
+
+
+def build():
+    return PersonalizationAgent(client=object()).build(PROGRAM, TIMETABLE, STUDENTS)
+
+
+def test_students_share_their_combination():
+    schedules = build()
+    assert len(schedules) == 4
+    assert schedules.student_combo["S1"] == schedules.student_combo["S3"]
+    assert schedules.for_student("S4")["timetable"] == []
+    assert schedules.for_student("S9") is None
+
+
+def test_schedules_are_chronological():
+    timetable = build().for_student("S1")["timetable"]
+    assert [(row["day"], row["time_slot"]) for row in timetable] == [
+        ("Mon", "9:00-10:00"), ("Mon", "15:00-16:00"), ("Fri", "9:00-10:00")]
+
+
+def test_clashes_are_reported():
+    student = build().for_student("S2")
+    assert [row["course_code"] for row in student["clashes"]] == ["MATH", "PHYS"]
+    assert build().for_student("S1")["clashes"] == []
+
+
+def test_student_endpoint_honours_etags(source, monkeypatch):
+    monkeypatch.setattr(api, "views", TimetableViews())
+    TimetableStore(source).publish(PROGRAM, [session("C0001", 1), session("C0002", 2, day="Tue")])
+    client = TestClient(app)
+    path = f"/timetable/timetable/{PROGRAM}/student/S000001"
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.json()["roll_no"] == "S000001"
+    assert client.get(path, headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+    assert client.get(f"/timetable/timetable/{PROGRAM}/student/NOBODY").status_code == 404
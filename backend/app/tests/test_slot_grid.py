@@ -0,0 +1,57 @@
+import pytest
+from app.utils.slot_grid import APP_WEEK, WEEK, SlotGrid, parse_range, timetable_order
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("09:00-10:00", (540, 600)),
+    ("9-10", (540, 600)),
+    ("2-3", (840, 900)),
+    ("2pm-3:30pm", (840, 930)),
+])
+def test_parse_range(text, expected):
+    assert parse_range(text) == expected
+
+
+@pytest.mark.parametrize("text", ["10-9", "noon-1", ""])
+def test_parse_range_rejects_bad_ranges(text):
+    with pytest.raises(ValueError):
+        parse_range(text)
+
+
+def test_app_week_keeps_the_original_teaching_day():
+    assert APP_WEEK.labels == ["9:00-10:00", "10:00-11:00", "11:00-12:00", "12:00-13:00",
+                               "13:00-14:00", "14:00-15:00", "15:00-16:00"]
+    assert [APP_WEEK.labels[i] for i in APP_WEEK.break_slots] == ["12:00-13:00"]
+    assert WEEK.labels[-1] == "16:00-17:00"
+
+
+def test_mask_covers_every_overlapping_slot():
+    mask = APP_WEEK.mask("Mon 10:30-12:00|wednesday 2pm-4pm")
+    assert APP_WEEK.slots(mask) == [("Mon", "10:00-11:00"), ("Mon", "11:00-12:00"),
+                                    ("Wed", "14:00-15:00"), ("Wed", "15:00-16:00")]
+
+
+def test_bare_days_cover_whole_days():
+    mask = APP_WEEK.mask("Mon Fri")
+    assert mask == APP_WEEK.day_masks[0] | APP_WEEK.day_masks[4]
+    assert APP_WEEK.mask(None) == APP_WEEK.mask(float("nan")) == APP_WEEK.mask("Sat") == 0
+
+
+def test_masks_are_cached_per_string():
+    grid = SlotGrid()
+    grid.mask("Tue 9-11")
+    assert "Tue 9-11" in grid._masks
+
+
+def test_short_labels_share_the_bit_layout():
+    short = WEEK.with_labels("short")
+    assert short.labels[:2] == ["9-10", "10-11"] and short.labels[-1] == "4-5"
+    assert short.mask("Tue 14:00-15:00") == WEEK.mask("Tue 14:00-15:00")
+
+
+def test_timetable_order_is_chronological():
+    rows = [{"day": "Fri", "time_slot": "9:00-10:00", "course_code": "A"},
+            {"day": "Mon", "time_slot": "15:00-16:00", "course_code": "B"},
+            {"day": "Sat", "time_slot": "9:00-10:00", "course_code": "C"},
+            {"day": "Mon", "time_slot": "09:00-10:00", "course_code": "D"}]
+    assert [row["course_code"] for row in sorted(rows, key=timetable_order)] == ["D", "B", "A", "C"]
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+import app.api.timetable as api
+from app.agents.timetable_generator import TimetableGeneratorAgent
+from app.services.timetable_views import TimetableViews
+from conftest import PROGRAM
+
+
+class Client:
+    """Stands in for the Request: only is_disconnected() is used."""
+
+    def __init__(self):
+        self.gone = False
+
+    async def is_disconnected(self):
+        return self.gone
+
+
+@pytest.fixture
+def solves(source, notifier, monkeypatch):
+    """Generations block until ``solves.gate`` is set (or their handle is cancelled)."""
+    monkeypatch.setattr(api, "views", TimetableViews())
+    monkeypatch.setattr(api, "DISCONNECT_POLL_SECONDS", 0.05)
+    solve = TimetableGeneratorAgent.generate
+    solves = SimpleNamespace(gate=threading.Event(), calls=[])
+
+    def gated(self, program="FYUP", handle=None):
+        solves.calls.append(program)
+        while not solves.gate.wait(0.01) and not handle.cancelled:
+            pass
+        handle.check()
+        return solve(self, program, handle)
+
+    monkeypatch.setattr(TimetableGeneratorAgent, "generate", gated)
+    return solves
+
+
+async def _settle(flight, waiters):
+    for _ in range(100):
+        if flight.waiters == waiters:
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_concurrent_requests_share_one_solve(solves):
+    async def run():
+        requests = [asyncio.ensure_future(api.generate_timetable(Client(), PROGRAM)) for _ in range(5)]
+        await asyncio.sleep(0)
+        (flight,) = api.flights.values()
+        await _settle(flight, 5)
+        assert flight.waiters == 5
+        solves.gate.set()
+        return await asyncio.gather(*requests)
+
+    results = asyncio.run(run())
+    assert len(solves.calls) == 1
+    assert sorted(r["joined"] for r in results) == [False] + [True] * 4
+    assert len({r["version"]["version_id"] for r in results}) == 1
+    assert api.flights == {} and api.active_solves == {}
+
+
+def test_new_inputs_start_a_new_solve(solves):
+    solves.gate.set()
+
+    async def run():
+        first = await api.generate_timetable(Client(), PROGRAM)
+        api.inputs_changed()
+        return first, await api.generate_timetable(Client(), PROGRAM)
+
+    first, second = asyncio.run(run())
+    assert len(solves.calls) == 2
+    assert not first["joined"] and not second["joined"]
+
+
+def test_solve_is_cancelled_only_when_every_client_has_gone(solves):
+    clients = [Client() for _ in range(3)]
+
+    async def run():
+        requests = [asyncio.ensure_future(api.generate_timetable(client, PROGRAM)) for client in clients]
+        await asyncio.sleep(0)
+        (flight,) = api.flights.values()
+        await _settle(flight, 3)
+        clients[0].gone = True
+        await _settle(flight, 2)
+        assert not flight.handle.cancelled
+        clients[1].gone = clients[2].gone = True
+        results = await asyncio.gather(*requests, return_exceptions=True)
+        await asyncio.wait({flight.task})
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert flight.handle.cancelled and flight.handle.reason == "disconnect"
+    assert all(isinstance(r, HTTPException) and r.status_code == 409 for r in results)
+    assert api.flights == {} and api.active_solves == {}
+    assert api.views.store_factory().current(PROGRAM) is None
@@ -0,0 +1,46 @@
+import pytest
+import app.agents.timetable_generator as timetable_generator
+from app.agents.timetable_generator import TimetableGeneratorAgent
+from app.utils.slot_grid import APP_WEEK
+from conftest import PROGRAM
+
+
+@pytest.fixture
+def solvers(source, monkeypatch):
+    """Counts CP-SAT solves; faculty 1 prefers Monday mornings."""
+    source.tables["faculty"][0]["preferred_slots"] = "Mon 09:00-12:00"
+    created = []
+    solver = timetable_generator.cp_model.CpSolver
+
+    def counting():
+        created.append(solver())
+        return created[-1]
+
+    monkeypatch.setattr(timetable_generator.cp_model, "CpSolver", counting)
+    return created
+
+
+def test_generated_timetable_is_feasible(source, solvers):
+    agent = TimetableGeneratorAgent(source)
+    timetable = agent.generate(PROGRAM)
+    assert agent.last_stats["status"] in ("OPTIMAL", "FEASIBLE")
+    assert sorted(row["course_code"] for row in timetable) == sorted(c["code"] for c in source.tables["courses"])
+    for field in ("faculty_id", "room_id"):
+        booked = [(row[field], row["day"], row["time_slot"]) for row in timetable]
+        assert len(booked) == len(set(booked))
+    teaching = {APP_WEEK.labels[i] for i in APP_WEEK.teaching_slots}
+    assert {row["time_slot"] for row in timetable} <= teaching
+    assert agent.last_version["version"] == 1
+
+
+def test_preferences_are_hints_only_by_default(source, solvers):
+    TimetableGeneratorAgent(source).generate(PROGRAM)
+    assert len(solvers) == 1
+
+
+def test_preference_refinement_is_opt_in(source, solvers, monkeypatch):
+    monkeypatch.setattr(timetable_generator, "PREFERENCE_SECONDS", 0.5)
+    agent = TimetableGeneratorAgent(source)
+    agent.generate(PROGRAM)
+    assert len(solvers) == 2
+    assert agent.last_stats["objective"] >= 1
@@ -0,0 +1,117 @@
+import threading
+import pytest
+from fastapi import HTTPException
+import app.db.timetable_store as timetable_store
+from app.db.timetable_store import TimetableStore
+from conftest import PROGRAM, session
+
+
+def sessions(faculty_id):
+    return [session(f"C{i}", faculty_id, time_slot=f"{9 + i}:00-{10 + i}:00") for i in range(3)]
+
+
+def test_first_publish_inserts_every_row(source):
+    version = TimetableStore(source).publish(PROGRAM, sessions(1))
+    assert (version["version"], version["inserted"], version["status"]) == (1, 3, "published")
+    assert TimetableStore(source).current(PROGRAM)["version_id"] == version["version_id"]
+
+
+def test_publish_writes_only_the_diff(source):
+    store = TimetableStore(source)
+    store.publish(PROGRAM, sessions(1))
+    changed = sessions(1)[:2] + [session("C9", 2)]
+    changed[0]["faculty_id"] = 5
+    version = store.publish(PROGRAM, changed)
+    assert (version["version"], version["inserted"], version["updated"], version["deleted"]) == (2, 1, 1, 1)
+    assert sorted((r["course_code"], r["faculty_id"]) for r in store.rows(PROGRAM)) == [
+        ("C0", 5), ("C1", 1), ("C9", 2)]
+    # The previous version stays readable
+    assert sorted(r["course_code"] for r in store.rows(PROGRAM, 1)) == ["C0", "C1", "C2"]
+
+
+def test_unchanged_publish_reports_the_current_version(source):
+    store = TimetableStore(source)
+    first = store.publish(PROGRAM, sessions(1))
+    again = store.publish(PROGRAM, list(reversed(sessions(1))))
+    assert again["unchanged"] is True
+    assert (again["version_id"], again["row_count"]) == (first["version_id"], 3)
+    assert len(source.tables["timetable_versions"]) == 1
+
+
+def test_failed_publish_rolls_back(source, monkeypatch):
+    store = TimetableStore(source)
+    store.publish(PROGRAM, sessions(1))
+    moved = store._move_pointer
+
+    def fail(*args):
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(store, "_move_pointer", fail)
+    with pytest.raises(HTTPException) as error:
+        store.publish(PROGRAM, sessions(2))
+    assert error.value.status_code == 500
+    assert store.current(PROGRAM)["version"] == 1
+    assert {r["faculty_id"] for r in store.rows(PROGRAM)} == {1}
+    assert [v["version"] for v in source.tables["timetable_versions"]] == [1]
+    assert not [r for r in source.tables["timetables"] if r.get("valid_from") == 2]
+
+    monkeypatch.setattr(store, "_move_pointer", moved)
+    assert store.publish(PROGRAM, sessions(2))["version"] == 2
+
+
+def test_concurrent_publish_keeps_both_versions(source, monkeypatch):
+    """A publish that starts while another is mid-insert must not claim its version
+    or discard its rows; it waits and publishes on top of it."""
+    monkeypatch.setattr(timetable_store, "CLAIM_WAIT_SECONDS", 0.5)
+    first, second = TimetableStore(source), TimetableStore(source)
+    first.publish(PROGRAM, sessions(1))
+    outcome = {}
+    table = source.table
+
+    def interrupted(name):
+        query = table(name)
+        if name == "timetables" and "conflict" not in outcome:
+            insert = query.insert
+
+            def racing_insert(rows):
+                try:
+                    second._publish(PROGRAM, sessions(3))
+                except timetable_store.PublishConflict as e:
+                    outcome["conflict"] = e
+                return insert(rows)
+
+            query.insert = racing_insert
+        return query
+
+    monkeypatch.setattr(source, "table", interrupted)
+    assert first.publish(PROGRAM, sessions(2))["version"] == 2
+    monkeypatch.setattr(source, "table", table)
+
+    assert "conflict" in outcome
+    assert {r["faculty_id"] for r in first.rows(PROGRAM)} == {2}
+    assert second.publish(PROGRAM, sessions(3))["version"] == 3
+    assert {r["faculty_id"] for r in first.rows(PROGRAM, 2)} == {2}
+    assert {r["faculty_id"] for r in first.rows(PROGRAM)} == {3}
+
+
+def test_publishes_from_threads_are_serialised(source):
+    results = []
+    threads = [threading.Thread(target=lambda f=f: results.append(TimetableStore(source).publish(PROGRAM, sessions(f))))
+               for f in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(r["version"] for r in results) == [1, 2, 3, 4]
+    assert TimetableStore(source).current(PROGRAM)["version"] == 4
+
+
+def test_rows_are_read_past_the_server_row_cap(source):
+    source.max_rows = 7
+    store = TimetableStore(source)
+    timetable = [session(f"C{i:02d}", i % 4, time_slot=f"{9 + i % 7}:00-{10 + i % 7}:00") for i in range(30)]
+    store.publish(PROGRAM, timetable)
+    assert len(store.rows(PROGRAM)) == 30
+    assert [len(page) for page in store.iter_rows(PROGRAM, 1, page_size=10)] == [7] * 4 + [2]
+    # The diff sees every stored row: an unchanged republish writes nothing
+    assert store.publish(PROGRAM, timetable)["unchanged"] is True
@@ -0,0 +1,88 @@
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+import app.api.timetable as api
+import app.services.timetable_views as timetable_views
+from app.db.timetable_store import TimetableStore
+from app.main import app
+from app.services.timetable_views import TimetableViews
+from conftest import PROGRAM, session
+
+TIMETABLE = [
+    session("C0003", 1, day="Wed"),
+    session("C0001", 1, time_slot="10:00-11:00"),
+    session("C0004", 1, day="Sat"),
+    session("C0002", 2, day="Tue", room_id=2),
+    session("C0005", 1, time_slot="9:00-10:00"),
+    session("C0006", 2, day="Fri", time_slot="15:00-16:00"),
+]
+
+
+@pytest.fixture
+def client(source, monkeypatch):
+    monkeypatch.setattr(api, "views", TimetableViews())
+    monkeypatch.setattr(timetable_views, "POINTER_CHECK_SECONDS", 0)
+    TimetableStore(source).publish(PROGRAM, TIMETABLE)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", [f"/timetable/timetable/{PROGRAM}", f"/timetable/timetable/{PROGRAM}/faculty/1",
+                                  f"/timetable/timetable/{PROGRAM}/room/2", f"/timetable/timetable/{PROGRAM}/day/Tue"])
+def test_matching_etag_is_not_modified(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    second = client.get(path, headers={"If-None-Match": f'"other", {etag}'})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+    assert client.get(path, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_publishing_changes_the_etag(client, source):
+    path = f"/timetable/timetable/{PROGRAM}/faculty/2"
+    etag = client.get(path).headers["etag"]
+    TimetableStore(source).publish(PROGRAM, TIMETABLE[:4])
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [row["course_code"] for row in response.json()["timetable"]] == ["C0002"]
+
+
+def test_unchanged_publish_keeps_the_etag(client, source):
+    path = f"/timetable/timetable/{PROGRAM}"
+    etag = client.get(path).headers["etag"]
+    TimetableStore(source).publish(PROGRAM, list(reversed(TIMETABLE)))
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_rows_are_in_week_order(client):
+    rows = client.get(f"/timetable/timetable/{PROGRAM}/faculty/1").json()["timetable"]
+    # Mon by start time, then Wed; days off the grid come last
+    assert [row["course_code"] for row in rows] == ["C0005", "C0001", "C0003", "C0004"]
+
+
+def test_unknown_entities_are_not_found(client):
+    assert client.get(f"/timetable/timetable/{PROGRAM}/faculty/99").status_code == 404
+
+
+def test_concurrent_reads_build_the_view_once(source):
+    TimetableStore(source).publish(PROGRAM, TIMETABLE)
+    builds = []
+
+    class SlowStore(TimetableStore):
+        def rows(self, *args):
+            builds.append(args)
+            time.sleep(0.1)
+            return super().rows(*args)
+
+    views = TimetableViews(lambda: SlowStore(source))
+    served = []
+    threads = [threading.Thread(target=lambda: served.append(views.get(PROGRAM))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    assert len({id(view) for view in served}) == 1
@@ -0,0 +1,118 @@
+import gzip
+import json
+import os
+from typing import Any, Optional
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+# JSON encoding and response compression shared by the API.
+#
+# orjson (and brotli) are optional: without them responses fall back to the
+# stdlib json encoder and gzip only.
+#
+# The module is deliberately not called "http": anything that imports it as a
+# top-level module (or puts app/utils on sys.path) would shadow the stdlib package.
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def dumps(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=str).encode()
+
+
+class DefaultResponse(JSONResponse):
+    """App-wide response class: plain dict/list results are encoded with dumps()."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Preferred encoding the client accepts ("br" over "gzip"), or None."""
+    offered = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.partition(";")
+        q = params.strip().replace(" ", "")
+        try:
+            if q.startswith("q=") and float(q[2:]) == 0:
+                continue
+        except ValueError:
+            continue
+        offered.add(name.strip().lower())
+    for encoding in ENCODINGS:
+        if encoding in offered or "*" in offered:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """Compress complete responses of at least ``minimum_size`` bytes with brotli or gzip.
+
+    Responses that already set Content-Encoding (e.g. pre-compressed timetable views)
+    and streamed responses (more_body) are passed through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                passthrough = "content-encoding" in Headers(raw=message["headers"])
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            if start is not None:
+                body = message.get("body", b"")
+                if message.get("more_body", False) or len(body) < self.minimum_size:
+                    passthrough = True
+                else:
+                    headers = MutableHeaders(raw=start["headers"])
+                    body = compress(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    headers.add_vary_header("Accept-Encoding")
+                    message = dict(message, body=body)
+                await send(start)
+                start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,188 @@
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Process-wide metrics for both the backend app and backend-rp (which imports this
+# module from backend/app/utils). Counters, gauges and histograms are rendered in the
+# Prometheus text format by render(). Phase timings are recorded through Spans; when
+# a request has started a trace (see trace()), every span it runs is also collected
+# there so it can be returned in a Server-Timing debug header.
+
+DEBUG_HEADERS = os.getenv("METRICS_DEBUG_HEADERS", "0").lower() in ("1", "true", "yes")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf"))
+_trace: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar("trace", default=None)
+
+
+def _key(name: str, labels: Dict) -> Tuple[str, Tuple]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Tuple, extra: Tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metrics:
+    """Process-wide counters, gauges and histograms, keyed by metric name and a sorted
+    tuple of labels."""
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, Tuple], float] = defaultdict(float)
+        self._gauges: Dict[Tuple[str, Tuple], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple], List] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # [bucket counts..., sum, count]
+                histogram = self._histograms[key] = [0] * len(BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def counters(self) -> Dict[Tuple[str, Tuple], float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def spans(self, operation: str, **labels) -> "Spans":
+        return Spans(self, operation, labels)
+
+    @contextmanager
+    def span(self, operation: str, phase: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(operation, phase, time.perf_counter() - started, labels)
+
+    def record(self, operation: str, phase: str, seconds: float, labels: Dict):
+        self.observe(f"{operation}_phase_seconds", seconds, phase=phase, **labels)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append((f"{operation}.{phase}", seconds))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted((key, list(value)) for key, value in self._histograms.items())
+        lines, typed = [], set()
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), value in gauges:
+            declare(name, "gauge")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), histogram in histograms:
+            declare(name, "histogram")
+            for bound, count in zip(BUCKETS, histogram):
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', _format_value(bound)),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram[-2])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+class Spans:
+    """Sequential phase timer: mark(phase) records the time since the previous mark
+    (or since creation) as ``<operation>_phase_seconds{phase=...}``."""
+
+    def __init__(self, registry: Metrics, operation: str, labels: Dict):
+        self.registry = registry
+        self.operation = operation
+        self.labels = labels
+        self.timings: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def mark(self, phase: str) -> float:
+        now = time.perf_counter()
+        seconds = now - self._last
+        self._last = now
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+        self.registry.record(self.operation, phase, seconds, self.labels)
+        return seconds
+
+    def skip(self):
+        """Restart the clock without recording (time spent outside any phase)."""
+        self._last = time.perf_counter()
+
+
+@contextmanager
+def trace():
+    """Collect the spans run in this context (and threads started with a copy of it)."""
+    spans: List[Tuple[str, float]] = []
+    token = _trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _trace.reset(token)
+
+
+def server_timing(spans: List[Tuple[str, float]]) -> str:
+    """Server-Timing header value; repeated spans (one per RAG query, ...) are summed."""
+    totals: Dict[str, float] = {}
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name.replace('.', '-')};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+class TimingMiddleware:
+    """ASGI middleware adding a Server-Timing header with the spans a request ran, when
+    METRICS_DEBUG_HEADERS is set or the request sends ``X-Debug-Timing: 1``."""
+
+    def __init__(self, app, always: bool = DEBUG_HEADERS):
+        self.app = app
+        self.always = always
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.always or (b"x-debug-timing", b"1") in scope.get("headers", [])):
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        with trace() as spans:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    total = [("request.total", time.perf_counter() - started)]
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(spans + total).encode()))
+                    message = dict(message, headers=headers)
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+
+metrics = Metrics()
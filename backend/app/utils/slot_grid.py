@@ -0,0 +1,143 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Weekly slot grids for both timetable generators. WEEK is backend-rp's day
+# (ai_timetable_generator/backend-rp); APP_WEEK is the backend app's original
+# teaching day (app.agents.timetable_generator and the views, exports and calendars
+# built from its rows). Every (day, slot) pair is one bit of an int
+# mask, bit = day_index * slots_per_day + slot_index, so "is this faculty member free"
+# is a single AND. Availability strings such as "Mon 10:00-12:00|Wed 14:00-16:00" or
+# "Mon Tue Wed" are compiled to masks once and cached.
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+SLOTS = ["09:00-10:00", "10:00-11:00", "11:00-12:00", "12:00-13:00",
+         "14:00-15:00", "15:00-16:00", "16:00-17:00"]
+BREAK_SLOTS = ["12:00-13:00"]
+APP_SLOTS = ["09:00-10:00", "10:00-11:00", "11:00-12:00", "12:00-13:00",
+             "13:00-14:00", "14:00-15:00", "15:00-16:00"]
+
+_DAY_RE = r"(mon|tue|wed|thu|fri|sat|sun)[a-z]*\.?"
+_TIME_RE = r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?"
+RANGE_RE = re.compile(rf"\b{_DAY_RE}(?:\s+{_TIME_RE}\s*(?:-|–|to)\s*{_TIME_RE})?", re.IGNORECASE)
+
+
+def parse_minutes(hour: str, minute: Optional[str] = None, meridiem: Optional[str] = None) -> int:
+    """Minutes since midnight. Bare hours before 8 are read as afternoon ("2-3")."""
+    h = int(hour) % 24
+    if meridiem:
+        h = h % 12 + (12 if meridiem.lower() == "pm" else 0)
+    elif h < 8:
+        h += 12
+    return h * 60 + int(minute or 0)
+
+
+def parse_range(text: str) -> Tuple[int, int]:
+    """Parse "HH:MM-HH:MM" (or "9-10", "2pm-3pm") into (start, end) minutes."""
+    match = re.fullmatch(rf"\s*{_TIME_RE}\s*-\s*{_TIME_RE}\s*", text, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid time range: {text!r}")
+    start = parse_minutes(*match.group(1, 2, 3))
+    end = parse_minutes(*match.group(4, 5, 6))
+    if end <= start:
+        raise ValueError(f"Empty time range: {text!r}")
+    return start, end
+
+
+def format_label(start: int, end: int, style: str = "clock") -> str:
+    """Slot label: "clock" -> "9:00-10:00", "short" -> "9-10" (12-hour, "2-3")."""
+    if style == "short":
+        return f"{(start // 60 - 1) % 12 + 1}-{(end // 60 - 1) % 12 + 1}"
+    return f"{start // 60}:{start % 60:02d}-{end // 60}:{end % 60:02d}"
+
+
+class SlotGrid:
+    def __init__(self, days: Iterable[str] = DAYS, slots: Iterable[str] = SLOTS,
+                 breaks: Iterable[str] = BREAK_SLOTS, label_style: str = "clock"):
+        self.days = list(days)
+        self.times = [parse_range(slot) for slot in slots]
+        self.labels = [format_label(start, end, label_style) for start, end in self.times]
+        self.slots_per_day = len(self.times)
+        break_times = {parse_range(slot) for slot in breaks}
+        self.break_slots = [i for i, times in enumerate(self.times) if times in break_times]
+        self.teaching_slots = [i for i in range(self.slots_per_day) if i not in self.break_slots]
+        self._day_ids = {day[:3].lower(): i for i, day in enumerate(self.days)}
+        self._masks: Dict[str, int] = {}
+
+        self.full_mask = (1 << (len(self.days) * self.slots_per_day)) - 1
+        day_mask = (1 << self.slots_per_day) - 1
+        self.day_masks = [day_mask << (d * self.slots_per_day) for d in range(len(self.days))]
+        self.break_mask = 0
+        for d in range(len(self.days)):
+            for t in self.break_slots:
+                self.break_mask |= self.bit(d, t)
+
+    def with_labels(self, label_style: str) -> "SlotGrid":
+        """Same grid (and bit layout) with differently formatted slot labels."""
+        return SlotGrid(self.days, [format_label(*t) for t in self.times],
+                        [format_label(*self.times[t]) for t in self.break_slots], label_style)
+
+    def bit(self, day_idx: int, slot_idx: int) -> int:
+        return 1 << (day_idx * self.slots_per_day + slot_idx)
+
+    def day_index(self, day: str) -> Optional[int]:
+        return self._day_ids.get(str(day)[:3].lower())
+
+    def slot_index(self, label: str) -> Optional[int]:
+        if label in self.labels:
+            return self.labels.index(label)
+        try:
+            return self.times.index(parse_range(label))
+        except ValueError:
+            return None
+
+    def overlapping(self, start: int, end: int) -> List[int]:
+        return [i for i, (s, e) in enumerate(self.times) if s < end and e > start]
+
+    def mask(self, spec) -> int:
+        """Bitmask of every slot touched by ``spec``: "Mon 10:00-12:00|Wed 14:00-16:00",
+        "Tue 9-11", or bare days ("Mon Tue Wed") for whole days. Results are cached."""
+        if spec is None or spec != spec:  # None / NaN
+            return 0
+        spec = str(spec)
+        cached = self._masks.get(spec)
+        if cached is not None:
+            return cached
+        mask = 0
+        for match in RANGE_RE.finditer(spec):
+            day_idx = self.day_index(match.group(1))
+            if day_idx is None:
+                continue
+            if match.group(2) is None:
+                mask |= self.day_masks[day_idx]
+                continue
+            start = parse_minutes(*match.group(2, 3, 4))
+            end = parse_minutes(*match.group(5, 6, 7))
+            for slot_idx in self.overlapping(start, end):
+                mask |= self.bit(day_idx, slot_idx)
+        self._masks[spec] = mask
+        return mask
+
+    def positions(self, mask: int) -> List[Tuple[int, int]]:
+        return [(d, t) for d in range(len(self.days)) for t in range(self.slots_per_day)
+                if mask & self.bit(d, t)]
+
+    def sort_key(self, day, slot) -> Tuple:
+        """Chronological order for (day, slot label): grid day, then slot start time.
+        Values off the grid sort after it, as text."""
+        day_idx = self.day_index(day)
+        slot_idx = self.slot_index(str(slot))
+        return (len(self.days) if day_idx is None else day_idx, str(day) if day_idx is None else "",
+                self.times[slot_idx][0] if slot_idx is not None else 24 * 60, str(slot))
+
+    def slots(self, mask: int) -> List[Tuple[str, str]]:
+        """(day, label) pairs set in ``mask``."""
+        return [(self.days[d], self.labels[t]) for d, t in self.positions(mask)]
+
+
+WEEK = SlotGrid()
+APP_WEEK = SlotGrid(slots=APP_SLOTS)
+
+
+def timetable_order(row: Dict) -> Tuple:
+    """Sort key for backend timetable rows: chronological on APP_WEEK, then course."""
+    return APP_WEEK.sort_key(row.get("day"), row.get("time_slot")) + (str(row.get("course_code")),)
@@ -0,0 +1,29 @@
+from typing import Any, Union
+from app.utils.slot_grid import APP_WEEK
+
+# Coercions shared by the response schemas. Rows reach the API from Supabase, pandas
+# and the solver, so ids may be ints, floats or numpy scalars and days may be spelt
+# out; responses carry plain ints/strings and the grid's short day names. These run
+# on outgoing data, so they normalise rather than reject.
+
+
+def to_native(value: Any) -> Any:
+    """Unwrap numpy scalars (pandas aggregates) into plain Python values."""
+    if hasattr(value, "item") and not isinstance(value, (list, dict, str, bytes)):
+        return value.item()
+    return value
+
+
+def coerce_id(value: Any) -> Union[int, str]:
+    value = to_native(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, (int, str)):
+        return value
+    return str(value)
+
+
+def normalise_day(value: Any) -> str:
+    day_idx = APP_WEEK.day_index(value)
+    return APP_WEEK.days[day_idx] if day_idx is not None else str(value)
+
@@ -0,0 +1 @@
+"""Scheduler benchmarks on synthetic instances; see benchmarks/run.py for usage."""
@@ -0,0 +1,124 @@
+import random
+from typing import Dict, List, Optional
+import pandas as pd
+
+# Parameterised synthetic instances. One instance feeds both generators: the backend
+# tables (faculty / courses / rooms / students, in the shapes DataCuratorAgent
+# uploads) and the backend-rp college frames (faculty_assignments, room_assignments,
+# student_sections) plus a contact-hours answer per subject, so no RAG call is needed.
+#
+# Course codes are fixed width ("C0001") because TimetableGeneratorAgent matches
+# expertise by substring.
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+DEPARTMENT = "BENCH"
+
+SIZES = {
+    "tiny": dict(courses=12, faculty=8, rooms=6, students=120, combinations=10),
+    "small": dict(courses=20, faculty=12, rooms=8, students=400, combinations=30),
+    "medium": dict(courses=32, faculty=20, rooms=12, students=1500, combinations=80),
+    "large": dict(courses=48, faculty=30, rooms=16, students=5000, combinations=200),
+}
+
+
+def generate_instance(courses: int = 20, faculty: int = 12, expertise_density: float = 0.25, rooms: int = 8,
+                      lab_ratio: float = 0.25, students: int = 400, electives: int = 4,
+                      combinations: Optional[int] = 30, unavailable_days: float = 0.3,
+                      program: str = "FYUP", seed: int = 0) -> Dict:
+    """Build one instance. ``expertise_density`` is the chance a faculty member can
+    teach a given course (every course gets at least one); ``lab_ratio`` is the share
+    of rooms that are labs and of courses that are practical; students draw their
+    electives from ``combinations`` distinct combinations (None = independent draws)."""
+    rng = random.Random(seed)
+    codes = [f"C{i:04d}" for i in range(1, courses + 1)]
+    practical = set(rng.sample(codes, max(1, round(courses * lab_ratio)))) if lab_ratio > 0 else set()
+    course_rows = [{
+        "id": i + 1,
+        "code": code,
+        "full_name": f"{code} Lab" if code in practical else code,
+        "credit_hours": rng.choice([2, 3, 4]),
+        "is_elective": True,
+        "is_practical": code in practical,
+    } for i, code in enumerate(codes)]
+
+    expertise = [[code for code in codes if rng.random() < expertise_density] for _ in range(faculty)]
+    for code in codes:
+        if not any(code in skills for skills in expertise):
+            expertise[rng.randrange(faculty)].append(code)
+    faculty_rows = []
+    for i, skills in enumerate(expertise):
+        days = [day for day in DAYS if rng.random() >= unavailable_days / len(DAYS)] or DAYS
+        faculty_rows.append({
+            "id": i + 1,
+            "name": f"F{i + 1:03d}",
+            "availability": " ".join(days),
+            "max_workload": rng.randint(16, 26),
+            # list literal: PolicyComplianceAgent eval()s it
+            "expertise": repr(sorted(skills)),
+        })
+
+    labs = max(1, round(rooms * lab_ratio)) if lab_ratio > 0 else 0
+    room_rows = [{"id": i + 1, "name": f"R{i + 1:03d}", "capacity": rng.choice([40, 60, 80]), "is_lab": i < labs}
+                 for i in range(rooms)]
+
+    elective_count = min(electives, courses)
+    pool = None
+    if combinations:
+        pool = [sorted(rng.sample(codes, elective_count)) for _ in range(combinations)]
+    student_rows = [{
+        "roll_no": f"S{i + 1:06d}",
+        "program": program,
+        "electives": repr(rng.choice(pool) if pool else sorted(rng.sample(codes, elective_count))),
+        "credit_limit": 24,
+    } for i in range(students)]
+
+    return {
+        "program": program,
+        "params": dict(courses=courses, faculty=faculty, expertise_density=expertise_density, rooms=rooms,
+                       lab_ratio=lab_ratio, students=students, electives=electives, combinations=combinations,
+                       unavailable_days=unavailable_days, seed=seed),
+        "tables": {"faculty": faculty_rows, "courses": course_rows, "rooms": room_rows, "students": student_rows},
+        "college": college_frames(course_rows, faculty_rows, room_rows, students),
+        "contact_hours": {row["full_name"]: "0L+0T+2P" if row["is_practical"] else f"{row['credit_hours']}L+0T+0P"
+                          for row in course_rows},
+    }
+
+
+def college_frames(course_rows: List[Dict], faculty_rows: List[Dict], room_rows: List[Dict],
+                   students: int, section_size: int = 60) -> Dict[str, pd.DataFrame]:
+    """The same instance in backend-rp's college-data CSV shapes (one department, year 1)."""
+    names = {row["code"]: row["full_name"] for row in course_rows}
+    faculty = pd.DataFrame([{
+        "faculty_id": f"F{row['id']:04d}",
+        "name": row["name"],
+        "department": DEPARTMENT,
+        "subjects": "|".join(names[code] for code in eval(row["expertise"])),
+        "year_to_teach": "1",
+        "max_load_hours": row["max_workload"],
+        "unavailable_slots": " ".join(day for day in DAYS if day not in row["availability"].split()),
+        "preferred_slots": "",
+    } for row in faculty_rows])
+    rooms = pd.DataFrame([{
+        "room_id": f"R{row['id']:04d}",
+        "room_name": row["name"],
+        "capacity": row["capacity"],
+        "room_type": "Lab" if row["is_lab"] else "Classroom",
+        "department": DEPARTMENT,
+        "equipment": "",
+    } for row in room_rows])
+    sections = max(1, -(-students // section_size))
+    section_names = [chr(ord("A") + i % 26) + ("" if i < 26 else str(i // 26)) for i in range(sections)]
+    sections_df = pd.DataFrame([{
+        "id": f"S{i + 1:03d}",
+        "department": DEPARTMENT,
+        "year": 1,
+        "section": name,
+        "total_number_of_students": min(section_size, students - i * section_size),
+    } for i, name in enumerate(section_names)])
+    return {"faculty": faculty, "rooms": rooms, "sections": sections_df}
+
+
+def sized_instance(size: str, seed: int = 0, **overrides) -> Dict:
+    params = dict(SIZES[size])
+    params.update(overrides)
+    return generate_instance(seed=seed, **params)
@@ -0,0 +1,195 @@
+import itertools
+import threading
+from typing import Dict, List, Optional
+
+# In-memory stand-in for the Supabase client, covering the PostgREST query-builder
+# calls the agents and TimetableStore make (select / insert / upsert / update /
+# delete with eq, neq, lt, lte, gt, gte, is_, in_, or_, order and range). Benchmarks
+# run the real agents against it so timings measure our code, not the network.
+# Inserts enforce the primary and unique keys below and raise like PostgREST
+# (code 23505) on a duplicate. With ``max_rows`` set, a select returns at most
+# that many rows, like PostgREST's max-rows cap.
+
+PRIMARY_KEYS = {"timetable_current": "program", "timetable_versions": "version_id", "students": "roll_no"}
+UNIQUE_KEYS = {"timetable_versions": [("program", "version")]}
+
+
+class APIError(Exception):
+    def __init__(self, message: str, code: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _compare(op: str, value, operand) -> bool:
+    if op == "is":
+        return value is None if str(operand).lower() == "null" else value == operand
+    if value is None:
+        return False
+    if op == "eq":
+        return str(value) == str(operand)
+    if op == "neq":
+        return str(value) != str(operand)
+    try:
+        left, right = float(value), float(operand)
+    except (TypeError, ValueError):
+        left, right = str(value), str(operand)
+    return {"lt": left < right, "lte": left <= right, "gt": left > right, "gte": left >= right}[op]
+
+
+def _sort_key(value):
+    # nulls last; numbers before strings so mixed columns still sort
+    if value is None:
+        return (2, 0, "")
+    if isinstance(value, (int, float)):
+        return (0, value, "")
+    return (1, 0, str(value))
+
+
+class Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class Query:
+    def __init__(self, source: "MemorySource", table: str):
+        self.source = source
+        self.table = table
+        self.action = ("select", None)
+        self.filters = []
+        self.orders = []
+        self.window = None
+
+    # actions
+    def select(self, *columns):
+        self.action = ("select", None)
+        return self
+
+    def insert(self, rows):
+        self.action = ("insert", rows if isinstance(rows, list) else [rows])
+        return self
+
+    def upsert(self, rows, on_conflict: Optional[str] = None):
+        self.action = ("upsert", (rows if isinstance(rows, list) else [rows], on_conflict))
+        return self
+
+    def update(self, values: Dict):
+        self.action = ("update", values)
+        return self
+
+    def delete(self):
+        self.action = ("delete", None)
+        return self
+
+    # filters
+    def _filter(self, op, column, operand):
+        self.filters.append(lambda row: _compare(op, row.get(column), operand))
+        return self
+
+    def eq(self, column, value):
+        return self._filter("eq", column, value)
+
+    def neq(self, column, value):
+        return self._filter("neq", column, value)
+
+    def lt(self, column, value):
+        return self._filter("lt", column, value)
+
+    def lte(self, column, value):
+        return self._filter("lte", column, value)
+
+    def gt(self, column, value):
+        return self._filter("gt", column, value)
+
+    def gte(self, column, value):
+        return self._filter("gte", column, value)
+
+    def is_(self, column, value):
+        return self._filter("is", column, value)
+
+    def in_(self, column, values):
+        wanted = {str(v) for v in values}
+        self.filters.append(lambda row: str(row.get(column)) in wanted)
+        return self
+
+    def or_(self, expression: str):
+        clauses = [clause.split(".", 2) for clause in expression.split(",")]
+        self.filters.append(lambda row: any(_compare(op, row.get(column), operand)
+                                            for column, op, operand in clauses))
+        return self
+
+    def order(self, column, desc: bool = False):
+        self.orders.append((column, desc))
+        return self
+
+    def range(self, start: int, end: int):
+        self.window = (start, end)
+        return self
+
+    def execute(self) -> Response:
+        with self.source.lock:
+            rows = self.source.tables.setdefault(self.table, [])
+            matched = [row for row in rows if all(f(row) for f in self.filters)]
+            action, arg = self.action
+            if action == "select":
+                for column, desc in reversed(self.orders):
+                    matched.sort(key=lambda row: _sort_key(row.get(column)), reverse=desc)
+                if self.window is not None:
+                    matched = matched[self.window[0]:self.window[1] + 1]
+                if self.source.max_rows is not None:
+                    matched = matched[:self.source.max_rows]
+                return Response([dict(row) for row in matched])
+            if action == "insert":
+                inserted = [self.source._stamp(self.table, row) for row in arg]
+                self.source._check_unique(self.table, rows, inserted)
+                rows.extend(inserted)
+                return Response([dict(row) for row in inserted])
+            if action == "upsert":
+                new_rows, on_conflict = arg
+                key = on_conflict or PRIMARY_KEYS.get(self.table, "id")
+                existing = {str(row.get(key)): row for row in rows}
+                for row in new_rows:
+                    current = existing.get(str(row.get(key)))
+                    if current is not None:
+                        current.update(row)
+                    else:
+                        rows.append(self.source._stamp(self.table, row))
+                return Response([dict(row) for row in new_rows])
+            if action == "update":
+                for row in matched:
+                    row.update(arg)
+                return Response([dict(row) for row in matched])
+            if action == "delete":
+                doomed = {id(row) for row in matched}
+                self.source.tables[self.table] = [row for row in rows if id(row) not in doomed]
+                return Response([dict(row) for row in matched])
+            raise ValueError(f"Unsupported action {action}")
+
+
+class MemorySource:
+    def __init__(self, tables: Optional[Dict[str, List[Dict]]] = None, max_rows: Optional[int] = None):
+        self.tables: Dict[str, List[Dict]] = {}
+        self.max_rows = max_rows
+        self.lock = threading.RLock()
+        self._ids = itertools.count(1)
+        for name, rows in (tables or {}).items():
+            self.tables[name] = [self._stamp(name, row) for row in rows]
+
+    def _stamp(self, table: str, row: Dict) -> Dict:
+        row = dict(row)
+        if "id" not in row and table not in PRIMARY_KEYS:
+            row["id"] = next(self._ids)
+        return row
+
+    def _check_unique(self, table: str, rows: List[Dict], new_rows: List[Dict]):
+        keys = [(PRIMARY_KEYS[table],)] if table in PRIMARY_KEYS else []
+        for columns in keys + UNIQUE_KEYS.get(table, []):
+            seen = {tuple(str(row.get(c)) for c in columns) for row in rows}
+            for row in new_rows:
+                value = tuple(str(row.get(c)) for c in columns)
+                if value in seen:
+                    raise APIError(f"duplicate key value violates unique constraint on {table} {columns}", "23505")
+                seen.add(value)
+
+    def table(self, name: str) -> Query:
+        return Query(self, name)
@@ -0,0 +1,214 @@
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.instances import DEPARTMENT, SIZES, sized_instance
+from benchmarks.memory_source import MemorySource
+
+# Scheduler benchmarks over synthetic instances.
+#
+#   python -m benchmarks.run --sizes tiny small --out bench.json
+#   python -m benchmarks.run --sizes small --param expertise_density=0.5 --baseline bench.json
+#
+# Every (size, target) case runs in a fresh spawned process so peak RSS is the
+# case's own. Targets:
+#   generator - TimetableGeneratorAgent.generate against a MemorySource
+#   policy    - PolicyComplianceAgent.validate_constraints against a MemorySource
+#   routine   - backend-rp SmartRoutineGenerator.generate_routine (greedy and cpsat)
+# Results (with the git commit) are written as JSON; --baseline prints the
+# relative change of each timing against an earlier results file.
+
+BACKEND_RP = Path(__file__).resolve().parents[2] / "ai_timetable_generator" / "backend-rp"
+TARGETS = ("generator", "policy", "routine")
+# Lower is better for these; compared against --baseline
+TIMINGS = ("build_time", "solve_time", "total_time", "peak_rss_mb")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def bench_generator(instance):
+    from app.agents.timetable_generator import TimetableGeneratorAgent
+    agent = TimetableGeneratorAgent(MemorySource(instance["tables"]))
+    started = time.perf_counter()
+    timetable = agent.generate(instance["program"])
+    total = time.perf_counter() - started
+    stats = agent.last_stats
+    phases = stats["phases"]
+    courses = len(instance["tables"]["courses"])
+    scheduled = {row["course_code"] for row in timetable}
+    return {
+        "build_time": phases.get("prune", 0.0) + phases.get("model_build", 0.0),
+        "solve_time": phases.get("solve"),
+        "total_time": total,
+        "variables": stats["variables"],
+        "constraints": stats["constraints"],
+        "phases": phases,
+        "quality": {
+            "status": stats["status"],
+            "objective": stats["objective"],
+            "sessions": len(timetable),
+            "course_coverage": len(scheduled) / courses if courses else None,
+        },
+    }
+
+
+def bench_policy(instance):
+    from app.agents.policy_agent import PolicyComplianceAgent
+    agent = PolicyComplianceAgent(MemorySource(instance["tables"]))
+    started = time.perf_counter()
+    violations = agent.validate_constraints()["violations"]
+    total = time.perf_counter() - started
+    by_type = {}
+    for violation in violations:
+        by_type[violation["constraint_type"]] = by_type.get(violation["constraint_type"], 0) + 1
+    return {"total_time": total, "quality": {"violations": len(violations), "by_type": by_type}}
+
+
+def bench_routine(instance, engine):
+    sys.path.insert(0, str(BACKEND_RP))
+    from rag_utils import SmartRoutineGenerator
+    from backend_shared import metrics
+
+    college = instance["college"]
+    generator = SmartRoutineGenerator()
+    started = time.perf_counter()
+    generator.faculty_df, generator.room_df, generator.student_df = \
+        college["faculty"], college["rooms"], college["sections"]
+    generator.faculty_index = generator.build_faculty_index(college["faculty"])
+    built = time.perf_counter()
+    routine = generator.generate_routine(DEPARTMENT, 1, instance["contact_hours"], seed=instance["params"]["seed"],
+                                         engine=engine)
+    finished = time.perf_counter()
+    if isinstance(routine, str):
+        raise RuntimeError(routine)
+    gauges = {name: value for (name, labels), value in metrics._gauges.items() if name.startswith("rag_cpsat_")}
+    run = generator.last_run or {}
+    return {
+        "build_time": built - started,
+        "solve_time": finished - built,
+        "total_time": finished - started,
+        "variables": gauges.get("rag_cpsat_variables"),
+        "constraints": gauges.get("rag_cpsat_constraints"),
+        "quality": {"engine": run.get("engine"), "status": run.get("status"), "score": run.get("score"),
+                    "cpsat_status": run.get("cpsat_status")},
+    }
+
+
+def run_case(target: str, engine: str, size: str, seed: int, overrides: dict) -> dict:
+    instance = sized_instance(size, seed=seed, **overrides)
+    result = {"target": target, "size": size, "params": instance["params"]}
+    if engine:
+        result["engine"] = engine
+    try:
+        if target == "generator":
+            result.update(bench_generator(instance))
+        elif target == "policy":
+            result.update(bench_policy(instance))
+        else:
+            result.update(bench_routine(instance, engine))
+    except Exception as e:
+        result["error"] = getattr(e, "detail", None) or f"{type(e).__name__}: {e}"
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def run_isolated(*args) -> dict:
+    # One process per case: ru_maxrss is a high-water mark for the whole process
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_case, *args).result()
+
+
+def _case_id(result: dict) -> str:
+    return ":".join(filter(None, (result["target"], result.get("engine"), result["size"])))
+
+
+def compare(results: list, baseline: dict):
+    previous = {_case_id(r): r for r in baseline.get("results", [])}
+    print(f"\nChange vs {baseline.get('commit') or 'baseline'}:")
+    for result in results:
+        before = previous.get(_case_id(result))
+        if before is None:
+            continue
+        changes = []
+        for name in TIMINGS:
+            old, new = before.get(name), result.get(name)
+            if old and new is not None:
+                changes.append(f"{name} {(new - old) / old:+.1%}")
+        print(f"  {_case_id(result):<28} " + ", ".join(changes))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_param(text: str):
+    name, _, value = text.partition("=")
+    try:
+        return name, json.loads(value)
+    except ValueError:
+        return name, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the schedulers on synthetic instances")
+    parser.add_argument("--sizes", nargs="+", default=["tiny", "small"], choices=sorted(SIZES))
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS), choices=TARGETS)
+    parser.add_argument("--engines", nargs="+", default=["greedy", "cpsat"], choices=["greedy", "cpsat"],
+                        help="SmartRoutineGenerator engines")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                        help="override an instance parameter (expertise_density, lab_ratio, ...)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare timings against")
+    args = parser.parse_args(argv)
+
+    overrides = dict(_parse_param(p) for p in args.param)
+    cases = [(target, engine, size)
+             for size in args.sizes
+             for target in args.targets
+             for engine in (args.engines if target == "routine" else [None])]
+    results = []
+    for target, engine, size in cases:
+        result = run_isolated(target, engine, size, args.seed, overrides)
+        results.append(result)
+        summary = result.get("error") or ", ".join(
+            f"{name}={result[name]:.3f}" for name in ("build_time", "solve_time", "total_time")
+            if result.get(name) is not None)
+        print(f"{_case_id(result):<28} {summary}  rss={result['peak_rss_mb']}MB")
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "overrides": overrides,
+        "results": results,
+    }
+    with open(args.out, "w") as fh:
+        json.dump(report, fh, indent=2, default=str)
+    print(f"Wrote {args.out}")
+    if args.baseline:
+        with open(args.baseline) as fh:
+            compare(results, json.load(fh))
+
+
+if __name__ == "__main__":
+    main()